@@ -1,20 +1,84 @@
-
 import tkinter as tk
 from tkinter import ttk
-import numpy as np
 import time
 import random
-import math
+import json
+import os
+import sqlite3
+import uuid
+
+import numpy as np
+
+from deviation_heatmap import crop_to_content, photo_data, rasterize, task_deviations
+from event_clock import EventClock
+from frame_scheduler import FrameScheduler
+from latency_profiler import HandlerProfiler
+from movement_buffer import MovementBuffer
+from normative_db import NormativeDB
+from online_metrics import OnlineTaskMetrics
+from scoring import TREMOR_METRICS, ScoringEngine, calculate_smoothness, risk_level
+from session_store import SessionStore
+from stroke_renderer import StrokeRenderer
+from target_field import TargetField
+from template_paths import TEMPLATE_BUILDERS, get_template
+from trend_store import TrendStore
+
+# Settings written into every "start" event so replay.py reproduces the test exactly
+TEST_SETTINGS = ("seed", "canvas_width", "canvas_height", "speed", "timeout", "targets")
+
+
+DEFAULT_SESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions")
 
 
 class TaskBasedAnalyzer:
-    def __init__(self):
+    # Entry points timed by the handler profiler: Tk event handlers, after() targets and analysis
+    PROFILED_HANDLERS = ("on_mouse_down", "on_mouse_up", "on_mouse_move", "on_target_click", "move_target",
+                         "create_new_target", "target_timeout_handler", "after_missed_target",
+                         "clear_hit_animation", "start_specific_test", "analyze_current_task",
+                         "analyze_target_task", "display_final_diagnosis")
+
+    # Metrics placed against the population norms in the diagnosis, with their labels
+    NORM_METRICS = (("line.mse", "Line Deviation"), ("square.mse", "Square Deviation"),
+                    ("line.smoothness", "Line Smoothness"), ("square.smoothness", "Square Smoothness"),
+                    ("target.avg_time", "Reaction Time"))
+
+    # Metrics in the patient trend panel (the first three get sparklines), with their labels
+    TREND_PANEL = (("line.mse", "Line Deviation"), ("square.mse", "Square Deviation"),
+                   ("target.avg_time", "Reaction Time"), ("line.smoothness", "Line Smoothness"),
+                   ("square.smoothness", "Square Smoothness"))
+
+    def __init__(self, session_dir=DEFAULT_SESSION_DIR):
         self.root = tk.Tk()
         self.root.title("Parkinson's Disease Detection")
         self.root.geometry("1000x800")
 
+        self.init_state(session_dir)
+
+        # Create UI elements
+        self.setup_frames()
+        self.setup_task_buttons()
+        self.setup_canvas()
+        self.setup_results_display()
+
+    def init_state(self, session_dir=None, profiler=None):
+        """Set up task, scoring and storage state (everything except Tk widgets)"""
+        # Time sources and target randomness; replay swaps these for a virtual clock.
+        # The target RNG is reseeded at every test start from seed_source, and the
+        # seed is logged with the start event
+        self.clock = time.perf_counter
+        self.frame_clock = time.perf_counter
+        self.rng = random.Random()
+        self.seed_source = random.SystemRandom()
+
+        # Input events are stamped with their own event.time, mapped onto self.clock
+        self.event_clock = EventClock()
+
+        # Every input event of the current session, for deterministic replay (see replay.py)
+        self.event_log = []
+
         # Task variables
-        self.movements = []
+        self.max_recorded_samples = None  # Set to bound memory on long recordings (keeps the newest samples)
+        self.movements = MovementBuffer(max_samples=self.max_recorded_samples)
         self.start_time = None
         self.is_recording = False
         self.is_drawing = False
@@ -22,28 +86,39 @@ class TaskBasedAnalyzer:
         self.target_points = []
         self.target_click_times = []  # Will store reaction times, not timestamps
         self.targets_clicked = 0
-
-        # Target variables
-        self.target_id = None
-        self.target_move_job = None
-        self.target_timeout_job = None
-        self.target_dx = 0
-        self.target_dy = 0
+        self.online_metrics = None  # Running line/square metrics, updated per motion event
+        self.live_update_interval = 0.1  # Seconds between live score refreshes
+        self.last_live_update = 0
+        self.heatmap_image = None  # Deviation overlay of the last analysed drawing (see show_deviation_heatmap)
+
+        # Target variables (positions come from the kinematic model in target_field.py)
+        self.target_field = None  # TargetField of the live targets while the target test runs
+        self.target_frame_ms = 20  # Target animation frame interval; target_speed is px per frame
+        self.target_timeout_jobs = {}  # Canvas item id -> pending timeout job
         self.target_missed = 0
         self.target_speed = 2  # Speed of target movement
         self.target_timeout = 3000  # Time in ms before target disappears if not clicked
-        self.target_appear_time = None  # When target appears
         self.target_radius = 25  # Size of target (larger for easier clicking)
-
-        # Results storage
-        self.results = {
-            "line": {"mse": None, "time_taken": None, "smoothness": None},
-            "square": {"mse": None, "time_taken": None, "smoothness": None},
-            "target": {"avg_time": None, "std_dev": None, "missed": None}
-        }
-
-        # Available tests
-        self.tests = ["line", "square", "target"]
+        self.target_total = 5  # Targets per test
+        self.target_concurrency = 1  # Targets on screen at once
+
+        # Results storage (shared with the display-free scoring engine); the diagnosis shows tremor
+        self.engine = ScoringEngine(tremor_metrics=True)
+        self.results = self.engine.results
+
+        # Raw recordings of each completed test, saved together once the diagnosis is shown
+        self.recordings = {"line": None, "square": None, "target": None}
+        self.session_store = SessionStore(session_dir) if session_dir else None
+        # Population norms built from every saved session (percentiles shown in the diagnosis)
+        self.norms = NormativeDB(os.path.join(session_dir, "norms.sqlite")) if session_dir else None
+        # Per-patient history for the trend panel (sessions with a patient ID only)
+        self.trends = TrendStore(os.path.join(session_dir, "trends.sqlite")) if session_dir else None
+        self.saved_session_id = None  # Set once every part of the current session is saved
+        self.pending_save = None  # (session ID, parts written) while a save is incomplete
+
+        # Available tests (template tests are traced polylines, see template_paths.py)
+        self.tests = ["line", "square", "target", *TEMPLATE_BUILDERS]
+        self.drawing_tasks = ["line", "square", *TEMPLATE_BUILDERS]
 
         # Food recommendations based on risk level
         self.food_recommendations = {
@@ -74,13 +149,33 @@ class TaskBasedAnalyzer:
             ]
         }
 
-        # Create UI elements
-        self.setup_frames()
-        self.setup_task_buttons()
-        self.setup_canvas()
-        self.setup_results_display()
+        # Opt-in handler and after() timing, switched on from the debug panel
+        self.profiler = profiler or HandlerProfiler()
+        self.profile_refresh_ms = 500
+        self.instrument_handlers()
+
+    def instrument_handlers(self):
+        """Route the profiled handlers and root.after() through the profiler
+
+        Must run before any binding or scheduling captures the plain methods.
+        """
+        for name in self.PROFILED_HANDLERS:
+            setattr(self, name, self.profiler.wrap(name, getattr(self, name)))
+        self.profiler.instrument_after(self.root)
 
     def setup_task_buttons(self):
+        # Optional patient ID: saved sessions with one build up that patient's trend history
+        patient_frame = ttk.LabelFrame(self.control_frame, text="Patient ID (optional)")
+        patient_frame.pack(pady=(10, 0), fill='x')
+        self.patient_var = tk.StringVar(value="")
+        ttk.Entry(patient_frame, textvariable=self.patient_var).pack(fill='x', padx=5, pady=5)
+
+        # Optional age: saved with the session and picks the age band for population norms
+        age_frame = ttk.LabelFrame(self.control_frame, text="Age in years (optional)")
+        age_frame.pack(pady=(10, 0), fill='x')
+        self.age_var = tk.StringVar(value="")
+        ttk.Entry(age_frame, textvariable=self.age_var).pack(fill='x', padx=5, pady=5)
+
         # Individual test buttons
         self.test_buttons_frame = ttk.LabelFrame(self.control_frame, text="Available Tests")
         self.test_buttons_frame.pack(pady=10, fill='x')
@@ -97,6 +192,10 @@ class TaskBasedAnalyzer:
                                           command=lambda: self.start_specific_test("target"))
         self.target_test_btn.pack(pady=5, fill='x')
 
+        for number, name in enumerate(TEMPLATE_BUILDERS, start=4):
+            ttk.Button(self.test_buttons_frame, text=f"{number}. Draw {get_template(name).label} Test",
+                       command=lambda name=name: self.start_specific_test(name)).pack(pady=5, fill='x')
+
         # Other control buttons
         self.clear_btn = ttk.Button(self.control_frame, text="Clear Canvas", command=self.clear_canvas)
         self.clear_btn.pack(pady=10, fill='x')
@@ -118,6 +217,12 @@ class TaskBasedAnalyzer:
         self.target_status = ttk.Label(self.status_frame, text="Target Test: Not Started")
         self.target_status.pack(pady=2, anchor='w')
 
+        self.template_status = {}
+        for name in TEMPLATE_BUILDERS:
+            self.template_status[name] = ttk.Label(self.status_frame,
+                                                   text=f"{get_template(name).label} Test: Not Started")
+            self.template_status[name].pack(pady=2, anchor='w')
+
         # Add difficulty slider for target test
         self.difficulty_frame = ttk.LabelFrame(self.control_frame, text="Target Test Settings")
         self.difficulty_frame.pack(pady=10, fill='x')
@@ -132,6 +237,11 @@ class TaskBasedAnalyzer:
         self.timeout_slider.set(3)  # Default timeout
         self.timeout_slider.pack(fill='x')
 
+        ttk.Label(self.difficulty_frame, text="Targets at once:").pack(anchor='w')
+        self.concurrency_slider = ttk.Scale(self.difficulty_frame, from_=1, to=5, orient='horizontal')
+        self.concurrency_slider.set(1)  # Default: one target at a time
+        self.concurrency_slider.pack(fill='x')
+
         # Debug info
         self.debug_var = tk.BooleanVar(value=False)
         self.debug_checkbox = ttk.Checkbutton(self.control_frame, text="Show Debug Info",
@@ -144,6 +254,45 @@ class TaskBasedAnalyzer:
         self.debug_label = ttk.Label(self.debug_frame, text="Debug Info: None", wraplength=180)
         self.debug_label.pack(pady=5, fill='both', expand=True)
 
+        # Handler latency profiling (opt-in; histograms shown here while debug info is on)
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.debug_frame, text="Profile Event Handlers", variable=self.profile_var,
+                        command=self.toggle_profiling).pack(anchor='w')
+        ttk.Button(self.debug_frame, text="Export Profile...", command=self.export_profile).pack(fill='x')
+        self.profile_label = ttk.Label(self.debug_frame, text="", wraplength=180, font=('Arial', 8))
+        self.profile_label.pack(pady=5, fill='both', expand=True)
+
+    def toggle_profiling(self):
+        """Start or stop timing handlers; each start begins fresh histograms"""
+        self.profiler.enabled = self.profile_var.get()
+        if self.profiler.enabled:
+            self.profiler.reset()
+            self.root.after(self.profile_refresh_ms, self.refresh_profile_display)
+        else:
+            self.profile_label.config(text="")
+
+    def refresh_profile_display(self):
+        """Periodically show the slowest handlers in the debug panel while profiling"""
+        if not self.profiler.enabled:
+            return
+        if self.debug_var.get():
+            self.profile_label.config(text=self.profiler.summary_text())
+        self.root.after(self.profile_refresh_ms, self.refresh_profile_display)
+
+    def export_profile(self):
+        """Save the handler histograms to a JSON file"""
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(title="Export handler profile", defaultextension=".json",
+                                            initialfile="handler_profile.json",
+                                            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.profiler.export(path)
+            self.debug_label.config(text=f"Profile saved to \n{path}")
+        except OSError as exc:
+            self.debug_label.config(text=f"Profile not saved: \n{exc}")
+
     def setup_frames(self):
         self.control_frame = ttk.Frame(self.root, width=200)
         self.control_frame.pack(side='left', padx=10, pady=10, fill='y')
@@ -165,6 +314,8 @@ class TaskBasedAnalyzer:
         # Set minimum size for canvas to prevent shrinking
         self.canvas.config(width=800, height=800)
 
+        self.setup_canvas_helpers()
+
         # Only use essential bindings to avoid conflict
         self.canvas.bind('<Motion>', self.on_mouse_move)
         self.canvas.bind('<ButtonPress-1>', self.on_mouse_down)
@@ -173,6 +324,26 @@ class TaskBasedAnalyzer:
         # Separate click handler specifically for targets
         self.canvas.bind('<Button-1>', self.on_target_click, add="+")  # Use add='+' to avoid overriding
 
+    def setup_canvas_helpers(self):
+        """Create the stroke renderer and target scheduler that drive self.canvas"""
+        # User strokes are drawn as one polyline each, redrawn at frame rate
+        self.stroke_renderer = StrokeRenderer(self.canvas, self.root)
+
+        # Canvas size is cached and only refreshed when the canvas is resized
+        self.canvas_width, self.canvas_height = 800, 600
+        self.canvas.bind('<Configure>', self.on_canvas_configure)
+
+        # Target animation advances by elapsed time, independent of after() jitter
+        self.target_scheduler = FrameScheduler(self.root, self.move_target, interval_ms=self.target_frame_ms,
+                                               clock=self.frame_clock)
+
+    def on_canvas_configure(self, event):
+        """Cache the canvas dimensions whenever it is resized"""
+        if event.width > 1:
+            self.canvas_width = event.width
+        if event.height > 1:
+            self.canvas_height = event.height
+
     def setup_results_display(self):
         # Create frame for results with potential scrolling
         self.result_display_frame = ttk.Frame(self.results_frame)
@@ -184,30 +355,54 @@ class TaskBasedAnalyzer:
 
     def clear_canvas(self):
         self.canvas.delete("all")
-        self.movements = []
+        self.stroke_renderer.reset()
+        self.movements.clear()
         self.target_points = []
         self.target_click_times = []
         self.targets_clicked = 0
         self.target_missed = 0
-        self.target_appear_time = None
+        self.target_field = None
+        self.heatmap_image = None
 
         # Cancel any scheduled jobs
-        if self.target_move_job:
-            self.root.after_cancel(self.target_move_job)
-            self.target_move_job = None
-        if self.target_timeout_job:
-            self.root.after_cancel(self.target_timeout_job)
-            self.target_timeout_job = None
+        self.cancel_target_jobs()
 
         self.result_label.config(text="Select a test to begin")
         self.current_task = None
+        self.online_metrics = None
         self.is_drawing = False
         self.debug_label.config(text="Debug Info: None")
 
-    def start_specific_test(self, test_name):
-        """Start a specific test selected by the user"""
+    def test_settings(self):
+        """A fresh RNG seed plus the canvas size and target sliders, as logged with a test start"""
+        return {"seed": self.seed_source.randrange(2 ** 32),
+                "canvas_width": self.canvas_width, "canvas_height": self.canvas_height,
+                "speed": self.speed_slider.get(), "timeout": self.timeout_slider.get(),
+                "targets": int(round(self.concurrency_slider.get()))}
+
+    def apply_test_settings(self, settings):
+        """Seed the RNG and set the canvas size and sliders from (a subset of) test_settings()"""
+        if "seed" in settings:
+            self.rng.seed(settings["seed"])
+        self.canvas_width = settings.get("canvas_width", self.canvas_width)
+        self.canvas_height = settings.get("canvas_height", self.canvas_height)
+        for key, slider in (("speed", self.speed_slider), ("timeout", self.timeout_slider),
+                            ("targets", self.concurrency_slider)):
+            if key in settings:
+                slider.set(settings[key])
+
+    def start_specific_test(self, test_name, settings=None):
+        """Start a specific test selected by the user
+
+        settings (see test_settings) defaults to a fresh seed and the current
+        canvas size and sliders; replay passes the ones that were logged.
+        """
         self.clear_canvas()
         self.current_task = test_name
+        if settings is None:
+            settings = self.test_settings()
+        self.apply_test_settings(settings)
+        self.event_log.append({"t": self.clock(), "type": "start", "test": test_name, **settings})
 
         if test_name == "line":
             self.start_line_task()
@@ -215,6 +410,8 @@ class TaskBasedAnalyzer:
             self.start_square_task()
         elif test_name == "target":
             self.start_target_task()
+        elif test_name in TEMPLATE_BUILDERS:
+            self.start_template_task(test_name)
 
     def start_line_task(self):
         """Initialize the Follow Line task"""
@@ -224,8 +421,9 @@ class TaskBasedAnalyzer:
 
         width, height = 800, 600
         self.canvas.create_line(100, height // 2, 700, height // 2, fill='gray', dash=(5, 5), width=20)
-        self.movements = []
-        self.start_time = time.time()
+        self.movements.clear()
+        self.online_metrics = OnlineTaskMetrics("line")
+        self.start_time = self.clock()
         self.is_recording = True
         self.is_drawing = False
 
@@ -250,27 +448,50 @@ class TaskBasedAnalyzer:
 
         # Create square outline
         self.canvas.create_rectangle(x1, y1, x2, y2, outline='gray', dash=(5, 5), width=line_width)
-        self.movements = []
-        self.start_time = time.time()
+        self.movements.clear()
+        self.online_metrics = OnlineTaskMetrics("square")
+        self.start_time = self.clock()
         self.is_recording = True
         self.is_drawing = False
 
         # Add instruction text
         self.canvas.create_text(400, 150, text="Click and hold mouse button to draw", fill="gray", font=('Arial', 12))
 
+    def start_template_task(self, name):
+        """Initialize a template tracing task (spiral, circle, ...)"""
+        template = get_template(name)
+        self.result_label.config(text=f"{template.label} Task: {template.instructions}")
+        self.template_status[name].config(text=f"{template.label} Test: In Progress")
+        self.root.update()
+
+        # Draw the template path
+        self.canvas.create_line(*template.canvas_coords(), fill='gray', dash=(5, 5), width=20)
+        template.index  # Build the distance index now rather than on the first motion event
+        self.movements.clear()
+        self.online_metrics = OnlineTaskMetrics(name, template=template)
+        self.start_time = self.clock()
+        self.is_recording = True
+        self.is_drawing = False
+
+        # Add instruction text above the template
+        self.canvas.create_text(400, 60, text="Click and hold mouse button to draw", fill="gray", font=('Arial', 12))
+
     def start_target_task(self):
         """Initialize the Click Targets task with moving targets"""
         self.result_label.config(text="Click Targets Task: Click on each moving target as quickly as possible.")
         self.target_status.config(text="Target Test: In Progress")
         self.target_speed = self.speed_slider.get()
         self.target_timeout = int(self.timeout_slider.get() * 1000)  # Convert to milliseconds
+        self.target_concurrency = int(round(self.concurrency_slider.get()))
+        self.target_field = TargetField(self.canvas_width, self.canvas_height, self.target_radius)
         self.root.update()
 
         self.targets_clicked = 0
         self.target_missed = 0
         self.target_points = []
         self.target_click_times = []  # This will store reaction times
-        self.start_time = time.time()
+        self.target_scheduler.reset_stats()
+        self.start_time = self.clock()
 
         # Show instructions
         self.canvas.create_text(400, 100, text="Click on each moving target as quickly as you can",
@@ -282,149 +503,188 @@ class TaskBasedAnalyzer:
         self.root.after(500, self.create_new_target)  # Small delay to allow UI to update
 
     def create_new_target(self):
-        """Creates a new random moving target until 5 targets are clicked or missed"""
-        # First clear any miss markers from previous target
+        """Tops the field up to target_concurrency moving targets until target_total are clicked or missed"""
+        if self.target_field is None:  # Test already finished (or was cleared)
+            return
+
+        # First clear any miss markers from previous targets
         self.canvas.delete('miss_marker')
 
-        if self.targets_clicked + self.target_missed >= 5:
+        resolved = self.targets_clicked + self.target_missed
+        if resolved >= self.target_total:
             self.analyze_target_task()
             return
 
-        # Cancel any existing target movement jobs
-        if self.target_move_job:
-            self.root.after_cancel(self.target_move_job)
-            self.target_move_job = None
-        if self.target_timeout_job:
-            self.root.after_cancel(self.target_timeout_job)
-            self.target_timeout_job = None
-
-        # Get canvas dimensions
-        canvas_width = self.canvas.winfo_width() or 800
-        canvas_height = self.canvas.winfo_height() or 600
-
-        # Generate random position with padding
-        x = random.randint(50, canvas_width - 50)
-        y = random.randint(150, canvas_height - 150)
-
-        # Random direction for movement
-        self.target_dx = random.choice([-1, 1]) * self.target_speed
-        self.target_dy = random.choice([-1, 1]) * self.target_speed
-
-        # Create target
-        self.target_id = self.canvas.create_oval(
-            x - self.target_radius, y - self.target_radius,
-            x + self.target_radius, y + self.target_radius,
-            fill='red', tags='target', outline='black', width=2
-        )
+        # Never put more targets on screen than the test has left
+        wanted = min(self.target_concurrency, self.target_total - resolved) - len(self.target_field)
+        if wanted <= 0:
+            return
 
-        # Store target center position
-        target_center = (x, y)
-        self.target_points.append(target_center)
+        spawned = []
+        for _ in range(wanted):
+            # Random position with padding and a random diagonal direction
+            x = self.rng.randint(50, self.canvas_width - 50)
+            y = self.rng.randint(150, self.canvas_height - 150)
+            dx = self.rng.choice([-1, 1]) * self.target_speed
+            dy = self.rng.choice([-1, 1]) * self.target_speed
+
+            item = self.canvas.create_oval(
+                x - self.target_radius, y - self.target_radius,
+                x + self.target_radius, y + self.target_radius,
+                fill='red', tags='target', outline='black', width=2
+            )
+            spawned.append((item, x, y, dx, dy))
+
+            # Store target center position
+            self.target_points.append((x, y))
 
         # Debug info
         if self.debug_var.get():
-            self.debug_label.config(text=f"Target created at: \n{target_center}")
-
-        # Record the time the target appears
-        self.target_appear_time = time.time()
+            self.debug_label.config(text=f"Target created at: \n{', '.join(str(spawn[1:3]) for spawn in spawned)}")
 
         # Show target counter
         self.canvas.delete('counter')
-        self.canvas.create_text(400, 70, text=f"Target {self.targets_clicked + self.target_missed + 1} of 5",
+        self.canvas.create_text(400, 70, text=f"Target {resolved + len(self.target_field) + len(spawned)} "
+                                              f"of {self.target_total}",
                                 fill="black", font=('Arial', 12), tags='counter')
 
-        # Start moving the target
-        self.move_target()
-
-        # Set timeout for target if not clicked
-        self.target_timeout_job = self.root.after(self.target_timeout, self.target_timeout_handler)
-
-    def move_target(self):
-        """Move the target around the canvas"""
-        if not self.target_id or self.current_task != "target":
+        # Record the time the targets appear: force the pending redraw first so the
+        # reaction time starts when a target is on screen, not when it was queued
+        self.root.update_idletasks()
+        now = self.clock()
+
+        # Speed is defined in px per nominal frame; the model works in px per second
+        frames_per_sec = 1000 / self.target_frame_ms
+        for item, x, y, dx, dy in spawned:
+            self.target_field.add(item, x, y, dx * frames_per_sec, dy * frames_per_sec, now)
+            # Each target times out on its own if not clicked
+            self.target_timeout_jobs[item] = self.root.after(self.target_timeout, self.target_timeout_handler, item)
+
+        # Start moving the targets
+        if not self.target_scheduler.running:
+            self.target_scheduler.start()
+
+    def move_target(self, elapsed):
+        """Draw every live target where the kinematic model puts it now
+
+        Positions are a function of time rather than of the previous frame,
+        so late or dropped frames need no compensation and elapsed is unused.
+        """
+        if self.current_task != "target" or not self.target_field:  # No live targets
+            self.target_scheduler.stop()
             return
 
-        # Get current position
-        try:
-            coords = self.canvas.coords(self.target_id)
-            if not coords:  # Target was already removed
-                return
-        except tk.TclError:
-            return  # Canvas or target no longer exists
-
-        x1, y1, x2, y2 = coords
-        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
-
-        # Default if dimensions not yet set
-        if width <= 1:
-            width = 800
-        if height <= 1:
-            height = 600
-
-        # Bounce off edges
-        if x1 <= 0 or x2 >= width:
-            self.target_dx *= -1
-        if y1 <= 0 or y2 >= height:
-            self.target_dy *= -1
-
-        # Move target
-        self.canvas.move(self.target_id, self.target_dx, self.target_dy)
-
-        # Schedule next movement
-        self.target_move_job = self.root.after(20, self.move_target)  # Move every 20ms
-
-    def target_timeout_handler(self):
-        """Handle timeout when target is not clicked in time"""
-        if not self.target_id:
+        r = self.target_radius
+        for target, x, y in self.target_field.update(self.clock()):
+            self.canvas.coords(target.item, x - r, y - r, x + r, y + r)
+
+    def target_timeout_handler(self, item):
+        """Handle timeout when a target is not clicked in time"""
+        self.target_timeout_jobs.pop(item, None)
+        if self.target_field is None or self.target_field.remove(item) is None:
             return
 
-        try:
-            # Mark this target as missed
-            self.target_missed += 1
+        # Mark this target as missed
+        self.target_missed += 1
 
-            # Flash the target to indicate it was missed
-            self.canvas.itemconfig(self.target_id, fill='gray')
+        # Flash the target to indicate it was missed
+        self.canvas.itemconfig(item, fill='gray')
 
-            # Debug info
-            if self.debug_var.get():
-                self.debug_label.config(text=f"Target timed out. \nTotal missed: {self.target_missed}")
+        # Debug info
+        if self.debug_var.get():
+            self.debug_label.config(text=f"Target timed out. \nTotal missed: {self.target_missed}")
 
-            self.root.after(500, self.after_missed_target)
-        except tk.TclError:
-            # Target might have been deleted
-            self.after_missed_target()
+        self.root.after(500, self.after_missed_target, item)
 
-    def after_missed_target(self):
+    def after_missed_target(self, item):
         """Clean up after missing a target and create a new one"""
-        self.canvas.delete('target')
-        self.target_id = None
+        self.canvas.delete(item)
 
         # Create next target
         self.create_new_target()
 
+    def cancel_target_jobs(self):
+        """Stop the target animation and every pending target timeout"""
+        self.target_scheduler.stop()
+        for job in self.target_timeout_jobs.values():
+            self.root.after_cancel(job)
+        self.target_timeout_jobs = {}
+
     def on_mouse_down(self, event):
         """Handle mouse button press events for drawing tasks"""
-        if self.is_recording and self.current_task in ["square", "line"]:
+        t = self.event_time(event)
+        self.log_event("press", event, t)
+        if self.is_recording and self.current_task in self.drawing_tasks:
             self.is_drawing = True
-            self.movements.append([event.x, event.y, time.time() - self.start_time])
+            self.record_sample(event.x, event.y, t)
+            self.stroke_renderer.start_stroke(self.movements)
+            self.stroke_renderer.add_point()
 
     def on_mouse_up(self, event):
         """Handle mouse button release events"""
-        if self.is_recording and self.current_task in ["square", "line"]:
+        self.log_event("release", event, self.event_time(event))
+        if self.is_recording and self.current_task in self.drawing_tasks:
             self.is_drawing = False
+            self.stroke_renderer.end_stroke()
             self.analyze_current_task()  # Analyze the task when the user releases the mouse button
 
+            if self.debug_var.get():
+                self.debug_label.config(
+                    text=f"Samples: {len(self.movements)}, \nBuffer: {self.movements.nbytes / 1024:.1f} KB, "
+                         f"\n{self.event_clock.stats_text()}")
+
     def on_mouse_move(self, event):
         """Handle mouse movement events - only record if mouse button is pressed"""
-        if self.is_recording and self.current_task in ["square", "line"] and self.is_drawing:
-            self.movements.append([event.x, event.y, time.time() - self.start_time])
-            if len(self.movements) > 1:
-                prev = self.movements[-2]
-                self.canvas.create_line(prev[0], prev[1], event.x, event.y, fill='blue', width=2)
+        if self.is_recording and self.current_task in self.drawing_tasks and self.is_drawing:
+            t = self.event_time(event)
+            self.log_event("motion", event, t)
+            self.record_sample(event.x, event.y, t)
+            self.stroke_renderer.add_point()
+            self.update_live_metrics()
+
+    def event_time(self, event):
+        """When an input event happened on self.clock, from its event.time rather than handler time"""
+        return self.event_clock.stamp(getattr(event, "time", None), self.clock())
+
+    def log_event(self, kind, event, t=None):
+        """Keep an input event for replay while a test is running"""
+        if self.current_task is not None:
+            self.event_log.append({"t": self.clock() if t is None else t, "type": kind, "x": event.x, "y": event.y})
+
+    def record_sample(self, x, y, t=None):
+        """Store a drawing sample and fold it into the running metrics; t is the event time on self.clock"""
+        t = (self.clock() if t is None else t) - self.start_time
+        self.movements.append(x, y, t)
+        self.online_metrics.add(x, y, t)
+
+    def update_live_metrics(self):
+        """Show the running score while drawing, throttled to keep event handling cheap"""
+        now = self.clock()
+        if now - self.last_live_update < self.live_update_interval:
+            return
+        self.last_live_update = now
+
+        live = self.online_metrics.result()
+        if live is None:
+            return
+        text = (f"{self.current_task.capitalize()} Task (live)\nDeviation: {live['mse']:.2f}\n"
+                f"Time: {live['time_taken']:.2f} sec\nSmoothness: {live['smoothness']:.2f}/10")
+
+        # Sliding window over the last few seconds shows steadiness changing during the task
+        recent = self.online_metrics.recent()
+        if recent["velocity"] is not None:
+            text += (f"\n\nLast {self.online_metrics.window_sec:g} sec:\n"
+                     f"Deviation (RMS): {recent['deviation']:.2f}\nSpeed: {recent['velocity']:.0f} px/s\n"
+                     f"Smoothness: {recent['smoothness']:.2f}/10")
+        self.result_label.config(text=text)
 
     def on_target_click(self, event):
-        """Dedicated handler for clicking targets"""
-        if self.current_task != "target" or not self.target_id:
+        """Dedicated handler for clicking targets
+
+        The click is resolved against the kinematic model at the event's own
+        time through the field's grid index; the canvas is never queried.
+        """
+        if self.current_task != "target" or not self.target_field:
             return
 
         # Show where user clicked (debug)
@@ -433,81 +693,66 @@ class TaskBasedAnalyzer:
                                     fill='yellow', outline='black', tags='click_marker')
             self.root.after(500, lambda: self.canvas.delete('click_marker'))
 
-        try:
-            # Get target coordinates
-            target_coords = self.canvas.coords(self.target_id)
+        t = self.event_time(event)
+        # Hit detection - slightly larger than visual radius for better UX (see HIT_GRACE)
+        target, distance = self.target_field.hit_test(event.x, event.y, t)
+
+        if target is not None:
+            # Success - calculate reaction time
+            click_time = t - target.t0
+            self.target_click_times.append(click_time)
+            self.targets_clicked += 1
+
+            # Stop tracking it (prevents double-click issues) and cancel its timeout
+            self.target_field.remove(target.item)
+            job = self.target_timeout_jobs.pop(target.item, None)
+            if job:
+                self.root.after_cancel(job)
+
+            # Visual feedback, with the target pinned where it was clicked
+            target_x, target_y = target.position(t)
+            r = self.target_radius
+            self.canvas.coords(target.item, target_x - r, target_y - r, target_x + r, target_y + r)
+            self.canvas.itemconfig(target.item, fill='green')
+            self.canvas.create_text(target_x, target_y, text=f"{click_time:.2f}s",
+                                    tags=("hit_time", f"hit_time_{target.item}"), font=('Arial', 10, 'bold'))
 
-            if not target_coords or not self.target_appear_time:
-                return
+            # Debug info
+            if self.debug_var.get():
+                self.debug_label.config(
+                    text=f"Target hit! \nTime: {click_time:.2f}s, Distance: {distance:.1f}, "
+                         f"\nTotal hits: {self.targets_clicked}")
 
-            x1, y1, x2, y2 = target_coords
-            target_x = (x1 + x2) / 2
-            target_y = (y1 + y2) / 2
+            # Schedule cleanup and next target
+            self.root.after(800, self.clear_hit_animation, target.item)
+        else:
+            # User clicked but missed every target
+            self.target_missed += 1
 
-            # Calculate distance from click to target center
-            distance = math.sqrt((event.x - target_x) ** 2 + (event.y - target_y) ** 2)
+            # Visual feedback for miss, pointing at the closest target
+            self.canvas.create_oval(
+                event.x - 5, event.y - 5, event.x + 5, event.y + 5,
+                fill='red', outline='black', tags='miss_marker'
+            )
+            nearest, distance = self.target_field.nearest(event.x, event.y, t)
+            target_x, target_y = nearest.position(t)
+            self.canvas.create_line(
+                event.x, event.y, target_x, target_y,
+                fill='red', dash=(2, 2), tags='miss_marker'
+            )
 
             # Debug info
             if self.debug_var.get():
                 self.debug_label.config(
-                    text=f"Click at ({event.x}, {event.y}), \nTarget at ({target_x:.1f}, {target_y:.1f}), "
-                         f"Distance: {distance:.1f}, \nRadius: {self.target_radius}")
-
-            # Hit detection - slightly larger than visual radius for better UX
-            if distance <= self.target_radius + 5:  # 5px grace margin
-                # Success - calculate reaction time
-                click_time = time.time() - self.target_appear_time
-                self.target_click_times.append(click_time)
-                self.targets_clicked += 1
-
-                # Cancel timeout
-                if self.target_timeout_job:
-                    self.root.after_cancel(self.target_timeout_job)
-                    self.target_timeout_job = None
-
-                # Visual feedback
-                self.canvas.itemconfig(self.target_id, fill='green')
-                self.canvas.create_text(target_x, target_y, text=f"{click_time:.2f}s",
-                                        tags="hit_time", font=('Arial', 10, 'bold'))
-
-                # Debug info
-                if self.debug_var.get():
-                    self.debug_label.config(
-                        text=f"Target hit! \nTime: {click_time:.2f}s, \nTotal hits: {self.targets_clicked}")
-
-                # Schedule cleanup and next target
-                self.target_id = None  # Prevent double-click issues
-                self.root.after(800, self.clear_hit_animation)
-            else:
-                # User clicked but missed the target
-                self.target_missed += 1
-
-                # Visual feedback for miss
-                miss_marker = self.canvas.create_oval(
-                    event.x - 5, event.y - 5, event.x + 5, event.y + 5,
-                    fill='red', outline='black', tags='miss_marker'
-                )
-                self.canvas.create_line(
-                    event.x, event.y, target_x, target_y,
-                    fill='red', dash=(2, 2), tags='miss_marker'
-                )
-
-                # Debug info
-                if self.debug_var.get():
-                    self.debug_label.config(
-                        text=f"Target missed! \nDistance: {distance:.2f}px, \nTotal misses: {self.target_missed}")
-
-                # Clear miss marker after a short delay
-                self.root.after(500, lambda: self.canvas.delete('miss_marker'))
-
-        except tk.TclError:
-            # Handle case where target was removed
-            pass
-
-    def clear_hit_animation(self):
-        """Clear hit animation and time display"""
-        self.canvas.delete('target')
-        self.canvas.delete('hit_time')
+                    text=f"Target missed! \nDistance: {distance:.2f}px, \nTotal misses: {self.target_missed}")
+
+            # Clear miss marker after a short delay
+            self.root.after(500, lambda: self.canvas.delete('miss_marker'))
+
+    def clear_hit_animation(self, item):
+        """Clear a hit target and its time display"""
+        self.canvas.delete(item)
+        self.canvas.delete(f"hit_time_{item}")
         self.canvas.delete('miss_marker')  # Clear any miss markers
 
         # Create next target
@@ -519,146 +764,152 @@ class TaskBasedAnalyzer:
             self.analyze_line_task()
         elif self.current_task == "square":
             self.analyze_square_task()
+        elif self.current_task in TEMPLATE_BUILDERS:
+            self.analyze_template_task(self.current_task)
 
     def analyze_line_task(self):
         """Analyze the Follow Line task"""
-        if len(self.movements) < 3:
+        # Metrics were accumulated sample by sample, so no need to re-walk self.movements
+        line = self.online_metrics.result()
+        if line is None:
             self.line_status.config(text="Line Test: Invalid (too few points)")
             return
-
-        # Target horizontal line is at height/2 (300)
-        y_target = 300
-
-        # Calculate distances from each point to the target line
-        distances = [abs(y - y_target) for _, y, _ in self.movements]
-
-        # Calculate mean squared error
-        mse = np.mean([d ** 2 for d in distances])
-
-        # Calculate smoothness using the new method
-        smoothness = self.calculate_smoothness(self.movements)
-
-        # Calculate time taken to complete the task
-        time_taken = self.movements[-1][2] - self.movements[0][2]
-
-        # Store results
-        self.results["line"]["mse"] = mse
-        self.results["line"]["time_taken"] = time_taken
-        self.results["line"]["smoothness"] = smoothness
+        recording = self.movements.view().copy()
+        tremor = self.engine.drawing_tremor(recording) or dict.fromkeys(TREMOR_METRICS)
+        line = self.engine.store_result("line", {**line, **tremor})
+        self.store_recording("line", recording)
+        self.show_deviation_heatmap("line", recording)
 
         # Display results
         self.result_label.config(
-            text=f"Line Task Complete\nDeviation: {mse:.2f}\nTime Taken: {time_taken:.2f} sec\nSmoothness: {smoothness:.2f}/10")
+            text=f"Line Task Complete\nDeviation: {line['mse']:.2f}\nTime Taken: {line['time_taken']:.2f} sec\n"
+                 f"Smoothness: {line['smoothness']:.2f}/10")
         self.line_status.config(text="Line Test: Completed ✓")
 
     def analyze_square_task(self):
         """Analyze the Draw Square task"""
-        if len(self.movements) < 3:
+        square = self.online_metrics.result()
+        if square is None:
             self.square_status.config(text="Square Test: Invalid (too few points)")
             return
-
-        center_x, center_y = 400, 300
-        side_length = 160
-
-        # Calculate the square corners
-        x1 = center_x - side_length / 2
-        y1 = center_y - side_length / 2
-        x2 = center_x + side_length / 2
-        y2 = center_y + side_length / 2
-
-        # Calculate deviation from the square edges
-        distances = []
-        for x, y, _ in self.movements:
-            # Distance calculations to each edge (when within the x/y bounds of that edge)
-            dist_left = abs(x - x1) if y1 <= y <= y2 else float('inf')
-            dist_right = abs(x - x2) if y1 <= y <= y2 else float('inf')
-            dist_top = abs(y - y1) if x1 <= x <= x2 else float('inf')
-            dist_bottom = abs(y - y2) if x1 <= x <= x2 else float('inf')
-
-            # Distance to corners (Pythagorean theorem)
-            dist_top_left = math.sqrt((x - x1) ** 2 + (y - y1) ** 2)
-            dist_top_right = math.sqrt((x - x2) ** 2 + (y - y1) ** 2)
-            dist_bottom_left = math.sqrt((x - x1) ** 2 + (y - y2) ** 2)
-            dist_bottom_right = math.sqrt((x - x2) ** 2 + (y - y2) ** 2)
-
-            # Find the minimum distance
-            min_dist = min(
-                dist_left, dist_right, dist_top, dist_bottom,
-                dist_top_left, dist_top_right, dist_bottom_left, dist_bottom_right
-            )
-
-            distances.append(min_dist)
-
-        # Calculate mean squared error
-        mse = np.mean([d ** 2 for d in distances])
-
-        # Calculate smoothness using the new method
-        smoothness = self.calculate_smoothness(self.movements)
-
-        # Calculate time taken to complete the task
-        time_taken = self.movements[-1][2] - self.movements[0][2]
-
-        # Store results
-        self.results["square"]["mse"] = mse
-        self.results["square"]["time_taken"] = time_taken
-        self.results["square"]["smoothness"] = smoothness
+        recording = self.movements.view().copy()
+        tremor = self.engine.drawing_tremor(recording) or dict.fromkeys(TREMOR_METRICS)
+        square = self.engine.store_result("square", {**square, **tremor})
+        self.store_recording("square", recording)
+        self.show_deviation_heatmap("square", recording)
 
         # Display results
         self.result_label.config(
-            text=f"Square Task Complete\nDeviation: {mse:.2f}\nTime Taken: {time_taken:.2f} sec\nSmoothness: {smoothness:.2f}/10")
+            text=f"Square Task Complete\nDeviation: {square['mse']:.2f}\nTime Taken: {square['time_taken']:.2f} sec\n"
+                 f"Smoothness: {square['smoothness']:.2f}/10")
         self.square_status.config(text="Square Test: Completed ✓")
 
-    def calculate_smoothness(self, movements):
-        """Calculate drawing smoothness based on velocity changes"""
-        if len(movements) < 3:
-            return 5.0  # Default value for very few points
-
-        # Calculate velocities
-        velocities = []
-        for i in range(1, len(movements)):
-            x1, y1, t1 = movements[i - 1]
-            x2, y2, t2 = movements[i]
+    def analyze_template_task(self, name):
+        """Analyze a template tracing task"""
+        label = get_template(name).label
+        result = self.online_metrics.result()
+        if result is None:
+            self.template_status[name].config(text=f"{label} Test: Invalid (too few points)")
+            return
+        recording = self.movements.view().copy()
+        tremor = self.engine.drawing_tremor(recording) or dict.fromkeys(TREMOR_METRICS)
+        result = self.engine.store_result(name, {**result, **tremor})
+        self.store_recording(name, recording)
+        self.show_deviation_heatmap(name, recording)
 
-            # Skip if time difference is too small
-            if abs(t2 - t1) < 0.001:
+        # Display results
+        self.result_label.config(
+            text=f"{label} Task Complete\nDeviation: {result['mse']:.2f}\nTime Taken: {result['time_taken']:.2f} sec\n"
+                 f"Smoothness: {result['smoothness']:.2f}/10")
+        self.template_status[name].config(text=f"{label} Test: Completed ✓")
+
+    def show_deviation_heatmap(self, task, recording):
+        """Overlay the finished drawing coloured by its deviation from the template
+
+        The whole heatmap is one image item, so it costs the canvas the same
+        whether the drawing has a hundred samples or a hundred thousand.
+        """
+        rgba = rasterize(recording, task_deviations(task, recording), self.canvas_width, self.canvas_height)
+        rgba, left, top = crop_to_content(rgba)
+        self.heatmap_image = self.make_photo(photo_data(rgba))  # Tk drops images nothing references
+        self.canvas.delete('heatmap')
+        self.canvas.create_image(left, top, anchor='nw', image=self.heatmap_image, tags='heatmap')
+        self.canvas.create_text(10, self.canvas_height - 20, anchor='w', tags='heatmap', font=('Arial', 9),
+                                text="Deviation: green = on the path, red = 30 px or more off")
+
+    def make_photo(self, data):
+        return tk.PhotoImage(data=data, format="png")
+
+    def store_recording(self, task, recording):
+        """Keep a completed test's raw data; any new result starts a new saved session"""
+        self.recordings[task] = recording
+        self.saved_session_id = None
+        self.pending_save = None
+
+    def save_session(self):
+        """Save the current diagnosis once: event log, trend entry, recordings and norms
+
+        Every part is written under one session ID minted up front, the event
+        log and trend entry first. A failing part does not stop the others;
+        the debug panel then lists exactly which parts were saved, and the
+        next call retries only the missing ones under the same ID. The norms
+        ignore an ID they already hold and keep a failed add out of their
+        sketches, so a retried norms save counts the session once.
+        """
+        if self.session_store is None or self.saved_session_id is not None:
+            return
+        if self.pending_save is None:
+            self.pending_save = (uuid.uuid4().hex, set())
+        session_id, saved = self.pending_save
+        session = dict(self.recordings, age=self.patient_age())
+
+        parts = {"event log": lambda: self.write_event_log(session_id)}
+        if self.trends is not None and self.patient_id():
+            parts["trend"] = lambda: self.trends.append(self.patient_id(), self.results, session_id=session_id)
+        parts["session store"] = lambda: self.session_store.append(session, session_id)
+        if self.norms is not None:
+            parts["norms"] = lambda: self.norms.add_session(session_id, self.results, age=session["age"])
+
+        errors = []
+        for part, save in parts.items():
+            if part in saved:
                 continue
+            try:
+                save()
+            except (OSError, ValueError, sqlite3.Error) as exc:  # ValueError includes out-of-order trend times
+                errors.append(f"{part}: {exc}")
+                continue
+            saved.add(part)
 
-            # Calculate velocity (distance/time)
-            distance = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-            velocity = distance / (t2 - t1)
-            velocities.append(velocity)
-
-        if len(velocities) < 2:
-            return 5.0
-
-        # Calculate acceleration (changes in velocity)
-        accelerations = [abs(velocities[i] - velocities[i - 1]) for i in range(1, len(velocities))]
-
-        # Calculate normalized jerk (rate of change of acceleration)
-        # Lower jerk indicates smoother movement
-        if len(accelerations) < 2:
-            mean_jerk = 0
-        else:
-            jerks = [abs(accelerations[i] - accelerations[i - 1]) for i in range(1, len(accelerations))]
-            mean_jerk = np.mean(jerks) if jerks else 0
-
-        # Normalize jerk to a 0-10 scale (inverted so higher is smoother)
-        # Using exponential decay function to map jerk to smoothness
-        smoothness = 10 * math.exp(-mean_jerk / 50)
+        if errors:
+            written = ", ".join(part for part in parts if part in saved) or "nothing"
+            self.debug_label.config(text=f"Session {session_id} partly saved ({written}).\nNot saved:\n"
+                                         + "\n".join(errors))
+            return
+        self.saved_session_id = session_id
+        self.pending_save = None
 
-        # Ensure bounds
-        return max(0, min(10, smoothness))
+    def write_event_log(self, session_id):
+        """Write the raw input events next to the store so the session can be replayed"""
+        events_dir = os.path.join(self.session_store.path, "events")
+        os.makedirs(events_dir, exist_ok=True)
+        with open(os.path.join(events_dir, f"{session_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(self.event_log, f)
+        self.event_log = []
 
+    def calculate_smoothness(self, movements):
+        """Calculate drawing smoothness based on velocity changes"""
+        return calculate_smoothness(movements)
 
     def analyze_target_task(self):
         """Analyze the Click Targets task"""
-        # Cancel any active target jobs
-        if self.target_move_job:
-            self.root.after_cancel(self.target_move_job)
-            self.target_move_job = None
-        if self.target_timeout_job:
-            self.root.after_cancel(self.target_timeout_job)
-            self.target_timeout_job = None
+        # Cancel any active target jobs; late cleanups then find no field and do nothing
+        self.cancel_target_jobs()
+        self.target_field = None
+
+        # Debug info
+        if self.debug_var.get():
+            self.debug_label.config(text=self.target_scheduler.stats_text())
 
         # Clear canvas elements related to target task
         self.canvas.delete('target')
@@ -672,16 +923,12 @@ class TaskBasedAnalyzer:
             self.result_label.config(text="Target Task: No successful clicks recorded")
             return
 
-        # Calculate the average reaction time
-        avg_time = np.mean(self.target_click_times)
-
-        # Calculate standard deviation
-        std_dev = np.std(self.target_click_times) if len(self.target_click_times) > 1 else 0
+        target = self.engine.analyze_target_task(self.target_click_times, self.target_missed)
+        avg_time, std_dev = target["avg_time"], target["std_dev"]
+        self.store_recording("target", {"points": list(self.target_points),
+                                        "click_times": list(self.target_click_times),
+                                        "missed": self.target_missed})
 
-        # Store results
-        self.results["target"]["avg_time"] = avg_time
-        self.results["target"]["std_dev"] = std_dev
-        self.results["target"]["missed"] = self.target_missed
         result_text = (f"Target Task Complete\n"
                        f"Targets Hit: {self.targets_clicked} / Missed: {self.target_missed}\n"
                        f"Average Reaction Time: {avg_time:.2f} sec\n"
@@ -693,7 +940,7 @@ class TaskBasedAnalyzer:
     def display_final_diagnosis(self):
         """Display final diagnosis based on all test results"""
         # Check if all tests have been completed
-        if any(self.results[test][key] is None for test in self.tests for key in self.results[test]):
+        if not self.engine.is_complete():
             incomplete_tests = []
             if self.results["line"]["mse"] is None:
                 incomplete_tests.append("Line")
@@ -706,43 +953,54 @@ class TaskBasedAnalyzer:
                 text=f"Please complete all tests before diagnosis.\nIncomplete tests: {', '.join(incomplete_tests)}")
             return
 
+        # Compare against earlier users before this session joins the norms
+        norms_text = self.norms_summary()
+
+        # Archive the raw recordings for later re-analysis
+        self.save_session()
+
         # Calculate overall risk score
         risk_score = self.calculate_risk_score()
 
         # Determine risk level
-        if risk_score < 3:
-            risk_level = "Low"
-            color = "green"
-        elif risk_score < 6:
-            risk_level = "Moderate"
-            color = "orange"
-        else:
-            risk_level = "High"
-            color = "red"
+        level, color = risk_level(risk_score)
 
         # Get recommended foods based on risk level
-        food_recs = self.food_recommendations[risk_level.lower()]
+        food_recs = self.food_recommendations[level.lower()]
 
         # Create a formatted list of food recommendations
         food_text = "\n".join([f"• {food}" for food in food_recs[:5]])
 
+        # Template tests are optional extras; list the ones that were completed
+        template_text = "".join(
+            f"{get_template(name).label} Test Results:\n"
+            f"  - Deviation from Path: {self.results[name]['mse']:.1f} px²\n"
+            f"  - Drawing Smoothness: {self.results[name]['smoothness']:.1f}/10\n"
+            f"  - {self.tremor_summary(name)}\n\n"
+            for name in TEMPLATE_BUILDERS if name in self.results)
+
         # Display comprehensive results
         diagnosis_text = (
             f"PARKINSON'S RISK ASSESSMENT\n\n"
-            f"Overall Risk Level: {risk_level} (Score: {risk_score:.1f}/10)\n\n"
+            f"Overall Risk Level: {level} (Score: {risk_score:.1f}/10)\n\n"
             f"Line Test Results:\n"
             f"  - Deviation from Path: {self.results['line']['mse']:.1f} px²\n"
             f"  - Drawing Smoothness: {self.results['line']['smoothness']:.1f}/10\n"
-            f"  - Completion Time: {self.results['line']['time_taken']:.1f} sec\n\n"
+            f"  - Completion Time: {self.results['line']['time_taken']:.1f} sec\n"
+            f"  - {self.tremor_summary('line')}\n\n"
             f"Square Test Results:\n"
             f"  - Deviation from Path: {self.results['square']['mse']:.1f} px²\n"
             f"  - Drawing Smoothness: {self.results['square']['smoothness']:.1f}/10\n"
-            f"  - Completion Time: {self.results['square']['time_taken']:.1f} sec\n\n"
+            f"  - Completion Time: {self.results['square']['time_taken']:.1f} sec\n"
+            f"  - {self.tremor_summary('square')}\n\n"
             f"Target Test Results:\n"
             f"  - Average Reaction Time: {self.results['target']['avg_time']:.2f} sec\n"
             f"  - Consistency (StdDev): {self.results['target']['std_dev']:.2f} sec\n"
             f"  - Targets Missed: {self.results['target']['missed']}\n\n"
-            f"Recommended Foods for {risk_level} Risk:\n{food_text}\n\n"
+            f"{template_text}"
+            f"{norms_text}"
+            f"{self.trend_summary()}"
+            f"Recommended Foods for {level} Risk:\n{food_text}\n\n"
             f"DISCLAIMER: This is not a medical diagnosis. Please consult with a healthcare professional for proper evaluation."
         )
 
@@ -750,32 +1008,81 @@ class TaskBasedAnalyzer:
 
         # Clear canvas and show visualization of results
         self.canvas.delete("all")
+        self.stroke_renderer.reset()
         self.visualize_results()
 
+    def norms_summary(self):
+        """Diagnosis section placing the core metrics among earlier users, once there are enough of them"""
+        if self.norms is None:
+            return ""
+        percentiles = self.norms.percentiles(self.results, self.patient_age())
+        lines = [f"  - {label}: higher than {percentiles[metric]:.0f}% of users\n"
+                 for metric, label in self.NORM_METRICS if metric in percentiles]
+        if not lines:
+            return ""
+        return "Compared with Other Users:\n" + "".join(lines) + "\n"
+
+    def patient_id(self):
+        return self.patient_var.get().strip()
+
+    def patient_age(self):
+        """Age entered for the patient in whole years, or None if blank or not a plausible age"""
+        text = self.age_var.get().strip()
+        if not text.isdigit() or not 0 < int(text) < 130:
+            return None
+        return int(text)
+
+    def trend_summary(self):
+        """Diagnosis section with the patient's rolling means and monthly change, from the stored aggregates"""
+        if self.trends is None or not self.patient_id():
+            return ""
+        trend = self.trends.trend(self.patient_id())
+        lines = []
+        for metric, label in self.TREND_PANEL:
+            summary = trend.get(metric)
+            if summary is None or summary["n"] < 2:
+                continue
+            lines.append(f"  - {label}: {summary['rolling_mean']:.2f} recent average, "
+                         f"{summary['slope_per_month']:+.2f} per month over {summary['n']} sessions\n")
+        if not lines:
+            return ""
+        return f"Trend for Patient {self.patient_id()}:\n" + "".join(lines) + "\n"
+
+    def draw_trend_panel(self, top=560, height=120, points=30):
+        """Sparklines of the patient's latest sessions under the results visualization"""
+        if self.trends is None or not self.patient_id():
+            return
+        width = 200
+        for column, (metric, label) in enumerate(self.TREND_PANEL[:3]):
+            times, values = self.trends.series(self.patient_id(), metric, limit=points)
+            left = 60 + column * (width + 40)
+            self.canvas.create_text(left + width / 2, top, text=f"{label} ({len(values)} sessions)",
+                                    font=('Arial', 10, 'bold'))
+            self.canvas.create_rectangle(left, top + 15, left + width, top + 15 + height, outline='gray')
+            if len(values) < 2:
+                continue
+            # Sessions are evenly spaced left to right; the value range fills the box
+            low, high = values.min(), values.max()
+            span = (high - low) or 1.0
+            xs = left + width * (np.arange(len(values)) / (len(values) - 1))
+            ys = top + 15 + height - 5 - (height - 10) * (values - low) / span
+            self.canvas.create_line(*np.column_stack((xs, ys)).ravel().tolist(), fill='blue', width=2)
+            self.canvas.create_text(left + width, top + 25 + height, anchor='e', font=('Arial', 8),
+                                    text=f"{low:.2f} - {high:.2f}")
+
+    def tremor_summary(self, task):
+        """One diagnosis line describing a drawing's 4-6 Hz tremor"""
+        result = self.results[task]
+        if not self.engine.tremor_metrics:
+            return "Tremor (4-6 Hz): not computed"
+        if result.get("tremor_power") is None:
+            return "Tremor (4-6 Hz): recording too short"
+        return (f"Tremor (4-6 Hz): {result['tremor_power']:.2f} px², {result['tremor_ratio']:.0%} of movement, "
+                f"peak {result['tremor_peak_hz']:.1f} Hz")
+
     def calculate_risk_score(self):
         """Calculate overall risk score from all test results"""
-        # Line test score (higher MSE and lower smoothness increase risk)
-        line_mse_score = min(5, self.results["line"]["mse"] / 100)
-        line_smoothness_score = max(0, 5 - self.results["line"]["smoothness"] / 2)
-
-        # Square test score (higher MSE and lower smoothness increase risk)
-        square_mse_score = min(5, self.results["square"]["mse"] / 100)
-        square_smoothness_score = max(0, 5 - self.results["square"]["smoothness"] / 2)
-
-        # Target test score (higher reaction time and more misses increase risk)
-        target_time_score = min(5, self.results["target"]["avg_time"] * 2)
-        target_miss_score = min(5, self.results["target"]["missed"])
-
-        # Combine scores with different weights
-        line_score = (line_mse_score * 0.6) + (line_smoothness_score * 0.4)
-        square_score = (square_mse_score * 0.6) + (square_smoothness_score * 0.4)
-        target_score = (target_time_score * 0.7) + (target_miss_score * 0.3)
-
-        # Overall score (weighted average)
-        overall_score = (line_score * 0.35) + (square_score * 0.35) + (target_score * 0.3)
-
-        # Scale to 0-10
-        return min(10, overall_score * 2)
+        return self.engine.calculate_risk_score()
 
     def visualize_results(self):
         """Create visualization of test results"""
@@ -828,15 +1135,7 @@ class TaskBasedAnalyzer:
         risk_score = self.calculate_risk_score()
 
         # Determine risk level and color
-        if risk_score < 3:
-            risk_level = "LOW RISK"
-            color = "green"
-        elif risk_score < 6:
-            risk_level = "MODERATE RISK"
-            color = "orange"
-        else:
-            risk_level = "HIGH RISK"
-            color = "red"
+        level, color = risk_level(risk_score)
 
         # Draw semicircular risk meter
         center_x, center_y = 400, 500
@@ -854,11 +1153,14 @@ class TaskBasedAnalyzer:
                                start=180, extent=risk_angle, fill=color, outline='')
 
         # Draw risk score text
-        self.canvas.create_text(center_x, center_y - 30, text=f"{risk_level}",
+        self.canvas.create_text(center_x, center_y - 30, text=f"{level.upper()} RISK",
                                 font=('Arial', 16, 'bold'), fill=color)
         self.canvas.create_text(center_x, center_y, text=f"Score: {risk_score:.1f}/10",
                                 font=('Arial', 12), fill=color)
 
+        # Patient history under the meter
+        self.draw_trend_panel()
+
     def run(self):
         """Start the main application loop"""
         self.root.mainloop()
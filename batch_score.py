@@ -0,0 +1,262 @@
+"""Score a directory of recorded sessions without opening the GUI.
+
+Each session file is JSON shaped like::
+
+    {"id": "optional-id",
+     "line": [[x, y, t], ...],
+     "square": [[x, y, t], ...],
+     "target": {"click_times": [...], "missed": 0}}
+
+One JSON line per session is written to stdout (or --output).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from result_cache import ResultCache
+from scoring import MAX_RESAMPLE_HZ, ScoringEngine, checked_session, risk_level
+from session_store import SessionStore, SessionStoreError
+
+CHUNK_SIZE = 256  # Sessions per batched ScoringEngine.score_sessions call on the serial path
+# Errors a malformed session raises while being scored
+SESSION_ERRORS = (ValueError, KeyError, TypeError)
+
+# parallel_score (multiprocessing) is imported only when --workers asks for it,
+# keeping start-up cheap for short-lived serial runs
+
+
+def iter_session_files(directory, suffix=".json"):
+    """Yield session file paths in a stable (sorted) order"""
+    with os.scandir(directory) as entries:
+        paths = sorted(entry.path for entry in entries if entry.is_file() and entry.name.endswith(suffix))
+    yield from paths
+
+
+def load_session(path):
+    """Read one session file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def to_builtin(results):
+    """Convert numpy scalars in a results dict to plain Python numbers for JSON"""
+    return {test: {key: (value.item() if hasattr(value, "item") else value) for key, value in metrics.items()}
+            for test, metrics in results.items()}
+
+
+def score_record(engine, session, session_id):
+    """Score one session and build its output record"""
+    results, risk_score = engine.score_session(session)
+    return build_record(session.get("id", session_id), results, risk_score, session.get("age"))
+
+
+def build_record(session_id, results, risk_score, age=None):
+    """Output record for one scored session (age in years, None when unknown, for normative_db)"""
+    record = {"id": session_id, "age": age, "results": to_builtin(results),
+              "risk_score": None, "risk_level": None}
+    if risk_score is not None:
+        record["risk_score"] = float(risk_score)
+        record["risk_level"] = risk_level(risk_score)[0]
+    return record
+
+
+def checked_sessions(sessions):
+    """Yield (session_id, checked_session(session)), reporting and skipping malformed sessions"""
+    for session_id, session in sessions:
+        try:
+            yield session_id, checked_session(session)
+        except SESSION_ERRORS as exc:
+            print(f"{session_id}: skipped ({exc})", file=sys.stderr)
+
+
+def score_chunk(engine, chunk, out):
+    """Score [(session_id, session)] with one batched engine call and write their records
+
+    Sessions that fail checked_session are reported and skipped first, as on
+    the parallel path. If the batch still fails, the chunk is scored again one
+    session at a time so only the bad ones are reported and skipped.
+    Returns (scored, failed).
+    """
+    rejected = len(chunk)
+    chunk = list(checked_sessions(chunk))
+    rejected -= len(chunk)
+    try:
+        scored = engine.score_sessions([session for _, session in chunk])
+    except SESSION_ERRORS:
+        scored = None
+    if scored is not None:
+        for (session_id, session), (results, risk_score) in zip(chunk, scored):
+            out.write(json.dumps(build_record(session_id, results, risk_score, session.get("age"))) + "\n")
+        return len(chunk), rejected
+
+    done, failed = 0, rejected
+    for session_id, session in chunk:
+        try:
+            record = score_record(engine, session, session_id)
+        except SESSION_ERRORS as exc:
+            print(f"{session_id}: skipped ({exc})", file=sys.stderr)
+            failed += 1
+            continue
+        out.write(json.dumps(record) + "\n")
+        done += 1
+    return done, failed
+
+
+def score_stream(sessions, out, resample_hz=None, cache=None, norms=None, chunk_size=CHUNK_SIZE,
+                 tremor_weight=0.0, tremor_metrics=False):
+    """Score (session_id, session) pairs through one engine in batched chunks; returns (scored, failed)"""
+    engine = ScoringEngine(resample_hz=resample_hz, cache=cache, norms=norms, tremor_weight=tremor_weight,
+                           tremor_metrics=tremor_metrics)
+    scored = failed = 0
+    chunk = []
+    for pair in sessions:
+        chunk.append(pair)
+        if len(chunk) == chunk_size:
+            done, bad = score_chunk(engine, chunk, out)
+            scored, failed, chunk = scored + done, failed + bad, []
+    if chunk:
+        done, bad = score_chunk(engine, chunk, out)
+        scored, failed = scored + done, failed + bad
+    return scored, failed
+
+
+def score_directory(directory, out, suffix=".json", resample_hz=None, cache=None, norms=None, tremor_weight=0.0,
+                    tremor_metrics=False):
+    """Stream every session in directory through one engine; returns (scored, failed)"""
+    unreadable = []
+    scored, failed = score_stream(iter_directory(directory, suffix, unreadable), out, resample_hz, cache, norms,
+                                  tremor_weight=tremor_weight, tremor_metrics=tremor_metrics)
+    return scored, failed + len(unreadable)
+
+
+def score_store(path, out, resample_hz=None, cache=None, norms=None, tremor_weight=0.0, tremor_metrics=False):
+    """Re-score every session in a SessionStore straight from its memory maps"""
+    sessions = ((session["id"], session) for session in SessionStore(path, create=False).iter_sessions())
+    return score_stream(sessions, out, resample_hz, cache, norms, tremor_weight=tremor_weight,
+                        tremor_metrics=tremor_metrics)
+
+
+def score_parallel(sessions, out, workers, resample_hz=None, cache_dir=None, norms_path=None, tremor_weight=0.0,
+                   tremor_metrics=False):
+    """Score (session_id, session) pairs on a process pool and write records in order
+
+    Malformed sessions are reported and skipped before packing. Returns (scored, failed).
+    """
+    from parallel_score import score_sessions_parallel
+
+    ids, checked = [], []
+    for session_id, session in checked_sessions(sessions):
+        ids.append(session_id)
+        checked.append(session)
+    scored = score_sessions_parallel(checked, workers, resample_hz, cache_dir=cache_dir, norms_path=norms_path,
+                                     tremor_weight=tremor_weight, tremor_metrics=tremor_metrics)
+    for session_id, session, (results, risk_score) in zip(ids, checked, scored):
+        out.write(json.dumps(build_record(session_id, results, risk_score, session.get("age"))) + "\n")
+    return len(scored), len(sessions) - len(scored)
+
+
+def iter_directory(directory, suffix=".json", unreadable=None):
+    """Yield (session_id, session) for every parseable session file; paths that fail go to unreadable"""
+    for path in iter_session_files(directory, suffix):
+        try:
+            session = load_session(path)
+        except (OSError, ValueError) as exc:
+            print(f"{path}: skipped ({exc})", file=sys.stderr)
+            if unreadable is not None:
+                unreadable.append(path)
+            continue
+        if not isinstance(session, dict):
+            print(f"{path}: skipped (expected a session object, got {type(session).__name__})", file=sys.stderr)
+            if unreadable is not None:
+                unreadable.append(path)
+            continue
+        yield session.get("id", os.path.splitext(os.path.basename(path))[0]), session
+
+
+def load_directory(directory, suffix=".json"):
+    """Load every parseable session file; returns ([(session_id, session)], failed)"""
+    unreadable = []
+    sessions = list(iter_directory(directory, suffix, unreadable))
+    return sessions, len(unreadable)
+
+
+def add_tremor_arguments(parser):
+    """--tremor-weight and --tremor-metrics, shared by the scoring CLIs"""
+    parser.add_argument("--tremor-weight", type=float, default=0.0,
+                        help="Share of the risk score given to 4-6 Hz tremor (default 0; implies --tremor-metrics)")
+    parser.add_argument("--tremor-metrics", action="store_true",
+                        help="Compute the spectral tremor metrics (one FFT per drawing; skipped by default)")
+
+
+def resample_rate(text):
+    """argparse type for --resample-hz: a rate below MAX_RESAMPLE_HZ
+
+    Faster grids have steps under the 1 ms the smoothness score drops.
+    """
+    rate = float(text)
+    if not 0 < rate < MAX_RESAMPLE_HZ:
+        raise argparse.ArgumentTypeError(f"must be above 0 and below {MAX_RESAMPLE_HZ:g} Hz")
+    return rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score recorded Parkinson's test sessions in batch")
+    parser.add_argument("directory", help="Directory of session .json files (or a session store with --store)")
+    parser.add_argument("-o", "--output", help="Write JSON lines here instead of stdout")
+    parser.add_argument("--store", action="store_true",
+                        help="Treat directory as a session store written by the GUI")
+    parser.add_argument("--suffix", default=".json", help="Session file suffix (default: .json)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Score on this many processes (0 = one per CPU core)")
+    parser.add_argument("--resample-hz", type=resample_rate,
+                        help="Resample drawings onto a uniform grid at this rate (e.g. 100, 200, 500)")
+    parser.add_argument("--cache-dir", help="Reuse line/square results cached in this directory across runs")
+    parser.add_argument("--norms", metavar="DB",
+                        help="Score against population percentiles from this norms database (normative_db.py)")
+    add_tremor_arguments(parser)
+    args = parser.parse_args(argv)
+    tremor = {"tremor_weight": args.tremor_weight, "tremor_metrics": args.tremor_metrics}
+    cache = ResultCache(disk_dir=args.cache_dir) if args.cache_dir else None
+    norms = None
+    if args.norms and args.workers == 1:
+        from normative_db import NormativeDB
+        norms = NormativeDB(args.norms)
+
+    def run(out):
+        if args.workers != 1:
+            if args.store:
+                store = SessionStore(args.directory, create=False)
+                sessions, failed = [(session["id"], session) for session in store.iter_sessions()], 0
+            else:
+                sessions, failed = load_directory(args.directory, args.suffix)
+            scored, skipped = score_parallel(sessions, out, args.workers or None, args.resample_hz, args.cache_dir,
+                                             args.norms, **tremor)
+            return scored, failed + skipped
+        if args.store:
+            return score_store(args.directory, out, args.resample_hz, cache, norms, **tremor)
+        return score_directory(args.directory, out, args.suffix, args.resample_hz, cache, norms, **tremor)
+
+    start = time.perf_counter()
+    try:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                scored, failed = run(out)
+        else:
+            scored, failed = run(sys.stdout)
+    except SessionStoreError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {scored} sessions ({failed} skipped) in {elapsed:.2f}s - {rate:.0f} sessions/sec",
+          file=sys.stderr)
+    if cache is not None and args.workers == 1:
+        print(cache.stats_text(), file=sys.stderr)
+    return 1 if failed and not scored else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
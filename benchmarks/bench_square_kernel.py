@@ -0,0 +1,85 @@
+"""Benchmark the vectorized square deviation kernel against the original per-sample loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_square_kernel.py --max-loop-size 1000000
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import square_bounds, square_distances, square_mse_batch  # noqa: E402
+
+
+def square_distances_loop(movements, bounds):
+    """The original analyze_square_task loop, kept as the reference implementation"""
+    x1, y1, x2, y2 = bounds
+    distances = []
+    for x, y, _ in movements:
+        dist_left = abs(x - x1) if y1 <= y <= y2 else float('inf')
+        dist_right = abs(x - x2) if y1 <= y <= y2 else float('inf')
+        dist_top = abs(y - y1) if x1 <= x <= x2 else float('inf')
+        dist_bottom = abs(y - y2) if x1 <= x <= x2 else float('inf')
+        dist_top_left = math.sqrt((x - x1) ** 2 + (y - y1) ** 2)
+        dist_top_right = math.sqrt((x - x2) ** 2 + (y - y1) ** 2)
+        dist_bottom_left = math.sqrt((x - x1) ** 2 + (y - y2) ** 2)
+        dist_bottom_right = math.sqrt((x - x2) ** 2 + (y - y2) ** 2)
+        distances.append(min(dist_left, dist_right, dist_top, dist_bottom,
+                             dist_top_left, dist_top_right, dist_bottom_left, dist_bottom_right))
+    return distances
+
+
+def random_points(n, rng):
+    """Points scattered around (and well beyond) the template square"""
+    points = np.empty((n, 3))
+    points[:, 0] = rng.uniform(250, 550, n)
+    points[:, 1] = rng.uniform(150, 450, n)
+    points[:, 2] = np.arange(n) * 0.01
+    return points
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return value, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1e3,1e4,1e5,1e6,1e7", help="Comma separated sample counts")
+    parser.add_argument("--max-loop-size", type=float, default=1e6,
+                        help="Skip the pure Python loop above this size (it is slow)")
+    parser.add_argument("--sessions", type=int, default=1000, help="Session count for the batched run")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    bounds = square_bounds()
+
+    print(f"{'points':>10} {'loop (s)':>10} {'kernel (s)':>11} {'speedup':>8}  identical")
+    for n in (int(float(size)) for size in args.sizes.split(",")):
+        points = random_points(n, rng)
+        kernel, kernel_time = timed(square_distances, points, bounds)
+
+        if n <= args.max_loop_size:
+            loop, loop_time = timed(square_distances_loop, points.tolist(), bounds)
+            identical = np.array_equal(np.asarray(loop), kernel)
+            print(f"{n:>10} {loop_time:>10.4f} {kernel_time:>11.4f} {loop_time / kernel_time:>7.1f}x  {identical}")
+        else:
+            print(f"{n:>10} {'-':>10} {kernel_time:>11.4f} {'-':>8}  -")
+
+    # Many short sessions: one concatenated kernel call vs one call per session
+    sessions = [random_points(int(rng.integers(100, 2000)), rng) for _ in range(args.sessions)]
+    per_session, per_time = timed(lambda: [np.mean(np.float_power(square_distances(s, bounds), 2)) for s in sessions])
+    batched, batch_time = timed(square_mse_batch, sessions, bounds)
+    print(f"\n{args.sessions} sessions: per-session {per_time:.4f}s, batched {batch_time:.4f}s, "
+          f"max abs diff {np.max(np.abs(np.asarray(per_session) - batched)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
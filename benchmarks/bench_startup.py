@@ -0,0 +1,86 @@
+"""Measure import-to-first-score time for a fresh scoring worker.
+
+Each run starts a new interpreter that imports the scoring core, scores one
+small session and reports how long that took and whether any GUI module
+(tkinter) was pulled in along the way. A second interpreter imports
+batch_score and then parallel_score, showing what the serial CLI saves by
+importing the process-pool code (multiprocessing) only for --workers.
+
+    python benchmarks/bench_startup.py --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import sys, time, json
+start = time.perf_counter()
+from scoring import ScoringEngine
+imported = time.perf_counter()
+session = {
+    "line": [[100 + i, 300 + (i % 5), i * 0.01] for i in range(200)],
+    "square": [[320 + i * 0.8, 220 + (i % 3), i * 0.01] for i in range(200)],
+    "target": {"click_times": [0.5, 0.6, 0.7], "missed": 1},
+}
+ScoringEngine().score_session(session)
+scored = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_score": scored - imported,
+                  "gui_loaded": any(name.split(".")[0] in ("tkinter", "_tkinter") for name in sys.modules),
+                  "modules": len(sys.modules)}))
+"""
+
+CLI_WORKER = r"""
+import sys, time, json
+start = time.perf_counter()
+import batch_score
+imported = time.perf_counter()
+pool_loaded = "multiprocessing" in sys.modules
+import parallel_score
+print(json.dumps({"cli_import": imported - start, "parallel_import": time.perf_counter() - imported,
+                  "pool_loaded": pool_loaded}))
+"""
+
+
+def run_once(module_code):
+    """Run the worker in a fresh interpreter; returns its report plus total process wall time"""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", module_code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    report = json.loads(output)
+    report["process"] = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure scoring worker start-up time")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to start")
+    args = parser.parse_args(argv)
+
+    reports = [run_once(WORKER) for _ in range(args.runs)]
+    for key in ("import", "first_score", "process"):
+        values = [report[key] * 1000 for report in reports]
+        print(f"{key:<12} median {statistics.median(values):8.2f} ms   min {min(values):8.2f} ms")
+    print(f"modules loaded: {reports[0]['modules']}")
+
+    cli_reports = [run_once(CLI_WORKER) for _ in range(args.runs)]
+    for key, label in (("cli_import", "batch_score"), ("parallel_import", "+ pool code")):
+        values = [report[key] * 1000 for report in cli_reports]
+        print(f"{label:<12} median {statistics.median(values):8.2f} ms   min {min(values):8.2f} ms")
+    if any(report["pool_loaded"] for report in cli_reports):
+        print("NOTE: batch_score imported multiprocessing eagerly")
+
+    if any(report["gui_loaded"] for report in reports):
+        print("FAIL: importing the scoring core loaded tkinter")
+        return 1
+    print("OK: no tkinter import")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
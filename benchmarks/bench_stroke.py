@@ -0,0 +1,101 @@
+"""Measure StrokeRenderer.flush time as a stroke grows.
+
+Draws one long synthetic stroke into a recording canvas stand-in, flushing
+every few samples as the frame timer would, and reports the mean flush
+time at each stroke length. With incremental simplification the time
+should stay flat; --whole re-simplifies the full stroke every frame
+instead, for comparison.
+
+    python benchmarks/bench_stroke.py --max-length 200000
+    python benchmarks/bench_stroke.py --whole --lengths 2e3,1e4,2e4   # slow: quadratic
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stroke_renderer import StrokeRenderer  # noqa: E402
+
+DEFAULT_LENGTHS = "2e3,1e4,5e4,1e5,2e5"
+
+
+class FakeCanvas:
+    """Just enough of tkinter.Canvas for StrokeRenderer"""
+
+    def __init__(self):
+        self.items = {}
+
+    def create_line(self, *coords, **options):
+        item = len(self.items) + 1
+        self.items[item] = list(coords)
+        return item
+
+    def coords(self, item, coords):
+        self.items[item] = coords
+
+    def delete(self, item):
+        self.items.pop(item, None)
+
+
+class FakeRoot:
+    def after(self, ms, callback):
+        return "job"
+
+    def after_cancel(self, job):
+        pass
+
+
+def random_walk(n, seed=0):
+    """(n, 3) wobbly pen samples at 240 Hz"""
+    rng = np.random.default_rng(seed)
+    angle = np.cumsum(rng.normal(0, 0.05, n))
+    xy = 400 + np.cumsum(np.column_stack([np.cos(angle), np.sin(angle)]), axis=0)
+    return np.column_stack([xy, np.arange(n) / 240])
+
+
+def run(lengths, samples_per_frame, whole, window=50):
+    """Mean flush time over window frames ending at each stroke length; returns [(length, seconds, items)]"""
+    points = random_walk(max(lengths))
+    canvas = FakeCanvas()
+    renderer = StrokeRenderer(canvas, FakeRoot(), chunk_points=10 ** 12 if whole else 512)
+    renderer.start_stroke(points)
+    rows, pending = [], sorted(lengths)
+    times = []
+    for end in range(samples_per_frame, max(lengths) + 1, samples_per_frame):
+        renderer.points = points[:end]
+        for _ in range(samples_per_frame):
+            renderer.add_point()
+        start = time.perf_counter()
+        renderer.flush()
+        times.append(time.perf_counter() - start)
+        if end >= pending[0]:
+            rows.append((pending.pop(0), sum(times[-window:]) / len(times[-window:]), len(canvas.items)))
+            if not pending:
+                break
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark stroke flush time against stroke length")
+    parser.add_argument("--lengths", default=DEFAULT_LENGTHS, help=f"Comma separated stroke lengths ({DEFAULT_LENGTHS})")
+    parser.add_argument("--max-length", type=float, help="Drop lengths above this")
+    parser.add_argument("--samples-per-frame", type=int, default=4, help="Samples added between flushes (default 4)")
+    parser.add_argument("--whole", action="store_true", help="Re-simplify the whole stroke every frame")
+    args = parser.parse_args(argv)
+
+    lengths = [int(float(length)) for length in args.lengths.split(",")]
+    if args.max_length:
+        lengths = [n for n in lengths if n <= args.max_length]
+
+    print(f"{'stroke length':>14} {'flush':>12} {'canvas items':>14}")
+    for length, seconds, items in run(lengths, args.samples_per_frame, args.whole):
+        print(f"{length:>14} {seconds * 1000:>9.3f} ms {items:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
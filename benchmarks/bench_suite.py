@@ -0,0 +1,155 @@
+"""Scaling benchmarks for the scoring hot paths, with a stored baseline.
+
+Times analyze_line_task, analyze_square_task, calculate_smoothness and a
+full session score (ending in calculate_risk_score) on synthetic tremor
+tracings from trajectories.py, and records peak memory with tracemalloc.
+The session_loop and session_batch cases split the samples into
+SESSION_SAMPLES-sample sessions and report sessions per second, scored one
+at a time and through ScoringEngine.score_sessions (the batch_score path).
+
+    python benchmarks/bench_suite.py                    # compare against baseline.json
+    python benchmarks/bench_suite.py --save-baseline    # record a new baseline
+    python benchmarks/bench_suite.py --max-size 1e5     # quick run
+
+Exits with status 1 if any case is slower (or uses more memory) than the
+baseline by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import ScoringEngine, calculate_smoothness  # noqa: E402
+from trajectories import generate_line, generate_session, generate_square  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = "1e2,1e3,1e4,1e5,1e6,1e7"
+
+# Generator settings shared by every case (5 Hz tremor, mild slowing, jittery 200 Hz input)
+TRAJECTORY_PARAMS = {"rate_hz": 200, "tremor_hz": 5.0, "tremor_amplitude": 3.0, "bradykinesia": 0.3,
+                     "timing_jitter": 0.2}
+
+SESSION_SAMPLES = 300  # Samples per drawing in the throughput cases
+# Cases scoring lists of sessions (reported in sessions/s), with the largest size each runs at
+COHORT_MAX_SIZE = {"session_loop": 10 ** 6, "session_batch": 10 ** 6}
+
+
+def generate_cohort(n):
+    """Sessions with SESSION_SAMPLES-sample drawings, n samples per drawing task in total"""
+    return [generate_session(SESSION_SAMPLES, seed=seed, **TRAJECTORY_PARAMS)
+            for seed in range(max(1, n // SESSION_SAMPLES))]
+
+
+def build_cases():
+    """name -> (setup(n) returning inputs, func(inputs))"""
+    engine = ScoringEngine()
+    return {
+        "analyze_line_task": (lambda n: generate_line(n, seed=1, **TRAJECTORY_PARAMS),
+                              engine.analyze_line_task),
+        "analyze_square_task": (lambda n: generate_square(n, seed=2, **TRAJECTORY_PARAMS),
+                                engine.analyze_square_task),
+        "calculate_smoothness": (lambda n: generate_line(n, seed=3, **TRAJECTORY_PARAMS),
+                                 calculate_smoothness),
+        "calculate_risk_score": (lambda n: generate_session(n, seed=4, **TRAJECTORY_PARAMS),
+                                 lambda session: engine.score_session(session)[1]),
+        "session_loop": (generate_cohort, lambda sessions: [engine.score_session(s) for s in sessions]),
+        "session_batch": (generate_cohort, engine.score_sessions),
+    }
+
+
+def measure(func, inputs, repeats):
+    """Best wall time over repeats, then peak traced memory of one more run"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(inputs)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes, repeats, cases=None):
+    """Run every case at every size; returns {case: {size: {"seconds", "peak_bytes"}}}"""
+    all_cases = build_cases()
+    results = {}
+    for name in cases or all_cases:
+        setup, func = all_cases[name]
+        results[name] = {}
+        for n in sizes:
+            if n > COHORT_MAX_SIZE.get(name, n):
+                continue
+            inputs = setup(n)
+            # Fewer repeats for big inputs keeps the full suite to a few minutes
+            seconds, peak = measure(func, inputs, repeats if n <= 1e5 else 1)
+            results[name][str(n)] = {"seconds": seconds, "peak_bytes": peak}
+            rate = f" {len(inputs) / seconds:>10.0f} sessions/s" if name in COHORT_MAX_SIZE else ""
+            print(f"{name:<22} {n:>10} {seconds * 1000:>12.3f} ms {peak / 2 ** 20:>10.2f} MiB{rate}", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions against the baseline"""
+    regressions = []
+    for name, by_size in results.items():
+        for size, current in by_size.items():
+            reference = baseline.get("results", {}).get(name, {}).get(size)
+            if not reference:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                # Ignore noise on tiny absolute values (sub-millisecond / sub-64 KiB)
+                floor = 1e-3 if metric == "seconds" else 64 * 1024
+                if current[metric] > max(reference[metric], floor) * tolerance:
+                    regressions.append(f"{name} n={size} {metric}: {current[metric]:.6g} "
+                                       f"vs baseline {reference[metric]:.6g}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scoring hot paths")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma separated sample counts ({DEFAULT_SIZES})")
+    parser.add_argument("--max-size", type=float, help="Drop sizes above this")
+    parser.add_argument("--case", action="append", choices=sorted(build_cases()), help="Only run these cases")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats for small sizes")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor (default 1.5)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(size)) for size in args.sizes.split(",")]
+    if args.max_size:
+        sizes = [n for n in sizes if n <= args.max_size]
+
+    print(f"{'case':<22} {'samples':>10} {'time':>15} {'peak mem':>14}")
+    results = run(sizes, args.repeats, args.case)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline)")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION: {line}")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Drawing deviation rendered as a single RGBA raster instead of canvas items.
+
+Samples are joined by short linear steps (at most one pixel apart, and
+never across a pen lift). Each step carries its interpolated deviation
+from the template. The steps are scattered into a pixel grid that keeps
+the worst deviation per pixel, widened into a stroke by a small disc
+dilation, and coloured green → yellow → red. Only the stroke's bounding
+box is processed. The result is one image: once it is built, the canvas
+redraws it at the same cost however many samples the drawing had.
+"""
+import base64
+import struct
+import zlib
+
+import numpy as np
+
+HEAT_SCALE_PX = 30.0  # Deviation drawn fully red
+STROKE_RADIUS = 3     # Half-width of the drawn stroke in px
+MAX_GAP_SEC = 0.1     # Consecutive samples further apart in time belong to separate strokes
+STROKE_ALPHA = 230
+
+# Colour stops from on-path to HEAT_SCALE_PX off it
+HEAT_STOPS = np.array([[0, 170, 0], [255, 210, 0], [220, 0, 0]], dtype=float)
+
+
+def task_deviations(task, points):
+    """Distance in px from each sample to the task's template (line, square or a template test)"""
+    from scoring import line_distances, square_distances
+    if task == "line":
+        return line_distances(points)
+    if task == "square":
+        return square_distances(points)
+    from template_paths import get_template
+    return get_template(task).distances(points)
+
+
+def heat_colors(deviations, scale=HEAT_SCALE_PX):
+    """(N, 3) uint8 colours for deviations, saturating at scale"""
+    position = np.clip(np.asarray(deviations, dtype=float) / scale, 0.0, 1.0) * (len(HEAT_STOPS) - 1)
+    low = np.minimum(position.astype(int), len(HEAT_STOPS) - 2)
+    fraction = (position - low)[:, None]
+    return (HEAT_STOPS[low] * (1 - fraction) + HEAT_STOPS[low + 1] * fraction).round().astype(np.uint8)
+
+
+def densify(points, deviations, max_gap_sec=MAX_GAP_SEC):
+    """x, y and deviation arrays with at most one pixel between consecutive entries within a stroke"""
+    points = np.asarray(points, dtype=float)
+    deviations = np.asarray(deviations, dtype=float)
+    if len(points) < 2:
+        return points[:, 0], points[:, 1], deviations
+    step = np.diff(points[:, :2], axis=0)
+    joined = np.diff(points[:, 2]) <= max_gap_sec
+    # Every segment contributes its start plus enough steps to stay under 1 px apart
+    counts = np.where(joined, np.maximum(1, np.ceil(np.hypot(step[:, 0], step[:, 1]))), 1).astype(np.int64)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    fraction = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) / counts[owner]
+    x = points[owner, 0] + fraction * step[owner, 0]
+    y = points[owner, 1] + fraction * step[owner, 1]
+    d = deviations[owner] + fraction * (deviations[owner + 1] - deviations[owner])
+    return (np.append(x, points[-1, 0]), np.append(y, points[-1, 1]), np.append(d, deviations[-1]))
+
+
+def rasterize(points, deviations, width, height, scale=HEAT_SCALE_PX, radius=STROKE_RADIUS):
+    """(height, width, 4) uint8 RGBA image of the drawing coloured by deviation; transparent elsewhere"""
+    width, height = int(width), int(height)
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    x, y, d = densify(points, deviations)
+    ix, iy = np.rint(x).astype(np.int64), np.rint(y).astype(np.int64)
+    inside = (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height)
+    if not inside.any():
+        return rgba
+    ix, iy, d = ix[inside], iy[inside], d[inside]
+
+    # Work in the stroke's bounding box, padded for the dilation
+    left, top = max(0, ix.min() - radius), max(0, iy.min() - radius)
+    right, bottom = min(width, ix.max() + radius + 1), min(height, iy.max() + radius + 1)
+    box_w, box_h = right - left, bottom - top
+    worst = np.full(box_h * box_w, -1.0)
+    np.maximum.at(worst, (iy - top) * box_w + (ix - left), d)
+    worst = worst.reshape(box_h, box_w)
+
+    stroke = worst.copy()
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if (dx or dy) and dx * dx + dy * dy <= radius * radius:
+                # stroke[r, c] = max(stroke[r, c], worst[r - dy, c - dx]) over the overlapping region
+                target = stroke[max(0, dy):box_h + min(0, dy), max(0, dx):box_w + min(0, dx)]
+                np.maximum(target, worst[max(0, -dy):box_h - max(0, dy), max(0, -dx):box_w - max(0, dx)],
+                           out=target)
+
+    covered = stroke >= 0
+    box = rgba[top:bottom, left:right]
+    box[covered, :3] = heat_colors(stroke[covered], scale)
+    box[covered, 3] = STROKE_ALPHA
+    return rgba
+
+
+def crop_to_content(rgba):
+    """(cropped image, left, top) around the non-transparent pixels, so less has to be encoded"""
+    rows = np.flatnonzero(rgba[..., 3].any(axis=1))
+    cols = np.flatnonzero(rgba[..., 3].any(axis=0))
+    if not len(rows):
+        return rgba[:1, :1], 0, 0
+    return rgba[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], int(cols[0]), int(rows[0])
+
+
+def encode_png(rgba, level=1):
+    """PNG file bytes for an (h, w, 4) uint8 RGBA or (h, w, 3) RGB image (stdlib zlib only)"""
+    height, width, channels = rgba.shape
+    color_type = {3: 2, 4: 6}[channels]
+    # Filter type 0 (none) on every row: a leading zero byte per scanline
+    rows = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    rows[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), level))
+            + chunk(b"IEND", b""))
+
+
+def encode_ppm(rgb):
+    """Binary PPM (P6) bytes for an (h, w, 3) uint8 image"""
+    height, width = rgb.shape[:2]
+    return b"P6\n%d %d\n255\n" % (width, height) + np.ascontiguousarray(rgb[..., :3]).tobytes()
+
+
+def photo_data(rgba):
+    """Base64 PNG accepted by tk.PhotoImage(data=..., format="png")"""
+    return base64.b64encode(encode_png(rgba))
@@ -0,0 +1,61 @@
+"""Map Tk event timestamps onto the application's monotonic clock.
+
+Every Tk event carries event.time: the windowing system's millisecond
+tick count at the moment of the input. It is an unsigned 32-bit value on
+X11 and Windows, so it wraps about every 49.7 days. Stamping samples
+with event.time instead of the clock reading inside the handler keeps
+main-loop backlog out of the drawing timings and reaction times.
+
+Raw ticks are unwrapped against the previous event, then shifted onto
+the application clock. The shift is the smallest (now - tick) seen so
+far, which is the observation made with the least handler backlog. As
+a result, a stamp is never later than the moment its handler ran.
+"""
+from online_metrics import RunningStats
+
+TICK_MODULUS = 2 ** 32  # event.time is an unsigned 32-bit millisecond counter
+
+
+class EventClock:
+    """Converts event.time ticks into the clock passed as now to stamp()"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget the alignment (e.g. after the windowing system restarted)"""
+        self.last_raw = None
+        self.unwrapped_ms = 0
+        self.offset = None
+        self.backlog = RunningStats()  # Handler lag behind the event, in ms
+        self.max_backlog = 0.0
+
+    def stamp(self, event_ms, now):
+        """Time of an event on the now clock; falls back to now if the event has no timestamp"""
+        if not event_ms:  # Synthesized events (and replayed ones) carry no usable tick
+            return now
+        event_ms = int(event_ms) % TICK_MODULUS
+
+        if self.last_raw is None:
+            self.unwrapped_ms = event_ms
+        else:
+            step = (event_ms - self.last_raw) % TICK_MODULUS
+            # A huge forward step is really a slightly older event delivered late
+            if step >= TICK_MODULUS // 2:
+                step -= TICK_MODULUS
+            self.unwrapped_ms += step
+        self.last_raw = event_ms
+
+        seconds = self.unwrapped_ms / 1000
+        if self.offset is None or now - seconds < self.offset:
+            self.offset = now - seconds
+        stamped = self.offset + seconds
+
+        lag = (now - stamped) * 1000
+        self.backlog.add(lag)
+        self.max_backlog = max(self.max_backlog, lag)
+        return stamped
+
+    def stats_text(self):
+        """One-line summary of handler backlog for the debug panel"""
+        return f"Event backlog: {self.backlog.mean:.1f} ms avg, {self.max_backlog:.1f} ms max"
@@ -0,0 +1,84 @@
+"""Drift-compensated frame loop on top of Tk's after() timer."""
+import time
+
+from online_metrics import RunningStats
+
+
+class FrameScheduler:
+    """Calls callback(elapsed_seconds) roughly every interval_ms
+
+    Frames are scheduled against absolute perf_counter() deadlines, so a late
+    frame shortens the next delay instead of pushing every later frame back.
+    The callback receives the real time since the previous frame, letting
+    animations move by elapsed time rather than by a fixed step per tick.
+    If the loop falls more than a whole frame behind, the missed frames are
+    dropped rather than run back to back.
+
+    Lateness of each frame against its deadline is kept in self.jitter (ms).
+    """
+
+    def __init__(self, root, callback, interval_ms=20, clock=time.perf_counter):
+        self.root = root
+        self.callback = callback
+        self.interval = interval_ms / 1000
+        self.clock = clock
+
+        self.job = None
+        self.running = False
+        self.last_time = None
+        self.next_deadline = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear the jitter statistics"""
+        self.frames = 0
+        self.dropped_frames = 0
+        self.jitter = RunningStats()
+        self.max_jitter = 0.0
+
+    def start(self):
+        """Start (or restart) the frame loop from now"""
+        self.stop()
+        self.running = True
+        self.last_time = self.clock()
+        self.next_deadline = self.last_time + self.interval
+        self.job = self.root.after(int(round(self.interval * 1000)), self.tick)
+
+    def stop(self):
+        """Cancel the pending frame, if any"""
+        self.running = False
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def tick(self):
+        """Run one frame and schedule the next one against its deadline"""
+        self.job = None
+        if not self.running:
+            return
+
+        now = self.clock()
+        lateness = (now - self.next_deadline) * 1000
+        self.jitter.add(lateness)
+        self.max_jitter = max(self.max_jitter, lateness)
+        self.frames += 1
+
+        elapsed = now - self.last_time
+        self.last_time = now
+        self.callback(elapsed)
+        if not self.running:  # The callback stopped the loop
+            return
+
+        self.next_deadline += self.interval
+        if self.next_deadline <= now:
+            missed = int((now - self.next_deadline) / self.interval) + 1
+            self.dropped_frames += missed
+            self.next_deadline += missed * self.interval
+
+        delay = max(0, int(round((self.next_deadline - self.clock()) * 1000)))
+        self.job = self.root.after(delay, self.tick)
+
+    def stats_text(self):
+        """One-line summary of frame timing for the debug panel"""
+        return (f"Frames: {self.frames}, dropped: {self.dropped_frames}, "
+                f"\nJitter: {self.jitter.mean:.1f} ± {self.jitter.std:.1f} ms (max {self.max_jitter:.1f})")
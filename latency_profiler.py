@@ -0,0 +1,135 @@
+"""Opt-in timing of Tk event handlers and after() callbacks.
+
+HandlerProfiler wraps handler methods and the root's after() so that,
+while profiling is enabled, each call records its run time and each
+after() callback also records its queue delay: how long after its
+scheduled time it actually ran. When disabled, the wrappers only check
+a flag and after() hands the callback to Tk untouched. Every timing goes
+into a log-bucketed histogram, so memory stays constant however long
+the session runs.
+"""
+import bisect
+import functools
+import json
+import platform
+import time
+
+from online_metrics import RunningStats
+
+# Histogram bucket upper edges in ms: 4 per octave from 10 µs to about 80 s
+BUCKET_EDGES_MS = [0.01 * 2 ** (step / 4) for step in range(93)]
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in ms, with running mean/std and max"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_EDGES_MS) + 1)  # Last bucket catches anything larger
+        self.stats = RunningStats()
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKET_EDGES_MS, ms)] += 1
+        self.stats.add(ms)
+        if ms > self.max:
+            self.max = ms
+
+    @property
+    def count(self):
+        return self.stats.count
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile (0-100), capped at the max seen"""
+        if not self.count:
+            return 0.0
+        needed = q / 100 * self.count
+        seen = 0
+        for edge, count in zip(BUCKET_EDGES_MS + [self.max], self.counts):
+            seen += count
+            if seen >= needed:
+                return min(edge, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "mean_ms": self.stats.mean, "std_ms": self.stats.std, "max_ms": self.max,
+                "p50_ms": self.percentile(50), "p90_ms": self.percentile(90), "p99_ms": self.percentile(99),
+                "bucket_edges_ms": BUCKET_EDGES_MS, "bucket_counts": self.counts}
+
+
+class HandlerProfiler:
+    """Per-handler run time and per-callback queue delay histograms"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """Drop every histogram"""
+        self.durations = {}  # handler name -> LatencyHistogram of run time
+        self.delays = {}     # after() callback name -> LatencyHistogram of queue delay
+        self.started = time.time()
+
+    def record(self, table, name, ms):
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = LatencyHistogram()
+        histogram.add(ms)
+
+    def wrap(self, name, handler):
+        """Return handler timed under name whenever profiling is enabled"""
+        @functools.wraps(handler)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return handler(*args, **kwargs)
+            start = self.clock()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self.record(self.durations, name, (self.clock() - start) * 1000)
+        return timed
+
+    def instrument_after(self, root):
+        """Route root.after() through the profiler to time callbacks and their queue delay"""
+        schedule = root.after
+
+        def after(ms, callback=None, *args):
+            if not self.enabled or callback is None:
+                return schedule(ms, callback, *args)
+            name = f"after:{getattr(callback, '__name__', type(callback).__name__)}"
+            due = self.clock() + ms / 1000
+
+            def run(*call_args):
+                start = self.clock()
+                self.record(self.delays, name, max(0.0, (start - due) * 1000))
+                try:
+                    return callback(*call_args)
+                finally:
+                    self.record(self.durations, name, (self.clock() - start) * 1000)
+            return schedule(ms, run, *args)
+
+        root.after = after
+
+    def summary_text(self, limit=5):
+        """Slowest handlers by p90 for the debug panel"""
+        if not self.durations:
+            return "Profiling: no events yet"
+        ranked = sorted(self.durations.items(), key=lambda item: item[1].percentile(90), reverse=True)
+        lines = ["Handler p50/p90/max ms (n):"]
+        for name, histogram in ranked[:limit]:
+            lines.append(f"{name}: {histogram.percentile(50):.2f}/{histogram.percentile(90):.2f}/"
+                         f"{histogram.max:.1f} ({histogram.count})")
+        if self.delays:
+            worst = max(self.delays.items(), key=lambda item: item[1].percentile(90))
+            lines.append(f"Worst queue delay p90: {worst[1].percentile(90):.1f} ms ({worst[0]})")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {"started": self.started, "exported": time.time(), "python": platform.python_version(),
+                "handlers": {name: histogram.to_dict() for name, histogram in sorted(self.durations.items())},
+                "queue_delay": {name: histogram.to_dict() for name, histogram in sorted(self.delays.items())}}
+
+    def export(self, path):
+        """Write every histogram to a JSON file for offline analysis"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,77 @@
+"""Compact array-backed storage for (x, y, t) mouse samples."""
+import numpy as np
+
+
+class MovementBuffer:
+    """Growable float64 (N, 3) buffer of x, y, t samples
+
+    By default the buffer grows by doubling, so appends are amortized O(1)
+    and memory stays at 24 bytes per sample (plus slack). Passing
+    max_samples turns it into a fixed-capacity ring that keeps only the
+    newest samples, for recording modes that need bounded memory.
+
+    view() (and np.asarray(buffer)) returns a zero-copy view in recording
+    order. The ring stores every sample twice, once in each half of its
+    storage, so the newest max_samples samples are always contiguous.
+    """
+
+    def __init__(self, capacity=1024, max_samples=None):
+        self.max_samples = max_samples
+        if max_samples is not None:
+            if max_samples < 1:
+                raise ValueError("max_samples must be at least 1")
+            self.data = np.empty((2 * max_samples, 3))
+        else:
+            self.data = np.empty((max(1, capacity), 3))
+        self.size = 0
+        self.head = 0  # Next write slot in ring mode
+
+    def append(self, x, y, t):
+        """Add one sample"""
+        if self.max_samples is not None:
+            head = self.head
+            self.data[head] = self.data[head + self.max_samples] = (x, y, t)
+            self.head = (head + 1) % self.max_samples
+            self.size = min(self.size + 1, self.max_samples)
+            return
+
+        if self.size == len(self.data):
+            grown = np.empty((2 * len(self.data), 3))
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = (x, y, t)
+        self.size += 1
+
+    def clear(self):
+        """Drop every sample but keep the allocated storage"""
+        self.size = 0
+        self.head = 0
+
+    def view(self):
+        """Zero-copy (N, 3) view of the stored samples, oldest first"""
+        if self.max_samples is not None and self.size == self.max_samples:
+            return self.data[self.head:self.head + self.max_samples]
+        return self.data[:self.size]
+
+    def tolist(self):
+        return self.view().tolist()
+
+    @property
+    def nbytes(self):
+        """Bytes allocated for sample storage (including unused capacity)"""
+        return self.data.nbytes
+
+    def __array__(self, dtype=None, copy=None):
+        points = self.view()
+        if dtype is not None and dtype != points.dtype:
+            return points.astype(dtype)
+        return points.copy() if copy else points
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __iter__(self):
+        return iter(self.view())
@@ -0,0 +1,299 @@
+"""Population norms: a SQLite table of scored sessions plus quantile sketches per metric.
+
+Every session added is kept as a row (results as JSON, optional age). Its
+metrics also go into one KLLSketch per (metric, age band) and per
+(metric, "all"). Sketches are updated as sessions arrive and stored
+beside the rows, so turning a metric into a population percentile is a
+sketch lookup rather than a table scan.
+
+Each database has a site ID. Its own sessions build the "local"
+sketches. export_sketches() writes only those, and merge_export() stores
+another site's export under that site's ID, replacing any earlier export
+from the same site. Re-importing a newer snapshot from a kiosk therefore
+never double counts. Percentiles use every source merged together.
+
+    python normative_db.py norms.sqlite --add scores.jsonl
+    python normative_db.py hub.sqlite --merge kiosk1.json kiosk2.json
+"""
+import argparse
+import copy
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+import uuid
+
+from quantile_sketch import DEFAULT_K, KLLSketch
+from scoring import flat_metrics
+
+SCHEMA_VERSION = 1
+EXPORT_FORMAT = "parkinsons-norms"
+
+AGE_BAND_EDGES = (40, 50, 60, 70, 80)  # Bands: <40, 40-49, ..., 70-79, 80+
+ALL_AGES = "all"
+MIN_BAND_COUNT = 30  # Fewer sessions than this in an age band falls back to every age
+SKETCH_SEED = 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    age INTEGER,
+    results TEXT NOT NULL,
+    risk_score REAL
+);
+CREATE TABLE IF NOT EXISTS sketches (
+    source TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    band TEXT NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (source, metric, band)
+);
+"""
+
+
+class NormativeDBError(Exception):
+    """Raised for incompatible databases or sketch exports"""
+
+
+def age_band(age):
+    """Age band label for an age in years, or None when unknown"""
+    if age is None:
+        return None
+    lower = None
+    for edge in AGE_BAND_EDGES:
+        if age < edge:
+            return f"<{edge}" if lower is None else f"{lower}-{edge - 1}"
+        lower = edge
+    return f"{lower}+"
+
+
+def band_values(results, age):
+    """((metric, band), value) for every metric of a session, once for all ages and once for its age band"""
+    bands = [ALL_AGES] if age_band(age) is None else [ALL_AGES, age_band(age)]
+    for metric, value in flat_metrics(results).items():
+        for band in bands:
+            yield (metric, band), value
+
+
+class NormativeDB:
+    """Session results in SQLite with per-metric, per-age-band KLL sketches"""
+
+    def __init__(self, path, k=DEFAULT_K):
+        self.path = path
+        self.k = k
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+            if not meta:
+                meta = {"schema_version": str(SCHEMA_VERSION), "site": uuid.uuid4().hex}
+                self.conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        if int(meta["schema_version"]) != SCHEMA_VERSION:
+            raise NormativeDBError(
+                f"{path} uses norms schema version {meta['schema_version']}, expected {SCHEMA_VERSION}")
+        self.site = meta["site"]
+        self.load_sketches()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # -- sketches --------------------------------------------------------
+
+    def load_sketches(self):
+        """Read every source's sketches; local ones stay separate so only they get updated"""
+        self.local = {}     # (metric, band) -> this site's KLLSketch
+        self.combined = {}  # (metric, band) -> every source merged, used for percentiles
+        # Fixed seeds and merge order keep percentiles identical in every process reading the database
+        rows = self.conn.execute("SELECT source, metric, band, sketch FROM sketches ORDER BY source, metric, band")
+        for source, metric, band, data in rows:
+            sketch = KLLSketch.from_dict(json.loads(data), seed=SKETCH_SEED)
+            if source == self.site:
+                self.local[metric, band] = sketch
+            self._combined(metric, band).merge(sketch)
+
+    def _combined(self, metric, band):
+        if (metric, band) not in self.combined:
+            self.combined[metric, band] = KLLSketch(self.k, seed=SKETCH_SEED)
+        return self.combined[metric, band]
+
+    def sketch(self, metric, band=ALL_AGES):
+        """Merged sketch of one metric over every source (None if never seen)"""
+        return self.combined.get((metric, band))
+
+    def _save_sketches(self, sketches):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO sketches VALUES (?, ?, ?, ?)",
+            [(self.site, metric, band, json.dumps(sketch.to_dict())) for (metric, band), sketch in sketches.items()])
+
+    def _staged(self, staged, sketches, key):
+        """staged[key], first copied from sketches[key] (or new) so the original is left alone"""
+        if key not in staged:
+            staged[key] = copy.deepcopy(sketches[key]) if key in sketches else KLLSketch(self.k, seed=SKETCH_SEED)
+        return staged[key]
+
+    # -- sessions --------------------------------------------------------
+
+    def add_session(self, session_id, results, age=None, risk_score=None, created=None):
+        """Record one scored session; returns False if the ID was already there"""
+        return self.add_sessions([(session_id, results, age, risk_score, created)]) == 1
+
+    def add_sessions(self, records):
+        """Record many (session_id, results, age, risk_score, created) tuples in one transaction
+
+        Sessions already present are skipped so re-ingesting a file never
+        counts anyone twice. Metrics are folded into copies of the sketches
+        that replace the originals only once the transaction commits, so a
+        failed call leaves memory matching the database and can be retried.
+        Returns how many were added.
+        """
+        local, combined = {}, {}
+        added = 0
+        with self.conn:
+            for session_id, results, age, risk_score, created in records:
+                inserted = self.conn.execute(
+                    "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?)",
+                    (session_id, time.time() if created is None else created, age,
+                     json.dumps(results, default=lambda value: value.item()),  # numpy scalars
+                     None if risk_score is None else float(risk_score))).rowcount
+                if inserted:
+                    for key, value in band_values(results, age):
+                        self._staged(local, self.local, key).update(value)
+                        self._staged(combined, self.combined, key).update(value)
+                    added += 1
+            self._save_sketches(local)
+        self.local.update(local)
+        self.combined.update(combined)
+        return added
+
+    def __len__(self):
+        """Sessions recorded at this site"""
+        return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def rebuild_sketches(self):
+        """Recompute this site's sketches from the sessions table (e.g. after changing k)"""
+        local = {}
+        with self.conn:
+            self.conn.execute("DELETE FROM sketches WHERE source = ?", (self.site,))
+            for results, age in self.conn.execute("SELECT results, age FROM sessions"):
+                for key, value in band_values(json.loads(results), age):
+                    self._staged(local, {}, key).update(value)
+            self._save_sketches(local)
+        self.load_sketches()
+
+    # -- percentiles -----------------------------------------------------
+
+    def percentile(self, metric, value, age=None, min_count=MIN_BAND_COUNT):
+        """Population percentile (0-100) of value for a metric such as "line.mse"
+
+        Uses the age band when it holds at least min_count sessions,
+        otherwise every age. None when there is not enough data at all.
+        """
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None
+        for band in (age_band(age), ALL_AGES):
+            sketch = self.combined.get((metric, band))
+            if sketch is not None and sketch.count >= min_count:
+                return sketch.percentile(value)
+        return None
+
+    def percentiles(self, results, age=None):
+        """Percentile of every metric in a results dict that has population data"""
+        found = {}
+        for metric, value in flat_metrics(results).items():
+            percentile = self.percentile(metric, value, age)
+            if percentile is not None:
+                found[metric] = percentile
+        return found
+
+    # -- sharing between sites ----------------------------------------------
+
+    def export_sketches(self, path):
+        """Write this site's own sketches for merging elsewhere"""
+        data = {"format": EXPORT_FORMAT, "version": SCHEMA_VERSION, "site": self.site,
+                "exported": time.time(),
+                "sketches": [{"metric": metric, "band": band, "sketch": sketch.to_dict()}
+                             for (metric, band), sketch in sorted(self.local.items())]}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def merge_export(self, data):
+        """Store another site's exported sketches, replacing its previous export"""
+        if data.get("format") != EXPORT_FORMAT or data.get("version") != SCHEMA_VERSION:
+            raise NormativeDBError("Not a norms sketch export of a supported version")
+        if data["site"] == self.site:
+            raise NormativeDBError("Refusing to merge this site's own export")
+        with self.conn:
+            self.conn.execute("DELETE FROM sketches WHERE source = ?", (data["site"],))
+            self.conn.executemany(
+                "INSERT INTO sketches VALUES (?, ?, ?, ?)",
+                [(data["site"], entry["metric"], entry["band"], json.dumps(entry["sketch"]))
+                 for entry in data["sketches"]])
+        self.load_sketches()
+
+    def merge_file(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.merge_export(json.load(f))
+
+    def sources(self):
+        """Site IDs contributing sketches, this site first"""
+        others = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT source FROM sketches WHERE source != ? ORDER BY source", (self.site,))]
+        return [self.site, *others]
+
+    def summary_text(self):
+        lines = [f"{len(self)} local sessions, {len(self.sources()) - 1} merged sites"]
+        for (metric, band), sketch in sorted(self.combined.items()):
+            if band == ALL_AGES and sketch.count:
+                lines.append(f"{metric}: n={sketch.count} median={sketch.quantile(0.5):.4g} "
+                             f"p90={sketch.quantile(0.9):.4g}")
+        return "\n".join(lines)
+
+
+def read_scores(path):
+    """(session_id, results, age, risk_score, created) tuples from batch_score JSON lines"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["id"], record["results"], record.get("age"), record.get("risk_score"), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and share population norms for the test metrics")
+    parser.add_argument("database", help="SQLite norms database (created if missing)")
+    parser.add_argument("--add", nargs="+", default=[], metavar="JSONL",
+                        help="Add sessions from batch_score output files")
+    parser.add_argument("--merge", nargs="+", default=[], metavar="JSON",
+                        help="Merge sketch exports from other sites")
+    parser.add_argument("--export", metavar="JSON", help="Write this site's sketches for merging elsewhere")
+    args = parser.parse_args(argv)
+
+    try:
+        with NormativeDB(args.database) as norms:
+            for path in args.add:
+                print(f"{path}: added {norms.add_sessions(read_scores(path))} sessions", file=sys.stderr)
+            for path in args.merge:
+                norms.merge_file(path)
+            if args.export:
+                norms.export_sketches(args.export)
+            print(norms.summary_text())
+    except (OSError, ValueError, KeyError, NormativeDBError, sqlite3.Error) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Incremental (O(1) per sample) task metrics for live scoring while drawing."""
+import collections
+import math
+
+from scoring import (LINE_Y_TARGET, MIN_POINTS, point_square_distance, smoothness_from_mean_jerk,
+                     square_bounds)
+
+
+class RunningStats:
+    """Welford accumulator for count, mean and variance of a stream of values"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+
+    def add(self, value):
+        """Fold one value into the running statistics"""
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        """Population variance of the values seen so far"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class SlidingWindowStats:
+    """Running sums over the values seen in the last window_sec seconds
+
+    Values are kept in a deque and expire from the left as time moves on,
+    so each add costs amortized O(1) however long the recording gets.
+    """
+
+    def __init__(self, window_sec=1.5):
+        self.window_sec = window_sec
+        self.samples = collections.deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, t, value):
+        """Fold in a value observed at time t and drop values older than the window"""
+        self.samples.append((t, value))
+        self.total += value
+        self.total_sq += value * value
+        self.expire(t)
+
+    def expire(self, now):
+        """Forget values that fell out of the window ending at now"""
+        cutoff = now - self.window_sec
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            _, value = samples.popleft()
+            self.total -= value
+            self.total_sq -= value * value
+        if not samples:
+            # Start clean so subtraction error cannot pile up across gaps
+            self.total = self.total_sq = 0.0
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    @property
+    def mean(self):
+        return self.total / len(self.samples) if self.samples else None
+
+    @property
+    def rms(self):
+        return math.sqrt(max(self.total_sq, 0.0) / len(self.samples)) if self.samples else None
+
+
+class OnlineTaskMetrics:
+    """Line/square metrics updated one sample at a time from on_mouse_move
+
+    Produces the same mse / time_taken / smoothness as ScoringEngine (up to
+    floating point summation order) without re-walking the recording. The
+    same samples also feed sliding windows over the last window_sec seconds
+    (see recent()), so a worsening tremor shows up while the task runs.
+    """
+
+    def __init__(self, task, y_target=LINE_Y_TARGET, bounds=None, window_sec=1.5, template=None):
+        if task not in ("line", "square") and template is None:
+            raise ValueError(f"Online metrics need a template for task {task!r}")
+        self.task = task
+        self.template = template  # template_paths.TemplatePath for polyline tests
+        self.y_target = y_target
+        self.bounds = bounds or square_bounds()
+        self.window_sec = window_sec
+        self.reset()
+
+    def reset(self):
+        """Forget every sample"""
+        self.count = 0
+        self.first_time = None
+        self.last_point = None
+        self.squared_deviation = RunningStats()
+        self.step_lengths = RunningStats()
+        self.velocities = RunningStats()
+        self.accelerations = RunningStats()
+        self.jerks = RunningStats()
+        self.last_velocity = None
+        self.last_acceleration = None
+        self.recent_deviation = SlidingWindowStats(self.window_sec)
+        self.recent_velocity = SlidingWindowStats(self.window_sec)
+        self.recent_jerk = SlidingWindowStats(self.window_sec)
+
+    def deviation(self, x, y):
+        """Distance from a sample to the task template"""
+        if self.template is not None:
+            return self.template.distance(x, y)
+        if self.task == "line":
+            return abs(y - self.y_target)
+        return point_square_distance(x, y, self.bounds)
+
+    def add(self, x, y, t):
+        """Fold one (x, y, t) sample into every accumulator"""
+        self.count += 1
+        if self.first_time is None:
+            self.first_time = t
+        deviation = self.deviation(x, y)
+        self.squared_deviation.add(deviation ** 2)
+        self.recent_deviation.add(t, deviation)
+
+        if self.last_point is not None:
+            prev_x, prev_y, prev_t = self.last_point
+            distance = math.sqrt((x - prev_x) ** 2 + (y - prev_y) ** 2)
+            self.step_lengths.add(distance)
+
+            # Skip if time difference is too small (same rule as calculate_smoothness)
+            if abs(t - prev_t) >= 0.001:
+                self.add_velocity(distance / (t - prev_t), t)
+
+        # Keep every window aligned to the newest sample, even ones that got no value
+        self.recent_velocity.expire(t)
+        self.recent_jerk.expire(t)
+        self.last_point = (x, y, t)
+
+    def add_velocity(self, velocity, t=None):
+        """Propagate a new velocity sample into the acceleration and jerk accumulators
+
+        With a timestamp t the velocity and jerk also enter the sliding windows.
+        """
+        self.velocities.add(velocity)
+        if t is not None:
+            self.recent_velocity.add(t, velocity)
+        if self.last_velocity is not None:
+            acceleration = abs(velocity - self.last_velocity)
+            self.accelerations.add(acceleration)
+            if self.last_acceleration is not None:
+                jerk = abs(acceleration - self.last_acceleration)
+                self.jerks.add(jerk)
+                if t is not None:
+                    self.recent_jerk.add(t, jerk)
+            self.last_acceleration = acceleration
+        self.last_velocity = velocity
+
+    @property
+    def mse(self):
+        return self.squared_deviation.mean if self.count else None
+
+    @property
+    def time_taken(self):
+        return self.last_point[2] - self.first_time if self.count else None
+
+    @property
+    def path_length(self):
+        return self.step_lengths.total
+
+    @property
+    def smoothness(self):
+        if self.count < 3 or self.velocities.count < 2:
+            return 5.0
+        return smoothness_from_mean_jerk(self.jerks.mean if self.jerks.count else 0)
+
+    def result(self):
+        """Results dict for the task, or None while there are too few points"""
+        if self.count < MIN_POINTS:
+            return None
+        return {"mse": self.mse, "time_taken": self.time_taken, "smoothness": self.smoothness}
+
+    def recent(self):
+        """Metrics over the last window_sec seconds, or None before any sample
+
+        deviation is the RMS distance to the template, velocity the mean speed
+        (px/s), jerk the mean absolute jerk and smoothness its 0-10 score.
+        """
+        if not self.count:
+            return None
+        jerk = self.recent_jerk.mean
+        return {"deviation": self.recent_deviation.rms, "velocity": self.recent_velocity.mean,
+                "jerk": jerk, "smoothness": 5.0 if jerk is None else smoothness_from_mean_jerk(jerk)}
@@ -0,0 +1,160 @@
+"""Score many sessions across a process pool using shared-memory arrays.
+
+All drawing samples and reaction times of a cohort are packed into a few
+flat arrays placed in multiprocessing.shared_memory. Workers attach to them
+once at start-up and only receive (start, stop) session ranges, so no
+trajectory data is pickled. Ranges are planned by sample count rather than
+session count, which keeps thousands of tiny sessions from drowning in
+per-task IPC overhead while still balancing large ones.
+"""
+import os
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from result_cache import ResultCache
+from scoring import ScoringEngine, as_points
+from template_paths import TEMPLATE_BUILDERS
+
+# Drawing recordings packed per session: a (start, count) column pair each
+DRAWING_TASKS = ("line", "square", *TEMPLATE_BUILDERS)
+
+# Columns of the packed per-session index after the drawing pairs (AGE is -1 when unknown)
+CLICK_START, CLICK_COUNT, MISSED, AGE = range(2 * len(DRAWING_TASKS), 2 * len(DRAWING_TASKS) + 4)
+INDEX_COLUMNS = AGE + 1
+
+CHUNKS_PER_WORKER = 4
+
+# Worker-side state, set up once per process by _init_worker
+_worker = {}
+
+
+def pack_sessions(sessions):
+    """Flatten session dicts into {"samples", "clicks", "index"} arrays
+
+    Raises ValueError for a malformed recording rather than reshaping it;
+    filter sessions through scoring.checked_session first to skip bad ones.
+    """
+    index = np.zeros((len(sessions), INDEX_COLUMNS), dtype=np.int64)
+    sample_parts, click_parts = [], []
+    sample_total = click_total = 0
+    for row, session in enumerate(sessions):
+        for column, task in enumerate(DRAWING_TASKS):
+            start_col = 2 * column
+            points = session.get(task)
+            points = np.empty((0, 3)) if points is None else as_points(points)
+            index[row, start_col:start_col + 2] = sample_total, len(points)
+            sample_parts.append(points)
+            sample_total += len(points)
+
+        target = session.get("target") or {}
+        clicks = target.get("click_times")
+        clicks = np.empty(0) if clicks is None else np.asarray(clicks, dtype=float)
+        if clicks.ndim != 1:
+            raise ValueError(f"Expected a list of click times, got an array of shape {clicks.shape}")
+        index[row, CLICK_START:CLICK_START + 2] = click_total, len(clicks)
+        index[row, MISSED] = target.get("missed") or 0
+        index[row, AGE] = -1 if session.get("age") is None else session["age"]
+        click_parts.append(clicks)
+        click_total += len(clicks)
+
+    return {
+        "samples": np.concatenate(sample_parts) if sample_parts else np.empty((0, 3)),
+        "clicks": np.concatenate(click_parts) if click_parts else np.empty(0),
+        "index": index,
+    }
+
+
+def plan_chunks(index, workers, chunks_per_worker=CHUNKS_PER_WORKER):
+    """Split sessions into contiguous (start, stop) ranges holding similar sample counts"""
+    sessions = len(index)
+    if sessions == 0:
+        return []
+    # Every session costs a little even when empty, so count it as at least 1 sample
+    weights = np.maximum(index[:, 1:CLICK_START:2].sum(axis=1), 1)
+    cumulative = np.cumsum(weights)
+    n_chunks = min(sessions, max(1, workers * chunks_per_worker))
+    targets = cumulative[-1] * np.arange(1, n_chunks) / n_chunks
+    cuts = np.unique(np.searchsorted(cumulative, targets, side="right"))
+    bounds = [0, *cuts[(cuts > 0) & (cuts < sessions)].tolist(), sessions]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class SharedArrays:
+    """Copies named arrays into shared memory; use as a context manager to free them"""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _init_worker(spec, resample_hz, cache_dir=None, norms_path=None, tremor_weight=0.0, tremor_metrics=False):
+    """Attach to the shared arrays once per worker process"""
+    _worker["blocks"] = [shared_memory.SharedMemory(name=name) for name, _, _ in spec.values()]
+    _worker["arrays"] = {key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+                         for (key, (_, shape, dtype)), block in zip(spec.items(), _worker["blocks"])}
+    _worker["engine"] = make_engine(resample_hz, cache_dir, norms_path, tremor_weight, tremor_metrics)
+
+
+def make_engine(resample_hz=None, cache_dir=None, norms_path=None, tremor_weight=0.0, tremor_metrics=False):
+    """Engine for one process; workers share results through the on-disk cache tier only"""
+    norms = None
+    if norms_path:
+        from normative_db import NormativeDB  # Each process opens its own SQLite connection
+        norms = NormativeDB(norms_path)
+    return ScoringEngine(resample_hz=resample_hz, cache=ResultCache(disk_dir=cache_dir) if cache_dir else None,
+                         norms=norms, tremor_weight=tremor_weight, tremor_metrics=tremor_metrics)
+
+
+def score_range(arrays, engine, start, stop):
+    """Score sessions [start, stop) straight from packed arrays; returns [(results, risk_score)]"""
+    samples, clicks, index = arrays["samples"], arrays["clicks"], arrays["index"]
+    scored = []
+    for row in index[start:stop]:
+        session = {task: samples[row[2 * column]:row[2 * column] + row[2 * column + 1]]
+                   for column, task in enumerate(DRAWING_TASKS)}
+        session["target"] = {"click_times": clicks[row[CLICK_START]:row[CLICK_START] + row[CLICK_COUNT]],
+                             "missed": int(row[MISSED])}
+        if row[AGE] >= 0:
+            session["age"] = int(row[AGE])
+        scored.append(engine.score_session(session))
+    return scored
+
+
+def _score_chunk(bounds):
+    return score_range(_worker["arrays"], _worker["engine"], *bounds)
+
+
+def score_sessions_parallel(sessions, workers=None, resample_hz=None, chunks_per_worker=CHUNKS_PER_WORKER,
+                            cache_dir=None, norms_path=None, tremor_weight=0.0, tremor_metrics=False):
+    """Score session dicts on a process pool; returns [(results, risk_score)] in input order"""
+    engine_args = (resample_hz, cache_dir, norms_path, tremor_weight, tremor_metrics)
+    workers = workers or os.cpu_count() or 1
+    packed = pack_sessions(sessions)
+    chunks = plan_chunks(packed["index"], workers, chunks_per_worker)
+
+    if workers == 1:
+        engine = make_engine(*engine_args)
+        return [scored for bounds in chunks for scored in score_range(packed, engine, *bounds)]
+
+    with SharedArrays(packed) as shared:
+        del packed  # Workers read the shared copy; drop the private one
+        with Pool(workers, initializer=_init_worker, initargs=(shared.spec, *engine_args)) as pool:
+            return [scored for chunk in pool.imap(_score_chunk, chunks) for scored in chunk]
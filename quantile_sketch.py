@@ -0,0 +1,153 @@
+"""Mergeable streaming quantile sketch (KLL).
+
+A KLLSketch summarises any number of values in a few hundred retained
+floats. At the default k=200, percentiles of 200k values come out
+within about 0.6 percentile points. Level h holds values that each stand
+for 2**h originals. When the sketch outgrows its budget, the lowest
+full level is sorted and every other value is promoted to the next
+level, starting at a random offset. Capacities shrink geometrically
+towards the lower levels.
+
+Two sketches merge by concatenating their levels and compacting again.
+The result is as accurate as a single sketch over both streams, so
+kiosks can summarise their own users and a central store can combine
+them without seeing the raw sessions.
+"""
+import bisect
+import math
+import random
+
+DEFAULT_K = 200
+CAPACITY_DECAY = 2 / 3  # Each level below the top holds this fraction of the one above
+
+
+class KLLSketch:
+    """Streaming quantiles over floats; update() values, merge() other sketches, ask percentile()"""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.levels = [[]]
+        self.retained = 0  # Values kept across every level
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.rng = random.Random(seed)
+        self._budget = self.max_retained  # Compress once retained reaches this
+        self._cdf = None  # (sorted values, cumulative weights), rebuilt after changes
+
+    def __len__(self):
+        return self.count
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * CAPACITY_DECAY ** depth)) + 1
+
+    @property
+    def max_retained(self):
+        return sum(self.capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value):
+        value = float(value)
+        if math.isnan(value):
+            return
+        self.levels[0].append(value)
+        self.retained += 1
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._cdf = None
+        if self.retained >= self._budget:
+            self.compress()
+
+    def extend(self, values):
+        for value in values:
+            self.update(value)
+
+    def compress(self):
+        """Compact the lowest full levels upwards until the sketch is back within its budget"""
+        level = 0
+        while level < len(self.levels) and self.retained >= self._budget:
+            items = self.levels[level]
+            if len(items) >= self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])  # Also raises every lower level's capacity
+                    self._budget = self.max_retained
+                items.sort()
+                # An odd leftover stays behind at full weight
+                keep = items[-1:] if len(items) % 2 else []
+                pairs = items[:len(items) - len(keep)]
+                self.levels[level + 1].extend(pairs[self.rng.randrange(2)::2])
+                self.levels[level] = keep
+                self.retained -= len(pairs) // 2
+            level += 1
+
+    def merge(self, other):
+        """Fold another sketch into this one (other is left unchanged)"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        self._budget = self.max_retained
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.retained += other.retained
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._cdf = None
+        self.compress()
+        return self
+
+    def _weighted(self):
+        if self._cdf is None:
+            pairs = sorted((value, 2 ** level) for level, items in enumerate(self.levels) for value in items)
+            values, cumulative, total = [], [], 0
+            for value, weight in pairs:
+                total += weight
+                values.append(value)
+                cumulative.append(total)
+            self._cdf = (values, cumulative)
+        return self._cdf
+
+    def rank(self, value, inclusive=True):
+        """Estimated number of values <= value (< value if not inclusive); O(log k) once the sketch stops changing"""
+        values, cumulative = self._weighted()
+        position = (bisect.bisect_right if inclusive else bisect.bisect_left)(values, value)
+        # Compaction turns 2m values of weight w into m of weight 2w, so weights sum to count
+        return cumulative[position - 1] if position else 0
+
+    def percentile(self, value):
+        """Share of values below value, 0-100, counting ties as half; None for an empty sketch
+
+        Ties matter for count metrics such as missed targets, where most of
+        the population shares the best possible value.
+        """
+        if not self.count:
+            return None
+        return 50 * (self.rank(value, inclusive=False) + self.rank(value)) / self.count
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0-1); None for an empty sketch"""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        values, cumulative = self._weighted()
+        return values[min(len(values) - 1, bisect.bisect_left(cumulative, q * cumulative[-1]))]
+
+    def to_dict(self):
+        return {"k": self.k, "count": self.count, "min": self.min if self.count else None,
+                "max": self.max if self.count else None, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data, seed=None):
+        sketch = cls(data["k"], seed=seed)
+        sketch.levels = [list(map(float, items)) for items in data["levels"]] or [[]]
+        sketch.retained = sum(len(items) for items in sketch.levels)
+        sketch._budget = sketch.max_retained
+        sketch.count = int(data["count"])
+        if sketch.count:
+            sketch.min, sketch.max = float(data["min"]), float(data["max"])
+        return sketch
@@ -0,0 +1,154 @@
+"""Minimal NumPy drawing primitives for rendering reports without a display.
+
+Images are (height, width, 3) uint8 arrays. Shapes are rasterized as
+boolean masks over their bounding box only, and text uses a built-in 5x7
+bitmap font (upper case, digits and a little punctuation) scaled by
+whole pixels. Angles follow Tk's create_arc convention: degrees
+counter-clockwise from 3 o'clock, so report layouts can copy canvas code.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# Tk's values for the colour names used on the canvas
+COLORS = {
+    "white": (255, 255, 255), "black": (0, 0, 0), "gray": (190, 190, 190), "lightgray": (211, 211, 211),
+    "red": (255, 0, 0), "green": (0, 255, 0), "orange": (255, 165, 0), "blue": (0, 0, 255),
+}
+
+GLYPH_WIDTH, GLYPH_HEIGHT = 5, 7
+
+# Rows of each glyph, top to bottom, as 5-pixel bit strings
+_FONT_ROWS = {
+    "A": "01110 10001 10001 11111 10001 10001 10001", "B": "11110 10001 10001 11110 10001 10001 11110",
+    "C": "01110 10001 10000 10000 10000 10001 01110", "D": "11110 10001 10001 10001 10001 10001 11110",
+    "E": "11111 10000 10000 11110 10000 10000 11111", "F": "11111 10000 10000 11110 10000 10000 10000",
+    "G": "01110 10001 10000 10111 10001 10001 01111", "H": "10001 10001 10001 11111 10001 10001 10001",
+    "I": "01110 00100 00100 00100 00100 00100 01110", "J": "00111 00010 00010 00010 00010 10010 01100",
+    "K": "10001 10010 10100 11000 10100 10010 10001", "L": "10000 10000 10000 10000 10000 10000 11111",
+    "M": "10001 11011 10101 10101 10001 10001 10001", "N": "10001 10001 11001 10101 10011 10001 10001",
+    "O": "01110 10001 10001 10001 10001 10001 01110", "P": "11110 10001 10001 11110 10000 10000 10000",
+    "Q": "01110 10001 10001 10001 10101 10010 01101", "R": "11110 10001 10001 11110 10100 10010 10001",
+    "S": "01111 10000 10000 01110 00001 00001 11110", "T": "11111 00100 00100 00100 00100 00100 00100",
+    "U": "10001 10001 10001 10001 10001 10001 01110", "V": "10001 10001 10001 10001 10001 01010 00100",
+    "W": "10001 10001 10001 10101 10101 10101 01010", "X": "10001 10001 01010 00100 01010 10001 10001",
+    "Y": "10001 10001 10001 01010 00100 00100 00100", "Z": "11111 00001 00010 00100 01000 10000 11111",
+    "0": "01110 10001 10011 10101 11001 10001 01110", "1": "00100 01100 00100 00100 00100 00100 01110",
+    "2": "01110 10001 00001 00010 00100 01000 11111", "3": "11111 00010 00100 00010 00001 10001 01110",
+    "4": "00010 00110 01010 10010 11111 00010 00010", "5": "11111 10000 11110 00001 00001 10001 01110",
+    "6": "00110 01000 10000 11110 10001 10001 01110", "7": "11111 00001 00010 00100 01000 01000 01000",
+    "8": "01110 10001 10001 01110 10001 10001 01110", "9": "01110 10001 10001 01111 00001 00010 01100",
+    " ": "00000 00000 00000 00000 00000 00000 00000", ".": "00000 00000 00000 00000 00000 01100 01100",
+    ":": "00000 01100 01100 00000 01100 01100 00000", "/": "00000 00001 00010 00100 01000 10000 00000",
+    "%": "11000 11001 00010 00100 01000 10011 00011", "-": "00000 00000 00000 11111 00000 00000 00000",
+    "+": "00000 00100 00100 11111 00100 00100 00000", ",": "00000 00000 00000 00000 01100 00100 01000",
+    "(": "00010 00100 01000 01000 01000 00100 00010", ")": "01000 00100 00010 00010 00010 00100 01000",
+    "'": "00100 00100 01000 00000 00000 00000 00000", "²": "01100 10010 00100 01000 11110 00000 00000",
+    "?": "01110 10001 00001 00010 00100 00000 00100", "_": "00000 00000 00000 00000 00000 00000 11111",
+}
+FONT = {char: np.array([[bit == "1" for bit in row] for row in rows.split()]) for char, rows in _FONT_ROWS.items()}
+
+
+def new_image(width, height, background="white"):
+    return np.full((height, width, 3), COLORS[background], dtype=np.uint8)
+
+
+def _rgb(color):
+    return COLORS[color] if isinstance(color, str) else color
+
+
+def _clip_box(shape, x1, y1, x2, y2):
+    """Integer pixel bounds of a box clipped to an image of this shape (x2/y2 exclusive)"""
+    height, width = shape[:2]
+    return (max(0, int(np.floor(x1))), max(0, int(np.floor(y1))),
+            min(width, int(np.ceil(x2))), min(height, int(np.ceil(y2))))
+
+
+def fill_rect(image, x1, y1, x2, y2, color):
+    left, top, right, bottom = _clip_box(image.shape, x1, y1, x2, y2)
+    image[top:bottom, left:right] = _rgb(color)
+
+
+def outline_rect(image, x1, y1, x2, y2, color, width=1):
+    fill_rect(image, x1, y1, x2, y1 + width, color)
+    fill_rect(image, x1, y2 - width, x2, y2, color)
+    fill_rect(image, x1, y1, x1 + width, y2, color)
+    fill_rect(image, x2 - width, y1, x2, y2, color)
+
+
+@lru_cache(maxsize=32)
+def _disc_coords(shape, cx, cy, radius):
+    """Bounding box of a disc plus pixel-centre distances and Tk-style angles inside it
+
+    Cached: reports draw the same few discs every time.
+    """
+    left, top, right, bottom = _clip_box(shape, cx - radius - 1, cy - radius - 1, cx + radius + 1, cy + radius + 1)
+    ys, xs = np.mgrid[top:bottom, left:right] + 0.5
+    dx, dy = xs - cx, cy - ys  # y up, as on a Tk arc
+    distance, angle = np.hypot(dx, dy), np.degrees(np.arctan2(dy, dx)) % 360
+    distance.flags.writeable = angle.flags.writeable = False
+    return (left, top, right, bottom), distance, angle
+
+
+def fill_arc(image, cx, cy, radius, start, extent, color, inner_radius=0.0):
+    """Pie slice (or ring sector with inner_radius) like Canvas.create_arc(style=PIESLICE)"""
+    if extent <= 0:
+        return
+    (left, top, right, bottom), distance, angle = _disc_coords(image.shape, cx, cy, radius)
+    mask = (distance <= radius) & (distance >= inner_radius)
+    if extent < 360:
+        mask &= (angle - start) % 360 <= extent
+    image[top:bottom, left:right][mask] = _rgb(color)
+
+
+def ring(image, cx, cy, radius, color, width=2):
+    """Circle outline like Canvas.create_oval(outline=..., width=...)"""
+    (left, top, right, bottom), distance, _ = _disc_coords(image.shape, cx, cy, radius + width)
+    mask = np.abs(distance - radius) <= width / 2
+    image[top:bottom, left:right][mask] = _rgb(color)
+
+
+def blend(image, rgba, left=0, top=0):
+    """Alpha-composite an (h, w, 4) uint8 overlay onto image at (left, top)"""
+    height, width = rgba.shape[:2]
+    region = image[top:top + height, left:left + width]
+    rgba = rgba[:region.shape[0], :region.shape[1]]
+    alpha = rgba[..., 3:4].astype(np.float32) / 255
+    region[...] = (rgba[..., :3] * alpha + region * (1 - alpha)).round().astype(np.uint8)
+
+
+def text_size(text, scale=2):
+    """(width, height) in px of text drawn at scale"""
+    return max(0, len(text) * (GLYPH_WIDTH + 1) - 1) * scale, GLYPH_HEIGHT * scale
+
+
+@lru_cache(maxsize=None)
+def _glyph_mask(char, scale):
+    """Boolean mask of one character enlarged by scale"""
+    mask = np.kron(FONT.get(char, FONT["?"]), np.ones((scale, scale), dtype=bool))
+    mask.flags.writeable = False
+    return mask
+
+
+def draw_text(image, x, y, text, color="black", scale=2, anchor="center"):
+    """Draw text centred on (x, y), or starting at x for anchor="w" / ending at x for anchor="e"
+
+    Letters are drawn upper case; characters without a glyph become "?".
+    """
+    text = text.upper()
+    width, height = text_size(text, scale)
+    left = {"center": x - width / 2, "w": x, "e": x - width}[anchor]
+    top = int(round(y - height / 2))
+    left = int(round(left))
+    rgb = _rgb(color)
+    image_height, image_width = image.shape[:2]
+    for index, char in enumerate(text):
+        mask = _glyph_mask(char, scale)
+        gx = left + index * (GLYPH_WIDTH + 1) * scale
+        # Clip the glyph to the image
+        x0, y0 = max(0, -gx), max(0, -top)
+        x1 = min(mask.shape[1], image_width - gx)
+        y1 = min(mask.shape[0], image_height - top)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        image[top + y0:top + y1, gx + x0:gx + x1][mask[y0:y1, x0:x1]] = rgb
@@ -0,0 +1,284 @@
+"""Deterministic, display-free replay of recorded input events.
+
+Recorded event streams (the ``events/<session>.json`` files saved next to the
+session store) are fed through the real TaskBasedAnalyzer handlers. Tk is
+replaced by a virtual clock and an in-memory canvas: after() callbacks run
+in timestamp order as soon as the replay reaches them, never sleeping, so
+the target test's animation, timeouts and create_new_target flow all run as
+fast as the CPU allows. Each "start" event carries the RNG seed, canvas size
+and target sliders the GUI used, so spawns are reproduced exactly; the
+--seed, --speed, --timeout and --targets flags only fill in settings that
+older logs did not record.
+
+    python replay.py sessions/events/<id>.json --seed 1
+"""
+import argparse
+import heapq
+import itertools
+import json
+import sys
+
+from Main import TEST_SETTINGS, TaskBasedAnalyzer
+from batch_score import to_builtin
+from latency_profiler import HandlerProfiler
+from template_paths import TEMPLATE_BUILDERS
+
+
+class VirtualRoot:
+    """Stand-in for tk.Tk with a simulated clock driving after() callbacks"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.queue = []
+        self.cancelled = set()
+        self.job_ids = itertools.count(1)
+
+    def clock(self):
+        return self.now
+
+    def after(self, ms, callback, *args):
+        job = next(self.job_ids)
+        heapq.heappush(self.queue, (self.now + ms / 1000, job, callback, args))
+        return job
+
+    def after_cancel(self, job):
+        self.cancelled.add(job)
+
+    def update(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def run_until(self, t):
+        """Run every callback due at or before t, advancing the clock as they fire"""
+        while self.queue and self.queue[0][0] <= t:
+            due, job, callback, args = heapq.heappop(self.queue)
+            if job in self.cancelled:
+                self.cancelled.discard(job)
+                continue
+            self.now = max(self.now, due)
+            callback(*args)
+        self.now = max(self.now, t)
+
+    def run_all(self, limit=3600.0):
+        """Drain the queue (bounded by limit seconds of simulated time)"""
+        self.run_until(self.now + limit)
+
+
+class VirtualCanvas:
+    """In-memory canvas that tracks item coordinates and tags like tk.Canvas"""
+
+    def __init__(self, width=800, height=600):
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.item_ids = itertools.count(1)
+
+    def _create(self, kind, coords, options):
+        if len(coords) == 1 and isinstance(coords[0], (list, tuple)):
+            coords = coords[0]
+        tags = options.get("tags", ())
+        item = next(self.item_ids)
+        self.items[item] = {"type": kind, "coords": [float(c) for c in coords],
+                            "tags": {tags} if isinstance(tags, str) else set(tags), "options": options}
+        return item
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self._create("oval", coords, options)
+
+    def create_arc(self, *coords, **options):
+        return self._create("arc", coords, options)
+
+    def create_image(self, *coords, **options):
+        return self._create("image", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def _matching(self, tag_or_id):
+        if tag_or_id == "all":
+            return list(self.items)
+        if tag_or_id in self.items:
+            return [tag_or_id]
+        return [item for item, data in self.items.items() if tag_or_id in data["tags"]]
+
+    def coords(self, item, *coords):
+        if item not in self.items:
+            return []
+        if coords:
+            if len(coords) == 1 and isinstance(coords[0], (list, tuple)):
+                coords = coords[0]
+            self.items[item]["coords"] = [float(c) for c in coords]
+        return list(self.items[item]["coords"])
+
+    def move(self, tag_or_id, dx, dy):
+        for item in self._matching(tag_or_id):
+            coords = self.items[item]["coords"]
+            coords[0::2] = [x + dx for x in coords[0::2]]
+            coords[1::2] = [y + dy for y in coords[1::2]]
+
+    def itemconfig(self, tag_or_id, **options):
+        for item in self._matching(tag_or_id):
+            self.items[item]["options"].update(options)
+
+    def delete(self, tag_or_id):
+        for item in self._matching(tag_or_id):
+            del self.items[item]
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+
+class VirtualWidget:
+    """Label/variable/slider stand-in that just remembers its value"""
+
+    def __init__(self, value=None):
+        self.value = value
+        self.options = {}
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    @property
+    def text(self):
+        return self.options.get("text")
+
+
+class ReplayEvent:
+    """Minimal Tk event carrying a canvas position"""
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class ReplayAnalyzer(TaskBasedAnalyzer):
+    """TaskBasedAnalyzer wired to the virtual root and canvas instead of Tk widgets"""
+
+    def __init__(self, seed=0, speed=2, timeout_sec=3, profiler=None, targets=1):
+        self.root = VirtualRoot()
+        self.init_state(session_dir=None, profiler=profiler)
+        self.clock = self.frame_clock = self.root.clock
+        self.rng.seed(seed)
+
+        self.canvas = VirtualCanvas()
+        self.setup_canvas_helpers()
+        self.result_label = VirtualWidget()
+        self.debug_label = VirtualWidget()
+        self.line_status = VirtualWidget()
+        self.square_status = VirtualWidget()
+        self.target_status = VirtualWidget()
+        self.template_status = {name: VirtualWidget() for name in TEMPLATE_BUILDERS}
+        self.debug_var = VirtualWidget(False)
+        self.speed_slider = VirtualWidget(speed)
+        self.timeout_slider = VirtualWidget(timeout_sec)
+        self.concurrency_slider = VirtualWidget(targets)
+
+    def make_photo(self, data):
+        return data  # No Tk images without a display; the PNG data stands in for one
+
+    def apply_test_settings(self, settings):
+        super().apply_test_settings(settings)
+        self.canvas.width, self.canvas.height = self.canvas_width, self.canvas_height
+
+    def dispatch(self, event):
+        """Deliver one recorded event to the same handlers Tk would call"""
+        kind = event["type"]
+        if kind == "start":
+            self.start_specific_test(event["test"], {key: event[key] for key in TEST_SETTINGS if key in event})
+            return
+        tk_event = ReplayEvent(event["x"], event["y"])
+        if kind == "press":
+            # <ButtonPress-1> and <Button-1> are the same binding in the GUI
+            self.on_mouse_down(tk_event)
+            self.on_target_click(tk_event)
+        elif kind == "release":
+            self.on_mouse_up(tk_event)
+        elif kind == "motion":
+            self.on_mouse_move(tk_event)
+        else:
+            raise ValueError(f"Unknown event type {kind!r}")
+
+    def replay(self, events):
+        """Feed an event stream through the task state machine; returns the results dict
+
+        Event times are taken relative to the first event. Pending timers
+        (target timeouts, new targets) are drained after the last event.
+        """
+        if not events:
+            return self.results
+        origin = events[0]["t"]
+        for event in events:
+            self.root.run_until(event["t"] - origin)
+            self.dispatch(event)
+        self.root.run_all()
+        self.stroke_renderer.reset()
+        return self.results
+
+
+def load_events(path):
+    """Read an event log written by the GUI"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def replay_events(events, seed=0, speed=2, timeout_sec=3, profiler=None, targets=1):
+    """Replay one event stream headlessly and return (results, risk_score or None)"""
+    analyzer = ReplayAnalyzer(seed=seed, speed=speed, timeout_sec=timeout_sec, profiler=profiler, targets=targets)
+    results = analyzer.replay(events)
+    risk_score = analyzer.calculate_risk_score() if analyzer.engine.is_complete() else None
+    return results, risk_score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded test sessions without a display")
+    parser.add_argument("event_logs", nargs="+", help="Event log .json files")
+    # Fallbacks for logs whose start events predate the recorded settings
+    parser.add_argument("--seed", type=int, default=0, help="Seed for target spawning (if not logged)")
+    parser.add_argument("--speed", type=float, default=2, help="Target speed slider value (if not logged)")
+    parser.add_argument("--timeout", type=float, default=3, help="Target timeout slider value in sec (if not logged)")
+    parser.add_argument("--targets", type=int, default=1, help="Targets on screen at once (if not logged)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Time every handler during the replays and write the histograms here "
+                             "(run times only; virtual timers make queue delays meaningless)")
+    args = parser.parse_args(argv)
+
+    profiler = None
+    if args.profile:
+        profiler = HandlerProfiler()
+        profiler.enabled = True
+    for path in args.event_logs:
+        results, risk_score = replay_events(load_events(path), args.seed, args.speed, args.timeout, profiler,
+                                             args.targets)
+        print(json.dumps({"path": path, "risk_score": None if risk_score is None else float(risk_score),
+                          "results": to_builtin(results)}))
+    if profiler is not None:
+        profiler.export(args.profile)
+        print(profiler.summary_text(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""Render a results image per recorded session without a display.
+
+Each report redraws what visualize_results puts on the canvas, at the
+same coordinates: the line and square deviation bars, the target
+accuracy ring and the risk meter. Below the meter it adds both drawings,
+scaled down over their templates and coloured by deviation
+(deviation_heatmap.py). Everything is rasterized with NumPy
+(raster_draw.py) and written as PNG or PPM, so no Tk, display or
+imaging library is needed.
+
+    python report_renderer.py sessions/ -o reports/ -j 0
+    python report_renderer.py --store sessions/ -o reports/ --format ppm
+
+With more than one worker, every process builds its own scoring engine
+once and receives only file paths or session IDs. Each worker scores,
+draws and writes its reports to staging files itself, so no image data
+crosses process boundaries; the parent only renames them into place.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from contextlib import suppress
+from functools import lru_cache
+from itertools import count
+
+from batch_score import SESSION_ERRORS, add_tremor_arguments, iter_session_files, load_session, resample_rate
+from deviation_heatmap import crop_to_content, encode_png, encode_ppm, rasterize, task_deviations
+from raster_draw import blend, draw_text, fill_arc, fill_rect, new_image, outline_rect, ring
+from scoring import LINE_Y_TARGET, as_points, checked_session, risk_level, square_bounds
+from session_store import SessionStore, SessionStoreError
+
+REPORT_WIDTH, REPORT_HEIGHT = 800, 980
+METER_CENTER, METER_RADIUS = (400, 500), 150
+PANEL_SCALE = 0.45  # Trajectory panels show the 800x600 canvas at this size
+PANEL_WIDTH, PANEL_HEIGHT = int(800 * PANEL_SCALE), int(600 * PANEL_SCALE)
+PANEL_TOP = 690
+PANEL_LEFTS = {"line": 20, "square": 420}
+TEMPLATE_WIDTH = 20  # Width of the grey template drawn by the GUI
+FORMATS = {"png": encode_png, "ppm": encode_ppm}
+CHUNKSIZE = 8
+
+# Worker-side state, set up once per process by _init_worker
+_worker = {}
+_staged = count()  # Numbers each process's staging files
+
+
+@lru_cache(maxsize=1)
+def report_background():
+    """Everything that is the same on every report, drawn once per process (read-only)"""
+    image = new_image(REPORT_WIDTH, REPORT_HEIGHT)
+    draw_text(image, 400, 50, "TEST RESULTS VISUALIZATION", scale=3)
+    for center_x, title in ((200, "Line Test"), (600, "Square Test")):
+        draw_text(image, center_x, 100, title, scale=2)
+        fill_rect(image, center_x - 100, 170, center_x + 100, 190, "lightgray")
+    draw_text(image, 400, 250, "Target Test", scale=2)
+
+    # Risk meter background semicircle with a grey edge
+    fill_arc(image, METER_CENTER[0], METER_CENTER[1], METER_RADIUS, 180, 180, "gray")
+    fill_arc(image, METER_CENTER[0], METER_CENTER[1], METER_RADIUS - 1, 180, 180, "lightgray")
+
+    for task, left in PANEL_LEFTS.items():
+        draw_text(image, left + PANEL_WIDTH / 2, PANEL_TOP - 15, f"{task} drawing", scale=2)
+        draw_template(image, task, left, PANEL_TOP)
+    image.flags.writeable = False
+    return image
+
+
+def draw_template(image, task, left, top):
+    """The task's template outline in grey, scaled into a panel"""
+    half = TEMPLATE_WIDTH * PANEL_SCALE / 2
+    if task == "line":
+        y = top + LINE_Y_TARGET * PANEL_SCALE
+        fill_rect(image, left + 100 * PANEL_SCALE, y - half, left + 700 * PANEL_SCALE, y + half, "lightgray")
+    else:
+        x1, y1, x2, y2 = (value * PANEL_SCALE for value in square_bounds())
+        outline_rect(image, left + x1 - half, top + y1 - half, left + x2 + half, top + y2 + half, "lightgray",
+                     width=int(round(2 * half)))
+
+
+def draw_deviation_bar(image, center_x, mse):
+    """Deviation bar under a drawing test title, as in visualize_results"""
+    left = center_x - 100
+    if mse is not None:
+        fill_rect(image, left, 170, left + min(1.0, mse / 200) * 200, 190, "red")
+    outline_rect(image, left, 170, left + 200, 190, "gray")
+    draw_text(image, center_x, 205, "Deviation: not recorded" if mse is None else f"Deviation: {mse:.1f} px²")
+
+
+def draw_accuracy_ring(image, clicked, missed, avg_time):
+    """Target accuracy ring and reaction time"""
+    total = clicked + missed
+    accuracy = clicked / total if total > 0 else 0
+    fill_arc(image, 400, 320, 50, 90, 360 * accuracy, "green")
+    ring(image, 400, 320, 50, "gray", width=2)
+    draw_text(image, 400, 320, f"{accuracy * 100:.0f}%", scale=2)
+    draw_text(image, 400, 385, f"Accuracy: {clicked}/{total} targets")
+    draw_text(image, 400, 410, "Avg Reaction: -" if avg_time is None else f"Avg Reaction: {avg_time:.2f}s")
+
+
+def draw_risk_meter(image, risk_score):
+    """Risk indicator over the meter background; labelled incomplete without a score"""
+    center_x, center_y = METER_CENTER
+    if risk_score is None:
+        draw_text(image, center_x, center_y - 30, "INCOMPLETE", "gray", scale=3)
+        return
+    level, color = risk_level(risk_score)
+    fill_arc(image, center_x, center_y, METER_RADIUS, 180, 180 * (risk_score / 10), color)
+    draw_text(image, center_x, center_y - 30, f"{level.upper()} RISK", color, scale=3)
+    draw_text(image, center_x, center_y, f"Score: {risk_score:.1f}/10", color)
+
+
+def draw_trajectory(image, task, movements):
+    """One drawing over its template, coloured by each sample's deviation"""
+    left = PANEL_LEFTS[task]
+    points = as_points([] if movements is None else movements)
+    if len(points):
+        # Deviations are measured at canvas scale, only the strokes are shrunk
+        deviations = task_deviations(task, points)
+        scaled = points.copy()
+        scaled[:, :2] *= PANEL_SCALE
+        stroke, stroke_left, stroke_top = crop_to_content(
+            rasterize(scaled, deviations, PANEL_WIDTH, PANEL_HEIGHT, radius=2))
+        blend(image, stroke, left + stroke_left, PANEL_TOP + stroke_top)
+    else:
+        draw_text(image, left + PANEL_WIDTH / 2, PANEL_TOP + 30, "not recorded", "gray")
+    outline_rect(image, left, PANEL_TOP, left + PANEL_WIDTH, PANEL_TOP + PANEL_HEIGHT, "gray")
+
+
+def render_report(session, results, risk_score, session_id=None):
+    """(REPORT_HEIGHT, REPORT_WIDTH, 3) uint8 report image for a scored session"""
+    image = report_background().copy()
+    if session_id is not None:
+        draw_text(image, 400, 75, f"Session {session_id}", "gray", scale=1)
+
+    draw_deviation_bar(image, 200, results["line"]["mse"])
+    draw_deviation_bar(image, 600, results["square"]["mse"])
+
+    target = session.get("target") or {}
+    click_times = target.get("click_times")
+    draw_accuracy_ring(image, 0 if click_times is None else len(click_times), int(target.get("missed") or 0),
+                       results["target"]["avg_time"])
+
+    draw_risk_meter(image, risk_score)
+    for task in PANEL_LEFTS:
+        draw_trajectory(image, task, session.get(task))
+    return image
+
+
+def write_report(path, image, fmt="png"):
+    """Encode and write one report to path"""
+    with open(path, "wb") as f:
+        f.write(FORMATS[fmt](image))
+
+
+def is_plain_name(name):
+    """True if name can be used as a file name inside the output directory as-is"""
+    separators = {os.sep, os.altsep, "/", "\\", "\0"} - {None}
+    return (isinstance(name, str) and name not in ("", ".", "..")
+            and not any(separator in name for separator in separators))
+
+
+def report_path(out_dir, session_id, fmt="png", fallback=None):
+    """Report path for a session, always directly inside out_dir
+
+    Session IDs come from the recordings themselves, so one holding a path
+    separator or ".." is replaced by fallback (e.g. the file stem) or, failing
+    that, a hash of the ID.
+    """
+    name = str(session_id)
+    if not is_plain_name(name):
+        name = fallback if is_plain_name(fallback) else f"session-{hashlib.sha1(name.encode()).hexdigest()[:16]}"
+    return os.path.join(out_dir, f"{name}.{fmt}")
+
+
+def unique_report_path(path, taken):
+    """path, or path with a -2, -3, ... suffix if an earlier report in this run took it; adds it to taken"""
+    stem, ext = os.path.splitext(path)
+    candidate, n = path, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{stem}-{n}{ext}"
+    taken.add(candidate)
+    return candidate
+
+
+def render_session(engine, session, session_id, path, fmt="png"):
+    """Score one session and write its report to path"""
+    results, risk_score = engine.score_session(session)
+    write_report(path, render_report(session, results, risk_score, session_id), fmt)
+
+
+def _init_worker(out_dir, fmt, store_path=None, resample_hz=None, cache_dir=None, norms_path=None,
+                 tremor_weight=0.0, tremor_metrics=False):
+    """Build the per-process engine (and open the session store) once"""
+    from parallel_score import make_engine
+    _worker["engine"] = make_engine(resample_hz, cache_dir, norms_path, tremor_weight, tremor_metrics)
+    _worker["store"] = SessionStore(store_path, create=False) if store_path else None
+    _worker["out_dir"], _worker["fmt"] = out_dir, fmt
+
+
+def _render_job(job):
+    """Render one file path (or store session ID) to a staging file next to its report path
+
+    Returns (job, report path, staging path, error); render_all moves the
+    staging file into place.
+    """
+    try:
+        fallback = None
+        if _worker["store"] is not None:
+            session, session_id = checked_session(_worker["store"].get(job)), job
+        else:
+            session = checked_session(load_session(job))
+            fallback = os.path.splitext(os.path.basename(job))[0]
+            session_id = session.get("id", fallback)
+        path = report_path(_worker["out_dir"], session_id, _worker["fmt"], fallback)
+        staged = f"{path}.{os.getpid()}-{next(_staged)}.tmp"
+        try:
+            render_session(_worker["engine"], session, session_id, staged, _worker["fmt"])
+        except BaseException:
+            with suppress(OSError):
+                os.remove(staged)
+            raise
+        return job, path, staged, None
+    except (OSError, *SESSION_ERRORS) as exc:
+        return job, None, None, str(exc)
+
+
+def render_all(jobs, out_dir, fmt="png", workers=1, store_path=None, resample_hz=None, cache_dir=None,
+               norms_path=None, chunksize=CHUNKSIZE, tremor_weight=0.0, tremor_metrics=False):
+    """Render every job (file paths, or session IDs with store_path); yields (job, report path or None, error)
+
+    Reports are moved into place here, in job order, so two sessions with
+    the same ID get distinct files (see unique_report_path) instead of one
+    silently replacing the other.
+    """
+    initargs = (out_dir, fmt, store_path, resample_hz, cache_dir, norms_path, tremor_weight, tremor_metrics)
+    taken = set()
+    for job, path, staged, error in _render_jobs(jobs, workers, initargs, chunksize):
+        if path is None:
+            yield job, None, error
+            continue
+        final = unique_report_path(path, taken)
+        if final != path:
+            print(f"{job}: {os.path.basename(path)} already written by an earlier session, "
+                  f"using {os.path.basename(final)}", file=sys.stderr)
+        try:
+            os.replace(staged, final)
+        except OSError as exc:
+            yield job, None, str(exc)
+            continue
+        yield job, final, None
+
+
+def _render_jobs(jobs, workers, initargs, chunksize):
+    """_render_job over jobs in order, in this process or on a pool"""
+    if workers == 1:
+        _init_worker(*initargs)
+        yield from map(_render_job, jobs)
+        return
+    from multiprocessing import Pool
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.imap(_render_job, jobs, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a results image for every recorded session")
+    parser.add_argument("directory", help="Directory of session .json files (or a session store with --store)")
+    parser.add_argument("-o", "--output", required=True, help="Directory to write the reports to")
+    parser.add_argument("--store", action="store_true",
+                        help="Treat directory as a session store written by the GUI")
+    parser.add_argument("--suffix", default=".json", help="Session file suffix (default: .json)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="png", help="Image format (default: png)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Render on this many processes (0 = one per CPU core)")
+    parser.add_argument("--resample-hz", type=resample_rate,
+                        help="Resample drawings onto a uniform grid at this rate before scoring")
+    parser.add_argument("--cache-dir", help="Reuse line/square results cached in this directory across runs")
+    parser.add_argument("--norms", metavar="DB", help="Score against population percentiles from this norms database")
+    add_tremor_arguments(parser)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        if args.store:
+            jobs = SessionStore(args.directory, create=False).ids()
+        else:
+            jobs = list(iter_session_files(args.directory, args.suffix))
+        os.makedirs(args.output, exist_ok=True)
+        rendered = failed = 0
+        for job, path, error in render_all(jobs, args.output, args.format, args.workers or os.cpu_count() or 1,
+                                           args.directory if args.store else None, args.resample_hz,
+                                           args.cache_dir, args.norms, tremor_weight=args.tremor_weight,
+                                           tremor_metrics=args.tremor_metrics):
+            if path is None:
+                print(f"{job}: skipped ({error})", file=sys.stderr)
+                failed += 1
+            else:
+                rendered += 1
+    except (OSError, SessionStoreError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    print(f"Rendered {rendered} reports ({failed} skipped) in {elapsed:.2f}s - {rate:.0f} reports/sec",
+          file=sys.stderr)
+    return 1 if failed and not rendered else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
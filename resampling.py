@@ -0,0 +1,50 @@
+"""Resample irregular mouse event streams onto a fixed-rate time grid."""
+import numpy as np
+
+
+def collapse_duplicate_times(points):
+    """Sort samples by time and merge samples sharing a timestamp (positions averaged)"""
+    points = np.asarray(points, dtype=float)
+    t = points[:, 2]
+    if len(t) > 1 and np.any(t[1:] < t[:-1]):
+        points = points[np.argsort(t, kind='stable')]
+        t = points[:, 2]
+
+    duplicates = t[1:] == t[:-1]
+    if not duplicates.any():
+        return points
+
+    times, groups, counts = np.unique(t, return_inverse=True, return_counts=True)
+    merged = np.empty((len(times), 3))
+    merged[:, 0] = np.bincount(groups, weights=points[:, 0]) / counts
+    merged[:, 1] = np.bincount(groups, weights=points[:, 1]) / counts
+    merged[:, 2] = times
+    return merged
+
+
+def resample_uniform(movements, rate_hz=100):
+    """Linearly interpolate (x, y, t) samples onto a uniform grid at rate_hz
+
+    The grid starts at the first timestamp and covers the whole recording,
+    so every step is exactly 1 / rate_hz seconds. Recordings with fewer
+    than two distinct timestamps are returned as-is after collapsing.
+    """
+    if rate_hz <= 0:
+        raise ValueError("rate_hz must be positive")
+
+    points = np.asarray(movements, dtype=float)
+    if len(points) == 0:
+        return np.empty((0, 3))
+    points = collapse_duplicate_times(points)
+    if len(points) < 2:
+        return points
+
+    t = points[:, 2]
+    steps = int(np.floor((t[-1] - t[0]) * rate_hz + 1e-9))
+    grid = t[0] + np.arange(steps + 1) / rate_hz
+
+    resampled = np.empty((len(grid), 3))
+    resampled[:, 0] = np.interp(grid, t, points[:, 0])
+    resampled[:, 1] = np.interp(grid, t, points[:, 1])
+    resampled[:, 2] = grid
+    return resampled
@@ -0,0 +1,129 @@
+"""Content-addressed cache of per-task drawing results.
+
+Keys hash the raw movement samples together with the task name, the
+template geometry, the resampling rate and SCORING_VERSION, so a changed
+recording or changed scoring rules can never hit a stale entry. Results
+live in an in-memory LRU bounded by an approximate byte budget, with an
+optional directory of small JSON files behind it that survives restarts
+and can be shared by several processes (writes go through os.replace, so
+readers never see a partial file).
+"""
+import collections
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from scoring import SCORING_VERSION, as_points
+
+# Rough cost of one cached entry: key, dict and its float values
+ENTRY_OVERHEAD = 400
+
+
+def result_key(task, movements, params=()):
+    """Hex digest identifying one task recording under the given scoring parameters"""
+    points = np.ascontiguousarray(as_points(movements), dtype=np.float64)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps([SCORING_VERSION, task, list(params), points.shape]).encode())
+    digest.update(points.data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU of task results keyed by result_key, with an optional on-disk tier"""
+
+    key = staticmethod(result_key)
+
+    def __init__(self, max_bytes=32 * 2 ** 20, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries or (self.disk_dir is not None and os.path.exists(self.disk_path(key)))
+
+    def disk_path(self, key):
+        # Two-character fan-out keeps directories small for big cohorts
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        """Cached result dict (a fresh copy) or None on a miss"""
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+        if self.disk_dir:
+            try:
+                with open(self.disk_path(key), "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = None
+            if result is not None:
+                self.disk_hits += 1
+                self._remember(key, result)
+                return dict(result)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Store a task result under key in memory (and on disk if enabled)"""
+        result = {name: (value.item() if hasattr(value, "item") else value) for name, value in result.items()}
+        self._remember(key, result)
+        if self.disk_dir:
+            path = self.disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(result, f)
+                os.replace(temp_path, path)
+            except OSError:
+                # The disk tier is best effort; the memory tier already has the result
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def _remember(self, key, result):
+        if key in self.entries:
+            self.nbytes -= self.entry_size(self.entries.pop(key))
+        self.entries[key] = result
+        self.nbytes += self.entry_size(result)
+        while self.nbytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= self.entry_size(evicted)
+            self.evictions += 1
+
+    @staticmethod
+    def entry_size(result):
+        return ENTRY_OVERHEAD + 64 * len(result)
+
+    def clear(self):
+        """Drop the memory tier (the disk tier is left alone)"""
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(self.entries), "bytes": self.nbytes,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+    def stats_text(self):
+        stats = self.stats()
+        return (f"cache {stats['hit_rate']:.0%} hit ({stats['hits']} mem, {stats['disk_hits']} disk, "
+                f"{stats['misses']} miss), {stats['entries']} entries")
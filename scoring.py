@@ -0,0 +1,527 @@
+"""Display-free scoring engine for the motor skill tests."""
+import math
+
+import numpy as np
+
+from resampling import resample_uniform
+
+# Task geometry (must match what the GUI draws on the canvas)
+LINE_Y_TARGET = 300
+SQUARE_CENTER = (400, 300)
+SQUARE_SIDE = 160
+
+MIN_POINTS = 3
+
+# Steps shorter than this are dropped before differentiating (smoothness), so a
+# uniform resampling grid must be coarser or every step would be dropped
+MIN_STEP_SECONDS = 0.001
+MAX_RESAMPLE_HZ = 1 / MIN_STEP_SECONDS  # Exclusive
+
+# Tests every session needs before a risk score; template tests
+# (template_paths.py) are extra results alongside these
+CORE_TESTS = ("line", "square", "target")
+
+# Bump whenever a change to the scoring math alters results, so cached
+# results computed by older code are never reused
+SCORING_VERSION = 2
+
+# Spectral tremor metrics stored with line/square results (tremor_spectrum.py).
+# They are informative extras: a drawing too short to analyse, or an engine
+# without tremor_metrics, leaves them None without making the session incomplete.
+TREMOR_METRICS = ("tremor_power", "tremor_ratio", "tremor_peak_hz")
+
+
+def empty_results():
+    """Return a fresh results dict with every metric unset"""
+    tremor = dict.fromkeys(TREMOR_METRICS)
+    return {
+        "line": {"mse": None, "time_taken": None, "smoothness": None, **tremor},
+        "square": {"mse": None, "time_taken": None, "smoothness": None, **tremor},
+        "target": {"avg_time": None, "std_dev": None, "missed": None}
+    }
+
+
+def copy_results(results):
+    """Copy of a results dict that later scoring on the same engine cannot change"""
+    return {test: dict(metrics) for test, metrics in results.items()}
+
+
+def flat_metrics(results):
+    """Every numeric metric of a results dict as {"test.metric": value}, skipping unset ones"""
+    return {f"{test}.{name}": float(value) for test, metrics in results.items() for name, value in metrics.items()
+            if isinstance(value, (int, float, np.number)) and not isinstance(value, bool)}
+
+
+def template_tests(session):
+    """Names of the template (polyline) tests recorded in a session dict"""
+    from template_paths import TEMPLATE_BUILDERS
+    return [name for name in TEMPLATE_BUILDERS if session.get(name) is not None]
+
+
+def square_bounds(center=SQUARE_CENTER, side_length=SQUARE_SIDE):
+    """Return the (x1, y1, x2, y2) corners of the template square"""
+    center_x, center_y = center
+    return (center_x - side_length / 2, center_y - side_length / 2,
+            center_x + side_length / 2, center_y + side_length / 2)
+
+
+def risk_level(risk_score):
+    """Map a 0-10 risk score to its (level, color) pair"""
+    if risk_score < 3:
+        return "Low", "green"
+    elif risk_score < 6:
+        return "Moderate", "orange"
+    return "High", "red"
+
+
+def movement_derivatives(movements):
+    """Velocity, acceleration and jerk arrays used by the smoothness score
+
+    Steps shorter than 1 ms are dropped before differentiating, exactly as the
+    smoothness score always has. Accelerations and jerks are absolute changes
+    in speed (per sample, not per second). Each array is computed once and
+    returned as-is so other features can reuse them.
+    """
+    points = as_points(movements)
+    dt = np.diff(points[:, 2])
+    dx = np.diff(points[:, 0])
+    dy = np.diff(points[:, 1])
+
+    # Skip steps where the time difference is too small
+    keep = np.abs(dt) >= MIN_STEP_SECONDS
+    if not keep.all():
+        dt, dx, dy = dt[keep], dx[keep], dy[keep]
+
+    # Velocity (distance/time); float_power keeps parity with Python's ** operator
+    velocities = np.sqrt(np.float_power(dx, 2) + np.float_power(dy, 2))
+    velocities /= dt
+
+    accelerations = np.diff(velocities)
+    np.abs(accelerations, out=accelerations)
+    jerks = np.diff(accelerations)
+    np.abs(jerks, out=jerks)
+    return velocities, accelerations, jerks
+
+
+def smoothness_from_jerks(jerks):
+    """Map absolute jerks to the 0-10 smoothness scale (higher is smoother)"""
+    return smoothness_from_mean_jerk(np.mean(jerks) if len(jerks) else 0)
+
+
+def smoothness_from_mean_jerk(mean_jerk):
+    """Map a mean absolute jerk to the 0-10 smoothness scale"""
+    # Using exponential decay function to map jerk to smoothness
+    smoothness = 10 * math.exp(-mean_jerk / 50)
+
+    # Ensure bounds
+    return max(0, min(10, smoothness))
+
+
+def smoothness_profile(movements):
+    """Smoothness score together with the derivative arrays it was computed from"""
+    empty = np.empty(0)
+    if len(movements) < 3:
+        # Default value for very few points
+        return {"smoothness": 5.0, "velocities": empty, "accelerations": empty, "jerks": empty}
+
+    velocities, accelerations, jerks = movement_derivatives(movements)
+    if len(velocities) < 2:
+        smoothness = 5.0
+    else:
+        smoothness = smoothness_from_jerks(jerks)
+    return {"smoothness": smoothness, "velocities": velocities,
+            "accelerations": accelerations, "jerks": jerks}
+
+
+def calculate_smoothness(movements):
+    """Calculate drawing smoothness based on velocity changes"""
+    return smoothness_profile(movements)["smoothness"]
+
+
+def as_points(movements):
+    """View movements as a float (N, 3) array of x, y, t (no copy if already a float array)
+
+    Raises ValueError for anything else, so malformed recordings are rejected
+    up front instead of failing part-way through scoring.
+    """
+    points = np.asarray(movements, dtype=float)
+    if points.size == 0:
+        return np.empty((0, 3))
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError(f"Expected [x, y, t] samples, got an array of shape {points.shape}")
+    return points
+
+
+def checked_session(session):
+    """Copy of a session dict with its recordings converted to arrays
+
+    Raises ValueError (or TypeError) if the session or its target is not a
+    dict, a drawing is not (N, 3) samples, the click times are not a flat list
+    of numbers or missed/age are not numbers, so callers can skip a bad
+    session before it joins a batch.
+    """
+    if not isinstance(session, dict):
+        raise TypeError(f"Expected a session object, got {type(session).__name__}")
+    checked = dict(session)
+    for task in ("line", "square", *template_tests(session)):
+        if session.get(task) is not None:
+            checked[task] = as_points(session[task])
+    target = session.get("target")
+    if target is not None:
+        if not isinstance(target, dict):
+            raise TypeError(f"Expected a target object, got {type(target).__name__}")
+        checked["target"] = dict(target)
+        click_times = target.get("click_times")
+        if click_times is not None:
+            click_times = np.asarray(click_times, dtype=float)
+            if click_times.ndim != 1:
+                raise ValueError(f"Expected a list of click times, got an array of shape {click_times.shape}")
+            checked["target"]["click_times"] = click_times
+        int(target.get("missed") or 0)
+    if session.get("age") is not None:
+        float(session["age"])
+    return checked
+
+
+def point_square_distance(x, y, bounds):
+    """Distance from a single sample to the square outline (scalar square_distances)"""
+    x1, y1, x2, y2 = bounds
+    edge = float('inf')
+    if y1 <= y <= y2:
+        edge = min(abs(x - x1), abs(x - x2))
+    if x1 <= x <= x2:
+        edge = min(edge, abs(y - y1), abs(y - y2))
+    corner = math.sqrt(min((x - x1) ** 2, (x - x2) ** 2) + min((y - y1) ** 2, (y - y2) ** 2))
+    return min(edge, corner)
+
+
+def line_distances(points, y_target=LINE_Y_TARGET):
+    """Distance from each sample to the horizontal template line"""
+    return np.abs(np.asarray(points, dtype=float)[:, 1] - y_target)
+
+
+def square_distances(points, bounds=None):
+    """Distance from each (x, y) sample to the nearest part of the square outline
+
+    points is any (N, 2+) array-like; extra columns (e.g. time) are ignored.
+    Matches the original per-sample edge/corner minimum exactly.
+    """
+    x1, y1, x2, y2 = bounds or square_bounds()
+    points = np.asarray(points, dtype=float)
+    x = points[:, 0]
+    y = points[:, 1]
+
+    # Edge distances only count when the sample lies within that edge's span
+    within_y = (y1 <= y) & (y <= y2)
+    within_x = (x1 <= x) & (x <= x2)
+    edge_x = np.where(within_y, np.minimum(np.abs(x - x1), np.abs(x - x2)), np.inf)
+    edge_y = np.where(within_x, np.minimum(np.abs(y - y1), np.abs(y - y2)), np.inf)
+
+    # Nearest corner: the closer x and y corner offsets give the closest corner.
+    # float_power goes through libm pow() like Python's ** does, so results stay
+    # bit-identical to the old per-sample loop (x * x can differ in the last ulp)
+    dx = np.minimum(np.float_power(x - x1, 2), np.float_power(x - x2, 2))
+    dy = np.minimum(np.float_power(y - y1, 2), np.float_power(y - y2, 2))
+    corner = np.sqrt(dx + dy)
+
+    return np.minimum(np.minimum(edge_x, edge_y), corner)
+
+
+def square_mse_batch(sessions, bounds=None):
+    """Square-task MSE for many sessions in a single kernel call
+
+    sessions is a sequence of (N_i, 2+) recordings. They are concatenated,
+    scored together and split back with the session offsets. Empty sessions
+    yield nan.
+    """
+    arrays = [np.asarray(session, dtype=float)[:, :2] if len(session) else np.empty((0, 2))
+              for session in sessions]
+    if not arrays:
+        return np.empty(0)
+
+    lengths = np.array([len(a) for a in arrays])
+    squared = np.float_power(square_distances(np.concatenate(arrays), bounds), 2)
+
+    mse = np.full(len(arrays), np.nan)
+    nonempty = lengths > 0
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+    mse[nonempty] = np.add.reduceat(squared, offsets) / lengths[nonempty]
+    return mse
+
+
+class ScoringEngine:
+    """Scores recorded line, square and target sessions without a display"""
+
+    def __init__(self, resample_hz=None, cache=None, tremor_weight=0.0, norms=None, tremor_metrics=False):
+        if resample_hz and not 0 < resample_hz < MAX_RESAMPLE_HZ:
+            raise ValueError(f"Resample rate must be between 0 and {MAX_RESAMPLE_HZ:g} Hz, got {resample_hz:g}")
+        self.results = empty_results()
+        # When set, drawing metrics run on a uniform time grid at this rate
+        # instead of the raw (OS event rate dependent) sample stream
+        self.resample_hz = resample_hz
+        # Optional ResultCache (result_cache.py) for line/square results
+        self.cache = cache
+        # Share of the risk score given to 4-6 Hz tremor. Off by default so
+        # scores stay comparable with sessions scored before tremor metrics
+        self.tremor_weight = tremor_weight
+        # The spectral tremor metrics cost an FFT per drawing, so they are only
+        # computed when they count towards the risk score or are asked for
+        self.tremor_metrics = bool(tremor_metrics or tremor_weight)
+        # Optional NormativeDB (normative_db.py): risk sub-scores then come from
+        # population percentiles (within the session's age band) instead of fixed cutoffs
+        self.norms = norms
+        self.age = None
+
+    def reset(self):
+        """Forget all stored results (in place, so shared references stay valid)"""
+        self.results.clear()
+        self.results.update(empty_results())
+
+    def prepare_points(self, movements):
+        """Raw samples as an (N, 3) array, resampled if the engine has a resample rate"""
+        points = as_points(movements)
+        if self.resample_hz:
+            points = resample_uniform(points, self.resample_hz)
+        return points
+
+    def analyze_line_task(self, movements, y_target=LINE_Y_TARGET):
+        """Score a Follow Line recording; returns None if it is too short"""
+        if len(movements) < MIN_POINTS:
+            return None
+        key, cached = self.cached_drawing("line", movements, (y_target,))
+        if cached is not None:
+            return cached
+        points = self.prepare_points(movements)
+        return self.store_drawing_metrics("line", movements, points, line_distances(points, y_target), key,
+                                          self.drawing_tremor(movements))
+
+    def analyze_square_task(self, movements, bounds=None):
+        """Score a Draw Square recording; returns None if it is too short"""
+        if len(movements) < MIN_POINTS:
+            return None
+        key, cached = self.cached_drawing("square", movements, bounds or square_bounds())
+        if cached is not None:
+            return cached
+        points = self.prepare_points(movements)
+        return self.store_drawing_metrics("square", movements, points, square_distances(points, bounds), key,
+                                          self.drawing_tremor(movements))
+
+    def analyze_template_task(self, name, movements, template=None):
+        """Score a template test (spiral, circle, ...) recording; returns None if it is too short"""
+        if len(movements) < MIN_POINTS:
+            return None
+        if template is None:
+            from template_paths import get_template
+            template = get_template(name)
+        key, cached = self.cached_drawing(name, movements, (template.fingerprint,))
+        if cached is not None:
+            return cached
+        points = self.prepare_points(movements)
+        return self.store_drawing_metrics(name, movements, points, template.distances(points), key,
+                                          self.drawing_tremor(movements))
+
+    def cached_drawing(self, task, movements, geometry):
+        """Look a drawing up in the cache; returns (key, stored result or None)
+
+        key is None when the engine has no cache.
+        """
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(task, movements, (*geometry, self.resample_hz, self.tremor_metrics))
+        result = self.cache.get(key)
+        if result is not None:
+            self.results[task] = result
+        return key, result
+
+    @staticmethod
+    def tremor_features(movements):
+        """Tremor band power, band ratio and peak frequency of one drawing"""
+        from tremor_spectrum import tremor_features
+        return tremor_features(movements)
+
+    def drawing_tremor(self, movements):
+        """tremor_features of a drawing, or None when the engine skips tremor metrics"""
+        return self.tremor_features(movements) if self.tremor_metrics else None
+
+    def store_drawing_metrics(self, task, movements, points, distances, key=None, tremor=None):
+        """Turn per-sample deviations into the stored line/square results (cached under key if given)"""
+        # Calculate mean squared error
+        mse = np.mean(np.float_power(distances, 2))
+
+        smoothness = calculate_smoothness(points)
+
+        # Calculate time taken to complete the task
+        time_taken = movements[-1][2] - movements[0][2]
+
+        self.results[task] = {"mse": mse, "time_taken": time_taken, "smoothness": smoothness,
+                              **(tremor or dict.fromkeys(TREMOR_METRICS))}
+        if key is not None:
+            self.cache.put(key, self.results[task])
+        return self.results[task]
+
+    def analyze_target_task(self, click_times, missed):
+        """Score a Click Targets session; returns None if nothing was hit"""
+        if len(click_times) == 0:
+            return None
+
+        # Calculate the average reaction time
+        avg_time = np.mean(click_times)
+
+        # Calculate standard deviation
+        std_dev = np.std(click_times) if len(click_times) > 1 else 0
+
+        self.results["target"] = {"avg_time": avg_time, "std_dev": std_dev, "missed": missed}
+        return self.results["target"]
+
+    def store_result(self, task, result):
+        """Record a result computed elsewhere (e.g. by online metrics) for a task"""
+        self.results[task] = dict(result)
+        return self.results[task]
+
+    def is_complete(self):
+        """True once every core test has a full set of results (tremor metrics are optional)"""
+        return not any(value is None for test in CORE_TESTS for name, value in self.results[test].items()
+                       if name not in TREMOR_METRICS)
+
+    def norm_score(self, test, metric, fallback, higher_is_worse=True):
+        """0-5 risk sub-score from a metric's population percentile; fallback without enough norms"""
+        if self.norms is None:
+            return fallback
+        percentile = self.norms.percentile(f"{test}.{metric}", self.results[test][metric], self.age)
+        if percentile is None:
+            return fallback
+        return 5 * (percentile if higher_is_worse else 100 - percentile) / 100
+
+    def calculate_risk_score(self):
+        """Calculate overall risk score from all test results"""
+        results = self.results
+
+        # Line test score (higher MSE and lower smoothness increase risk)
+        line_mse_score = self.norm_score("line", "mse", min(5, results["line"]["mse"] / 100))
+        line_smoothness_score = self.norm_score("line", "smoothness", max(0, 5 - results["line"]["smoothness"] / 2),
+                                                higher_is_worse=False)
+
+        # Square test score (higher MSE and lower smoothness increase risk)
+        square_mse_score = self.norm_score("square", "mse", min(5, results["square"]["mse"] / 100))
+        square_smoothness_score = self.norm_score("square", "smoothness",
+                                                  max(0, 5 - results["square"]["smoothness"] / 2),
+                                                  higher_is_worse=False)
+
+        # Target test score (higher reaction time and more misses increase risk)
+        target_time_score = self.norm_score("target", "avg_time", min(5, results["target"]["avg_time"] * 2))
+        target_miss_score = self.norm_score("target", "missed", min(5, results["target"]["missed"]))
+
+        # Combine scores with different weights
+        line_score = (line_mse_score * 0.6) + (line_smoothness_score * 0.4)
+        square_score = (square_mse_score * 0.6) + (square_smoothness_score * 0.4)
+        target_score = (target_time_score * 0.7) + (target_miss_score * 0.3)
+
+        # Overall score (weighted average)
+        overall_score = (line_score * 0.35) + (square_score * 0.35) + (target_score * 0.3)
+
+        # Optional tremor term: a drawing with half its movement power in the 4-6 Hz band scores 5
+        ratios = [results[test].get("tremor_ratio") for test in ("line", "square")]
+        ratios = [ratio for ratio in ratios if ratio is not None]
+        if self.tremor_weight and ratios:
+            tremor_score = min(5, 10 * sum(ratios) / len(ratios))
+            overall_score = (overall_score * (1 - self.tremor_weight)) + (tremor_score * self.tremor_weight)
+
+        # Scale to 0-10
+        return min(10, overall_score * 2)
+
+    def score_session(self, session):
+        """Score a whole recorded session dict and return (results, risk_score)
+
+        The session holds "line" and "square" movement lists of [x, y, t]
+        samples and a "target" dict with "click_times" and "missed". Template
+        tests ("spiral", ...) are scored too when their recordings are present.
+        risk_score is None unless every test produced a result. An optional
+        "age" (years) picks the age band used with population norms. The
+        returned results are a copy; self.results keeps the live dict.
+        """
+        self.reset()
+        self.age = session.get("age")
+        for task in ("line", "square"):
+            movements = session.get(task)
+            if movements is not None:
+                getattr(self, f"analyze_{task}_task")(movements)
+        for name in template_tests(session):
+            self.analyze_template_task(name, session[name])
+        target = session.get("target") or {}
+        click_times = target.get("click_times")
+        if click_times is not None:
+            self.analyze_target_task(click_times, target.get("missed", 0))
+
+        risk_score = self.calculate_risk_score() if self.is_complete() else None
+        return copy_results(self.results), risk_score
+
+    def score_sessions(self, sessions):
+        """Score many session dicts in one call; returns [(results, risk_score)] in order
+
+        The deviation kernels run once over every session's samples
+        concatenated together. Each session's MSE is still averaged over its
+        own slice, so the scores are identical to score_session. Drawings
+        already in the cache are left out of the kernel calls, and with a
+        cache, a drawing repeated within the batch is computed only once.
+        """
+        kernels = {"line": (line_distances, (LINE_Y_TARGET,)), "square": (square_distances, square_bounds())}
+        recorded = {name for session in sessions for name in template_tests(session)}
+        if recorded:
+            from template_paths import TEMPLATE_BUILDERS, get_template
+            for name in TEMPLATE_BUILDERS:  # Same result order as score_session
+                if name in recorded:
+                    template = get_template(name)
+                    kernels[name] = (template.distances, (template.fingerprint,))
+        cached = {task: {} for task in kernels}   # task -> {row: stored result}
+        pending = {task: {} for task in kernels}  # task -> {row: [movements, points, distances, key, tremor]}
+        repeats = {task: {} for task in kernels}  # task -> {row: earlier pending row with the same cache key}
+        for task, (kernel, geometry) in kernels.items():
+            first_rows = {}  # cache key -> first pending row holding that drawing
+            for row, session in enumerate(sessions):
+                movements = session.get(task)
+                if movements is None or len(movements) < MIN_POINTS:
+                    continue
+                # Convert JSON sample lists once; hashing, kernels and tremor all reuse the array
+                movements = as_points(movements)
+                key, result = self.cached_drawing(task, movements, geometry)
+                if result is not None:
+                    cached[task][row] = result
+                elif key in first_rows:
+                    repeats[task][row] = first_rows[key]
+                else:
+                    if key is not None:
+                        first_rows[key] = row
+                    pending[task][row] = [movements, self.prepare_points(movements), None, key, None]
+
+            drawings = list(pending[task].values())
+            if drawings:
+                distances = kernel(np.concatenate([drawing[1] for drawing in drawings]))
+                offsets = np.cumsum([len(drawing[1]) for drawing in drawings])[:-1]
+                for drawing, part in zip(drawings, np.split(distances, offsets)):
+                    drawing[2] = part
+                if self.tremor_metrics:
+                    # Every drawing's tremor windows share one batched FFT
+                    from tremor_spectrum import tremor_features_batch
+                    for drawing, tremor in zip(drawings, tremor_features_batch([d[0] for d in drawings])):
+                        drawing[4] = tremor
+
+        stored = {}  # (task, row) -> result computed for a pending row, shared with its repeats
+        scored = []
+        for row, session in enumerate(sessions):
+            self.reset()
+            self.age = session.get("age")
+            for task in kernels:
+                if row in cached[task]:
+                    self.results[task] = cached[task][row]
+                elif row in pending[task]:
+                    stored[task, row] = self.store_drawing_metrics(task, *pending[task][row])
+                elif row in repeats[task]:
+                    self.results[task] = stored[task, repeats[task][row]]
+            target = session.get("target") or {}
+            click_times = target.get("click_times")
+            if click_times is not None:
+                self.analyze_target_task(click_times, target.get("missed", 0))
+
+            risk_score = self.calculate_risk_score() if self.is_complete() else None
+            scored.append((copy_results(self.results), risk_score))
+        return scored
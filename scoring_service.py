@@ -0,0 +1,262 @@
+"""Local asyncio HTTP service that scores uploaded recordings with micro-batching.
+
+    POST /score   body: a session JSON (same shape as batch_score.py input)
+                  reply: {"results": ..., "risk_score": ..., "risk_level": ...}
+    GET  /stats   request counts, batch sizes and latency percentiles
+
+Requests arriving within --batch-window-ms of each other are scored together
+with one ScoringEngine.score_sessions call on a worker thread, so the event
+loop keeps accepting connections while a batch runs. At most --max-pending
+requests may wait; beyond that the service answers 503 straight away
+instead of queueing without bound.
+
+    python scoring_service.py --port 8765
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from batch_score import add_tremor_arguments, resample_rate, to_builtin
+from result_cache import ResultCache
+from scoring import ScoringEngine, checked_session, risk_level
+
+MAX_BODY_BYTES = 16 * 2 ** 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ScoringService:
+    """Queues scoring requests and answers them from micro-batches"""
+
+    def __init__(self, batch_window_ms=5, max_batch=64, max_pending=1024, resample_hz=None,
+                 cache_mb=32, cache_dir=None, tremor_weight=0.0, tremor_metrics=False):
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        # Dashboards poll the same recordings repeatedly; only new drawings reach the kernels
+        self.cache = ResultCache(cache_mb * 2 ** 20, cache_dir) if cache_mb or cache_dir else None
+        self.engine = ScoringEngine(resample_hz=resample_hz, cache=self.cache, tremor_weight=tremor_weight,
+                                    tremor_metrics=tremor_metrics)
+
+        self.queue = None
+        self.batcher = None
+        self.server = None
+
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batch_sizes = collections.Counter()
+        self.latencies = collections.deque(maxlen=10000)  # Seconds, most recent requests
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start listening; returns the bound (host, port)"""
+        self.queue = asyncio.Queue(self.max_pending)
+        self.batcher = asyncio.create_task(self.run_batches())
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+
+    # -- scoring ---------------------------------------------------------
+
+    async def score(self, session):
+        """Queue one session and wait for its batch
+
+        Raises ValueError/TypeError for a malformed session before it joins a
+        batch, and asyncio.QueueFull under backpressure.
+        """
+        session = checked_session(session)
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((session, future))
+        return await future
+
+    def score_each(self, sessions):
+        """Score sessions one at a time; returns [(scored or None, exception or None)]"""
+        outcomes = []
+        for session in sessions:
+            try:
+                outcomes.append((self.engine.score_session(session), None))
+            except Exception as exc:  # Reported to this session's caller only
+                outcomes.append((None, exc))
+        return outcomes
+
+    async def run_batches(self):
+        """Collect requests arriving within the batch window and score them together"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            sessions = [session for session, _ in batch]
+            try:
+                outcomes = [(scored, None) for scored in
+                            await loop.run_in_executor(None, self.engine.score_sessions, sessions)]
+            except Exception:  # A session that got past checked_session still failed; isolate it
+                outcomes = await loop.run_in_executor(None, self.score_each, sessions)
+            for (_, future), (scored, exc) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if exc is not None:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(build_response(*scored))
+
+    def stats(self):
+        """Counters and latency percentiles (ms) for /stats"""
+        latencies = np.array(self.latencies) * 1000
+        percentiles = {}
+        if len(latencies):
+            for p in (50, 90, 99):
+                percentiles[f"p{p}"] = float(np.percentile(latencies, p))
+            percentiles["max"] = float(latencies.max())
+        return {"requests": self.requests, "rejected": self.rejected, "batches": self.batches,
+                "pending": self.queue.qsize() if self.queue else 0,
+                "mean_batch_size": (sum(size * count for size, count in self.batch_sizes.items()) /
+                                    self.batches if self.batches else 0.0),
+                "latency_ms": percentiles, "cache": self.cache.stats() if self.cache else None}
+
+    # -- HTTP ------------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed request line"}, close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                close = headers.get("connection", "").lower() == "close"
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {"error": "Invalid Content-Length"}, close=True)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"error": "Recording too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self.route(method, path, body)
+                except Exception as exc:  # Answer instead of dropping the connection
+                    status, payload, close = 500, {"error": f"Internal error: {exc}"}, True
+                await self.respond(writer, status, payload, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """Dispatch one request; returns (status, JSON payload)"""
+        if path == "/stats":
+            return (200, self.stats()) if method == "GET" else (405, {"error": "Use GET"})
+        if path != "/score":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            session = json.loads(body)
+            if not isinstance(session, dict):
+                raise ValueError("Session must be a JSON object")
+            response = await self.score(session)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return 503, {"error": "Scoring queue is full, retry later"}
+        except (ValueError, KeyError, TypeError, IndexError) as exc:
+            return 400, {"error": f"Invalid session: {exc}"}
+        self.latencies.append(time.perf_counter() - started)
+        return 200, response
+
+    async def respond(self, writer, status, payload, close=False):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+def build_response(results, risk_score):
+    """JSON reply for one scored session, with the diagnosis risk level"""
+    response = {"results": to_builtin(results), "risk_score": None, "risk_level": None}
+    if risk_score is not None:
+        response["risk_score"] = float(risk_score)
+        response["risk_level"] = risk_level(risk_score)[0]
+    return response
+
+
+async def serve(host, port, **options):
+    service = ScoringService(**options)
+    host, port = await service.start(host, port)
+    print(f"Scoring service listening on http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recording scoring over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-window-ms", type=float, default=5, help="Micro-batch collection window")
+    parser.add_argument("--max-batch", type=int, default=64, help="Largest batch scored at once")
+    parser.add_argument("--max-pending", type=int, default=1024, help="Queued requests before answering 503")
+    parser.add_argument("--resample-hz", type=resample_rate, help="Resample drawings at this rate before scoring")
+    parser.add_argument("--cache-mb", type=float, default=32, help="In-memory result cache size (0 disables it)")
+    parser.add_argument("--cache-dir", help="Also keep cached results in this directory")
+    add_tremor_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, batch_window_ms=args.batch_window_ms, max_batch=args.max_batch,
+                          max_pending=args.max_pending, resample_hz=args.resample_hz,
+                          cache_mb=args.cache_mb, cache_dir=args.cache_dir, tremor_weight=args.tremor_weight,
+                          tremor_metrics=args.tremor_metrics))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Append-only, memory-mapped on-disk store of recorded test sessions.
+
+Layout of a store directory (format version 2)::
+
+    meta.json     format name, version, index file name and index dtype
+    index.bin     one fixed-size INDEX_DTYPE record per session (index.new.bin after an upgrade)
+    samples.f64   float64 (N, 3) x, y, t rows for line, square and template drawings
+    targets.f64   float64 (N, 2) target centre positions
+    clicks.f64    float64 (N,) target reaction times
+
+Each data file holds one kind of array, and sessions only store offsets and
+counts into them. Data is appended first and the index record last, so a
+crash can leave unreferenced bytes at the end of a data file but never a
+half-written session. Reads go through np.memmap and return zero-copy
+views, so scanning a large archive never loads whole files into RAM.
+
+Version 2 adds the template drawings (spiral, circle, zigzag) and the
+patient's age (-1 when unknown). Records are read with the dtype saved in
+meta.json, so version 1 stores stay readable (their sessions have no
+template drawings or age). The first append to an older store upgrades
+it: the index is rewritten under the other index file name and meta.json
+is swapped in atomically to point at it.
+"""
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+from template_paths import TEMPLATE_BUILDERS
+
+FORMAT_NAME = "parkinsons-session-store"
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+
+# Drawings stored as (start, count) spans of samples.f64; template tests are optional.
+# TEMPLATE_FIELDS is spelled out because it fixes INDEX_DTYPE: a new template test
+# needs its own columns and a FORMAT_VERSION bump, not a silently different layout
+DRAWING_FIELDS = ("line", "square")
+TEMPLATE_FIELDS = ("spiral", "circle", "zigzag")
+if TEMPLATE_FIELDS != tuple(TEMPLATE_BUILDERS):
+    raise ImportError(f"session_store TEMPLATE_FIELDS {TEMPLATE_FIELDS} do not match template_paths "
+                      f"TEMPLATE_BUILDERS {tuple(TEMPLATE_BUILDERS)}; add the columns and bump FORMAT_VERSION")
+
+INDEX_DTYPE = np.dtype([
+    ("id", "S64"),
+    ("created", "<f8"),
+    ("line_start", "<i8"), ("line_count", "<i8"),
+    ("square_start", "<i8"), ("square_count", "<i8"),
+    ("target_start", "<i8"), ("target_count", "<i8"),
+    ("click_start", "<i8"), ("click_count", "<i8"),
+    ("missed", "<i8"),
+    ("age", "<i8"),
+    *((f"{task}_{part}", "<i8") for task in TEMPLATE_FIELDS for part in ("start", "count")),
+])
+
+INDEX_FILES = ("index.bin", "index.new.bin")  # An upgrade writes whichever one is not in use
+
+# file name -> number of float64 columns per row
+DATA_FILES = {"samples.f64": 3, "targets.f64": 2, "clicks.f64": 1}
+
+
+class SessionStoreError(Exception):
+    """Raised for unreadable or incompatible session stores"""
+
+
+class SessionStore:
+    """Versioned columnar session archive with random access by session ID"""
+
+    def __init__(self, path, create=True):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if not create and not os.path.exists(meta_path):
+            raise SessionStoreError(f"No session store at {path}")
+        os.makedirs(path, exist_ok=True)
+
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("format") != FORMAT_NAME:
+                raise SessionStoreError(f"{path} is not a session store")
+            if meta.get("version") not in READABLE_VERSIONS:
+                raise SessionStoreError(
+                    f"{path} uses store format version {meta.get('version')}, expected one of {READABLE_VERSIONS}")
+        else:
+            meta = self._write_meta(INDEX_FILES[0])
+
+        self.version = meta["version"]
+        self.index_file = meta.get("index_file", INDEX_FILES[0])
+        # JSON turns the (name, type) pairs of dtype.descr into lists
+        self.index_dtype = np.dtype([tuple(field) for field in meta["index_dtype"]])
+
+        for name in (self.index_file, *DATA_FILES):
+            open(os.path.join(path, name), "ab").close()
+
+        self._maps = {}
+        self._index = None
+        self._rows = None
+
+    def _write_meta(self, index_file):
+        """Atomically write meta.json for the current format; returns the meta dict"""
+        meta = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "index_file": index_file,
+                "index_dtype": INDEX_DTYPE.descr}
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        return meta
+
+    # -- reading ---------------------------------------------------------
+
+    def _memmap(self, name, dtype, columns):
+        """Read-only memmap of a whole data file (cached until the next append)"""
+        if name not in self._maps:
+            file_path = os.path.join(self.path, name)
+            rows = os.path.getsize(file_path) // (dtype.itemsize * columns)
+            if rows == 0:
+                data = np.empty((0, columns) if columns > 1 else 0, dtype=dtype)
+            else:
+                shape = (rows, columns) if columns > 1 else (rows,)
+                data = np.memmap(file_path, dtype=dtype, mode="r", shape=shape)
+            self._maps[name] = data
+        return self._maps[name]
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = self._memmap(self.index_file, self.index_dtype, 1)
+            self._rows = {record_id.decode(): row for row, record_id in enumerate(self._index["id"])}
+
+    @property
+    def index(self):
+        """Memory-mapped structured array with one record per session"""
+        self._load_index()
+        return self._index
+
+    @property
+    def rows(self):
+        """Session ID -> index row"""
+        self._load_index()
+        return self._rows
+
+    def ids(self):
+        """Session IDs in insertion order"""
+        return [record_id.decode() for record_id in self.index["id"]]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, session_id):
+        return session_id in self.rows
+
+    def get(self, session_id):
+        """Load one session as zero-copy views, shaped like batch_score's session dicts"""
+        try:
+            row = self.rows[session_id]
+        except KeyError:
+            raise KeyError(f"No session with ID {session_id!r}") from None
+        return self._session_at(row)
+
+    def _session_at(self, row):
+        record = self.index[row]
+        samples = self._memmap("samples.f64", np.dtype("<f8"), 3)
+        targets = self._memmap("targets.f64", np.dtype("<f8"), 2)
+        clicks = self._memmap("clicks.f64", np.dtype("<f8"), 1)
+
+        def span(data, field):
+            start = int(record[f"{field}_start"])
+            return data[start:start + int(record[f"{field}_count"])]
+
+        session = {
+            "id": record["id"].decode(),
+            "created": float(record["created"]),
+            "line": span(samples, "line"),
+            "square": span(samples, "square"),
+            "target": {"points": span(targets, "target"),
+                       "click_times": span(clicks, "click"),
+                       "missed": int(record["missed"])},
+        }
+        if "age" in self.index_dtype.names and record["age"] >= 0:
+            session["age"] = int(record["age"])
+        # Template tests are optional, so only recorded ones appear (never in version 1 stores)
+        for task in TEMPLATE_FIELDS:
+            if f"{task}_count" in self.index_dtype.names and record[f"{task}_count"]:
+                session[task] = span(samples, task)
+        return session
+
+    def iter_sessions(self):
+        """Yield every session in insertion order"""
+        for row in range(len(self.index)):
+            yield self._session_at(row)
+
+    # -- writing ---------------------------------------------------------
+
+    def _append_bytes(self, name, data, row_bytes):
+        """Append whole rows to a file, overwriting any torn trailing row; returns the start row"""
+        with open(os.path.join(self.path, name), "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            start = f.tell() // row_bytes
+            f.seek(start * row_bytes)
+            f.write(data)
+            f.truncate()
+        return start
+
+    def _append_rows(self, name, values, columns):
+        """Append float64 rows to a data file; returns (start_row, count)"""
+        values = np.ascontiguousarray(np.asarray(values, dtype="<f8").reshape(-1, columns))
+        return self._append_bytes(name, values.tobytes(), 8 * columns), len(values)
+
+    def _forget_maps(self):
+        """Drop cached maps; they are re-opened at the new file sizes on next read"""
+        self._maps.clear()
+        self._index = None
+        self._rows = None
+
+    def upgrade(self):
+        """Rewrite an older store's index in the current format (no-op if already current)
+
+        The new index goes to the unused index file name and only becomes
+        live when meta.json is replaced, so a crash leaves the old store intact.
+        """
+        if self.index_dtype == INDEX_DTYPE:
+            return
+        upgraded = np.zeros(len(self.index), dtype=INDEX_DTYPE)
+        upgraded["age"] = -1  # Unknown for sessions saved before ages were
+        for name in self.index_dtype.names:
+            upgraded[name] = self.index[name]
+        new_file = INDEX_FILES[1] if self.index_file == INDEX_FILES[0] else INDEX_FILES[0]
+        with open(os.path.join(self.path, new_file), "wb") as f:
+            f.write(upgraded.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        old_file = self.index_file
+        self._forget_maps()
+        self._write_meta(new_file)
+        self.version, self.index_file, self.index_dtype = FORMAT_VERSION, new_file, INDEX_DTYPE
+        os.remove(os.path.join(self.path, old_file))
+
+    def append(self, session, session_id=None):
+        """Append a session dict and return its ID
+
+        The session uses batch_score's shape: "line" and "square" lists of
+        [x, y, t], optional template drawings ("spiral", "circle", "zigzag")
+        of the same shape, a "target" dict with "click_times", "missed" and
+        optionally "points" (target centres), and an optional "age" in
+        years. Older stores are upgraded first.
+        """
+        session_id = session_id or session.get("id") or uuid.uuid4().hex
+        if session_id in self:
+            raise ValueError(f"Session {session_id!r} already exists")
+        encoded_id = session_id.encode()
+        if len(encoded_id) > INDEX_DTYPE["id"].itemsize:
+            raise ValueError(f"Session ID longer than {INDEX_DTYPE['id'].itemsize} bytes")
+        self.upgrade()
+
+        target = session.get("target") or {}
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record["id"] = encoded_id
+        record["created"] = session.get("created", time.time())
+        for field, name, values, columns in (
+                *((task, "samples.f64", session.get(task), 3) for task in DRAWING_FIELDS + TEMPLATE_FIELDS),
+                ("target", "targets.f64", target.get("points"), 2),
+                ("click", "clicks.f64", target.get("click_times"), 1)):
+            record[f"{field}_start"], record[f"{field}_count"] = self._append_rows(
+                name, [] if values is None else values, columns)
+        record["missed"] = target.get("missed") or 0
+        record["age"] = -1 if session.get("age") is None else session["age"]
+
+        self._append_bytes(self.index_file, record.tobytes(), INDEX_DTYPE.itemsize)
+        self._forget_maps()
+        return session_id
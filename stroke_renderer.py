@@ -0,0 +1,153 @@
+"""Draw the user's stroke as canvas polylines, redrawn at most once per frame."""
+import collections
+
+import numpy as np
+
+
+def simplify_polyline(points, epsilon):
+    """Douglas-Peucker simplification of an (N, 2) polyline
+
+    Returns the kept points (always including both endpoints). Each split
+    step measures every point of the current span at once with NumPy, so
+    only the recursion itself runs in Python (via an explicit stack).
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3 or epsilon <= 0:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            # Perpendicular distance via the 2D cross product
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep]
+
+
+class StrokeRenderer:
+    """Keeps one live polyline item per stroke and coalesces updates to the display frame rate
+
+    Motion events only mark the stroke dirty; a single after() callback per
+    frame pushes the new coordinates with canvas.coords. Strokes longer than
+    simplify_above points are drawn from a Douglas-Peucker simplified copy
+    (the recorded samples are never touched). Simplification is
+    incremental: every chunk_points samples the oldest part of the stroke
+    is simplified once and frozen into its own canvas item, so each frame
+    only simplifies and redraws the short live tail however long the
+    stroke gets.
+    """
+
+    def __init__(self, canvas, root, fps=60, simplify_above=2000, epsilon=0.75,
+                 fill='blue', width=2, chunk_points=512):
+        self.canvas = canvas
+        self.root = root
+        self.frame_ms = max(1, int(1000 / fps))
+        self.simplify_above = simplify_above  # None disables simplification
+        self.epsilon = epsilon
+        self.chunk_points = chunk_points
+        self.fill = fill
+        self.width = width
+
+        self.points = None  # Sample source (e.g. MovementBuffer) for the current stroke
+        self.stroke_length = 0
+        self.item = None
+        self.frozen = collections.deque()  # (last stroke sample index, canvas item) of frozen chunks
+        self.anchor = 0  # Stroke sample index where the live tail starts
+        self.redraw_job = None
+
+    def start_stroke(self, points):
+        """Begin a new polyline; points is the buffer samples are appended to"""
+        self.flush()
+        self.points = points
+        self.forget_stroke()
+
+    def add_point(self):
+        """Note that one more sample was appended; redraw is deferred to the next frame"""
+        if self.points is None:
+            return
+        self.stroke_length += 1
+        if self.redraw_job is None:
+            self.redraw_job = self.root.after(self.frame_ms, self.flush)
+
+    def end_stroke(self):
+        """Draw any pending points right away and stop tracking the stroke"""
+        self.flush()
+        self.points = None
+        self.forget_stroke()
+
+    def reset(self):
+        """Cancel pending redraws (call after the canvas has been cleared)"""
+        if self.redraw_job is not None:
+            self.root.after_cancel(self.redraw_job)
+            self.redraw_job = None
+        self.points = None
+        self.forget_stroke()
+
+    def forget_stroke(self):
+        """Stop tracking the current stroke's items (they stay on the canvas)"""
+        self.stroke_length = 0
+        self.item = None
+        self.frozen.clear()
+        self.anchor = 0
+
+    def create_line(self, xy):
+        # Round caps hide the seams between a stroke's frozen chunks and its live tail
+        return self.canvas.create_line(*xy.ravel().tolist(), fill=self.fill, width=self.width, capstyle='round')
+
+    def freeze_chunks(self, xy, first):
+        """Freeze every full chunk before the live tail; returns the tail's simplified points
+
+        xy holds the buffered samples of the stroke, xy[0] being stroke
+        sample first (a ring buffer may have dropped earlier ones).
+        """
+        # Chunks whose samples the buffer no longer holds are dropped from the display
+        while self.frozen and self.frozen[0][0] < first:
+            self.canvas.delete(self.frozen.popleft()[1])
+        anchor = max(self.anchor, first)
+        while self.stroke_length - 1 - anchor > self.chunk_points:
+            stop = anchor + self.chunk_points
+            # Chunks share their end samples, so the frozen parts join up exactly
+            chunk = simplify_polyline(xy[anchor - first:stop - first + 1], self.epsilon)
+            self.frozen.append((stop, self.create_line(chunk)))
+            anchor = stop
+        self.anchor = anchor
+        return simplify_polyline(xy[anchor - first:], self.epsilon)
+
+    def flush(self):
+        """Push the current stroke's coordinates to its canvas item"""
+        if self.redraw_job is not None:
+            self.root.after_cancel(self.redraw_job)
+            self.redraw_job = None
+        if self.points is None:
+            return
+
+        # Ring buffers may have dropped the start of a long stroke
+        count = min(self.stroke_length, len(self.points))
+        if count < 2:
+            return
+        xy = np.asarray(self.points)[-count:, :2]
+        if self.frozen or (self.simplify_above is not None and count > self.simplify_above):
+            xy = self.freeze_chunks(xy, self.stroke_length - count)
+
+        if self.item is None:
+            self.item = self.create_line(xy)
+        else:
+            self.canvas.coords(self.item, xy.ravel().tolist())
@@ -0,0 +1,136 @@
+"""Moving click targets as a kinematic model with a grid index for hit-testing.
+
+Each target's position is a closed-form function of time: it starts at a
+point with a constant velocity and reflects off the canvas edges, which
+is a triangle wave per axis. Nothing is read back from the canvas. The
+animation writes positions out, and clicks are resolved against the
+position at the click's own timestamp.
+
+TargetField keeps a uniform grid of target positions, rebuilt once per
+animation frame. A click only checks targets in the cells around it,
+widened by how far any target can have moved since that frame.
+"""
+import math
+
+HIT_GRACE = 5  # px beyond the drawn radius that still counts as a hit
+
+
+def reflect(position, low, high):
+    """Fold an unbounded 1-D coordinate into [low, high] as if it bounced off both ends"""
+    span = high - low
+    if span <= 0:
+        return low
+    phase = (position - low) % (2 * span)
+    return low + (phase if phase <= span else 2 * span - phase)
+
+
+class MovingTarget:
+    """A target bouncing inside a box; position(t) needs no per-frame stepping"""
+
+    def __init__(self, item, x, y, vx, vy, t0, bounds):
+        self.item = item  # Canvas item id
+        self.x0, self.y0 = x, y
+        self.vx, self.vy = vx, vy  # px per second
+        self.t0 = t0  # Time on the app clock the target appeared
+        self.bounds = bounds  # (min_x, min_y, max_x, max_y) for the centre
+
+    @property
+    def speed(self):
+        return math.hypot(self.vx, self.vy)
+
+    def position(self, t):
+        """Centre of the target at time t"""
+        dt = t - self.t0
+        min_x, min_y, max_x, max_y = self.bounds
+        return (reflect(self.x0 + self.vx * dt, min_x, max_x),
+                reflect(self.y0 + self.vy * dt, min_y, max_y))
+
+
+class TargetField:
+    """The live targets of a click task, with a uniform-grid index for hit-testing"""
+
+    def __init__(self, width, height, radius, grace=HIT_GRACE, cell_size=None):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.reach = radius + grace  # Click distance from a centre that counts as a hit
+        self.cell_size = cell_size or 2 * self.reach
+        self.targets = {}  # Canvas item id -> MovingTarget
+        self.clear_index()
+
+    def clear_index(self):
+        self.cells = {}  # (col, row) -> [MovingTarget]
+        self.index_time = None
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __iter__(self):
+        return iter(self.targets.values())
+
+    def add(self, item, x, y, vx, vy, t):
+        """Start tracking a target drawn as canvas item `item`"""
+        r = self.radius
+        target = MovingTarget(item, x, y, vx, vy, t, (r, r, self.width - r, self.height - r))
+        self.targets[item] = target
+        self.clear_index()
+        return target
+
+    def remove(self, item):
+        """Stop tracking a target (hit or timed out); returns it, or None"""
+        target = self.targets.pop(item, None)
+        if target is not None:
+            self.clear_index()
+        return target
+
+    def clear(self):
+        self.targets = {}
+        self.clear_index()
+
+    def update(self, t):
+        """Positions of every target at time t, re-indexing the grid; returns [(target, x, y)]"""
+        placed = [(target, *target.position(t)) for target in self.targets.values()]
+        cells = {}
+        for target, x, y in placed:
+            cells.setdefault(self._cell(x, y), []).append(target)
+        self.cells = cells
+        self.index_time = t
+        return placed
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def candidates(self, x, y, t):
+        """Targets that may be within reach of (x, y) at time t, from the grid"""
+        if self.index_time is None:
+            self.update(t)
+        # Targets have moved since the grid was built; widen the search to cover it
+        drift = max((target.speed for target in self.targets.values()), default=0.0) * abs(t - self.index_time)
+        reach = self.reach + drift
+        col_lo, row_lo = self._cell(x - reach, y - reach)
+        col_hi, row_hi = self._cell(x + reach, y + reach)
+        found = []
+        for col in range(col_lo, col_hi + 1):
+            for row in range(row_lo, row_hi + 1):
+                found.extend(self.cells.get((col, row), ()))
+        return found
+
+    def hit_test(self, x, y, t):
+        """Nearest target within reach of a click at (x, y) at time t, as (target, distance), or (None, None)"""
+        best, best_distance = None, None
+        for target in self.candidates(x, y, t):
+            tx, ty = target.position(t)
+            distance = math.hypot(x - tx, y - ty)
+            if distance <= self.reach and (best is None or distance < best_distance):
+                best, best_distance = target, distance
+        return best, best_distance
+
+    def nearest(self, x, y, t):
+        """Closest target at time t regardless of reach (miss feedback), as (target, distance), or (None, None)"""
+        best, best_distance = None, None
+        for target in self.targets.values():
+            tx, ty = target.position(t)
+            distance = math.hypot(x - tx, y - ty)
+            if best is None or distance < best_distance:
+                best, best_distance = target, distance
+        return best, best_distance
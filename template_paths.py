@@ -0,0 +1,219 @@
+"""Polyline template tests (spiral, circle, zigzag) and a spatial index for their deviation.
+
+A template is any polyline on the canvas. Deviation is the distance from a
+sample to the nearest point of the polyline. SegmentIndex answers that
+without scanning every segment. The plane around the template is cut into
+square cells, and each cell keeps only the segments that can be nearest to
+some point inside it. A lookup is then a cell computation plus a handful of
+candidate segments, whatever the template's complexity. The result is
+exact, not a distance-field approximation.
+"""
+import hashlib
+import math
+
+import numpy as np
+
+from scoring import SQUARE_CENTER
+
+CELL_SIZE = 8.0       # Grid cell edge in px
+INDEX_MARGIN = 200.0  # Grid extends this far past the template; farther samples use a full scan
+BUILD_CHUNK = 4096    # Cells scored against every segment at once while building
+QUERY_CHUNK = 2 ** 18  # Samples looked up at once; bounds the (sample, candidate) pair arrays
+
+
+def segment_distances(px, py, ax, ay, bx, by):
+    """Distance from points (px, py) to segments a-b; every argument broadcasts"""
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    projection = (px - ax) * dx + (py - ay) * dy
+    # Degenerate (zero length) segments project onto their start point
+    t = np.clip(np.divide(projection, length2, out=np.zeros(np.broadcast(projection, length2).shape),
+                          where=length2 > 0), 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+class SegmentIndex:
+    """Uniform grid over a polyline; each cell lists the segments that can be nearest inside it"""
+
+    def __init__(self, starts, ends, cell_size=CELL_SIZE, margin=INDEX_MARGIN):
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        self.cell_size = cell_size
+
+        corners = np.vstack((self.starts, self.ends))
+        self.origin = corners.min(axis=0) - margin
+        extent = corners.max(axis=0) + margin - self.origin
+        self.shape = tuple(int(n) for n in np.ceil(extent / cell_size).astype(int)[::-1])  # (rows, cols)
+        self.offsets, self.segments = self._build()
+
+    def _build(self):
+        """Candidate segments of every cell in CSR form: (offsets, segments)
+
+        Cell c owns segments[offsets[c]:offsets[c + 1]], nearest first.
+        Lists are kept ragged rather than padded: cells near a circle's centre
+        see every segment, but samples almost never land there.
+        """
+        rows, cols = self.shape
+        half_diagonal = self.cell_size * math.sqrt(2) / 2
+        iy, ix = np.divmod(np.arange(rows * cols), cols)
+        centers_x = self.origin[0] + (ix + 0.5) * self.cell_size
+        centers_y = self.origin[1] + (iy + 0.5) * self.cell_size
+        ax, ay = self.starts[:, 0], self.starts[:, 1]
+        bx, by = self.ends[:, 0], self.ends[:, 1]
+
+        counts, segments = [], []
+        for begin in range(0, len(centers_x), BUILD_CHUNK):
+            cx = centers_x[begin:begin + BUILD_CHUNK, None]
+            cy = centers_y[begin:begin + BUILD_CHUNK, None]
+            distances = segment_distances(cx, cy, ax, ay, bx, by)
+            nearest = distances.min(axis=1, keepdims=True)
+            # Any point in the cell is within half_diagonal of its centre, so a segment
+            # farther than nearest + 2 * half_diagonal from the centre can never win
+            keep = distances <= nearest + 2 * half_diagonal + 1e-9
+            order = np.argsort(np.where(keep, distances, np.inf), axis=1, kind="stable")
+            chunk_counts = keep.sum(axis=1)
+            counts.append(chunk_counts)
+            segments.append(order[np.arange(order.shape[1]) < chunk_counts[:, None]])
+
+        counts = np.concatenate(counts)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, np.concatenate(segments).astype(np.int32)
+
+    @property
+    def max_candidates(self):
+        return int(np.diff(self.offsets).max())
+
+    def distances(self, points):
+        """Distance from each (x, y) sample to the polyline; points is any (N, 2+) array-like"""
+        points = np.asarray(points, dtype=float).reshape(len(points), -1)
+        result = np.empty(len(points))
+        for begin in range(0, len(points), QUERY_CHUNK):
+            chunk = points[begin:begin + QUERY_CHUNK]
+            result[begin:begin + len(chunk)] = self._distances(chunk[:, 0], chunk[:, 1])
+        return result
+
+    def _distances(self, x, y):
+        rows, cols = self.shape
+        ix = np.floor((x - self.origin[0]) / self.cell_size).astype(np.int64)
+        iy = np.floor((y - self.origin[1]) / self.cell_size).astype(np.int64)
+        inside = (ix >= 0) & (ix < cols) & (iy >= 0) & (iy < rows)
+
+        result = np.empty(len(x))
+        if inside.any():
+            cells = iy[inside] * cols + ix[inside]
+            starts = self.offsets[cells]
+            counts = self.offsets[cells + 1] - starts
+            # One row per (sample, candidate) pair, then a min per sample
+            first = np.cumsum(counts) - counts
+            owner = np.repeat(np.arange(len(cells)), counts)
+            segments = self.segments[np.repeat(starts - first, counts) + np.arange(counts.sum())]
+            pair_distances = segment_distances(x[inside][owner], y[inside][owner],
+                                               self.starts[segments, 0], self.starts[segments, 1],
+                                               self.ends[segments, 0], self.ends[segments, 1])
+            result[inside] = np.minimum.reduceat(pair_distances, first)
+
+        outside = ~inside
+        if outside.any():
+            # Far off the template: rare, so a full scan is fine
+            ax, ay = self.starts[:, 0], self.starts[:, 1]
+            bx, by = self.ends[:, 0], self.ends[:, 1]
+            result[outside] = segment_distances(x[outside, None], y[outside, None], ax, ay, bx, by).min(axis=1)
+        return result
+
+    def distance(self, x, y):
+        """Distance from one sample to the polyline (per-event path for live metrics)"""
+        ix = math.floor((x - self.origin[0]) / self.cell_size)
+        iy = math.floor((y - self.origin[1]) / self.cell_size)
+        rows, cols = self.shape
+        if 0 <= ix < cols and 0 <= iy < rows:
+            cell = iy * cols + ix
+            segments = self.segments[self.offsets[cell]:self.offsets[cell + 1]]
+        else:
+            segments = slice(None)
+        return float(segment_distances(x, y, self.starts[segments, 0], self.starts[segments, 1],
+                                       self.ends[segments, 0], self.ends[segments, 1]).min())
+
+
+class TemplatePath:
+    """A drawing test defined by a polyline the user traces"""
+
+    def __init__(self, name, label, vertices, closed=False, instructions=None):
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+        if closed:
+            vertices = np.vstack((vertices, vertices[:1]))
+        if len(vertices) < 2:
+            raise ValueError("A template needs at least two vertices")
+        self.name = name
+        self.label = label
+        self.vertices = vertices
+        self.instructions = instructions or f"Click and hold to trace the {label.lower()}."
+        self._index = None
+
+    @property
+    def index(self):
+        """SegmentIndex over the template, built on first use"""
+        if self._index is None:
+            self._index = SegmentIndex(self.vertices[:-1], self.vertices[1:])
+        return self._index
+
+    @property
+    def fingerprint(self):
+        """Short hash of the vertices, so cached results follow template edits"""
+        return hashlib.blake2b(self.vertices.tobytes(), digest_size=8).hexdigest()
+
+    @property
+    def length(self):
+        return float(np.hypot(*np.diff(self.vertices, axis=0).T).sum())
+
+    def distances(self, points):
+        return self.index.distances(points)
+
+    def distance(self, x, y):
+        return self.index.distance(x, y)
+
+    def canvas_coords(self):
+        """Flat x0, y0, x1, y1, ... list for Canvas.create_line"""
+        return self.vertices.ravel().tolist()
+
+
+def archimedean_spiral(center=SQUARE_CENTER, turns=3, max_radius=200, spacing=4.0):
+    """Vertices of r = b * theta out to max_radius, about spacing px apart along the curve"""
+    b = max_radius / (2 * math.pi * turns)
+    theta_max = 2 * math.pi * turns
+    # Arc length grows roughly with theta squared, so sqrt-spaced angles give even steps
+    arc_length = b * theta_max ** 2 / 2
+    theta = theta_max * np.sqrt(np.linspace(0, 1, max(8, int(arc_length / spacing))))
+    radius = b * theta
+    return np.column_stack((center[0] + radius * np.cos(theta), center[1] + radius * np.sin(theta)))
+
+
+def circle(center=SQUARE_CENTER, radius=150, segments=180):
+    angles = np.linspace(0, 2 * math.pi, segments, endpoint=False)
+    return np.column_stack((center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)))
+
+
+def zigzag(start_x=100, end_x=700, center_y=SQUARE_CENTER[1], amplitude=80, teeth=6):
+    xs = np.linspace(start_x, end_x, 2 * teeth + 1)
+    ys = center_y + amplitude * np.where(np.arange(len(xs)) % 2, -1, 1)
+    return np.column_stack((xs, ys))
+
+
+TEMPLATE_BUILDERS = {
+    "spiral": lambda: TemplatePath("spiral", "Spiral", archimedean_spiral(),
+                                   instructions="Click and hold to trace the spiral from the centre outwards."),
+    "circle": lambda: TemplatePath("circle", "Circle", circle(), closed=True),
+    "zigzag": lambda: TemplatePath("zigzag", "Zigzag", zigzag()),
+}
+
+_templates = {}
+
+
+def get_template(name):
+    """Shared TemplatePath for a template test name (index built once per process)"""
+    if name not in _templates:
+        try:
+            _templates[name] = TEMPLATE_BUILDERS[name]()
+        except KeyError:
+            raise KeyError(f"Unknown template test {name!r}") from None
+    return _templates[name]
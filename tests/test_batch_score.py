@@ -0,0 +1,42 @@
+"""Serial and parallel batch scoring must agree on which sessions they skip"""
+import io
+import json
+
+import numpy as np
+
+from batch_score import score_directory, score_parallel, load_directory
+from trajectories import generate_session
+
+
+def write_session(directory, name, session):
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(session, default=lambda value: np.asarray(value).tolist()))
+
+
+def malformed_directory(directory):
+    for i in range(4):
+        write_session(directory, f"good{i}", generate_session(120, seed=i))
+    base = generate_session(120, seed=9)
+    write_session(directory, "target_list", {**base, "target": [1]})
+    write_session(directory, "target_pairs", {**base, "target": [[1, 2]]})
+    write_session(directory, "nested_clicks", {**base, "target": {"click_times": [[1]], "missed": 0}})
+    write_session(directory, "two_columns", {**base, "line": [[1, 2], [3, 4]]})
+    write_session(directory, "bad_age", {**base, "age": "old"})
+    (directory / "top_level_list.json").write_text("[1, 2, 3]")
+    (directory / "not_json.json").write_text("{")
+
+
+def test_serial_and_parallel_skip_the_same_sessions(tmp_path):
+    malformed_directory(tmp_path)
+
+    serial = io.StringIO()
+    serial_counts = score_directory(tmp_path, serial)
+
+    sessions, unreadable = load_directory(tmp_path)
+    parallel = io.StringIO()
+    scored, failed = score_parallel(sessions, parallel, 2)
+
+    assert serial_counts == (4, 7)
+    assert (scored, failed + unreadable) == serial_counts
+    assert serial.getvalue() == parallel.getvalue()
+    assert [json.loads(line)["id"] for line in serial.getvalue().splitlines()] == [f"good{i}" for i in range(4)]
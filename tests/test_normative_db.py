@@ -0,0 +1,50 @@
+"""A failed add_sessions must leave the sketches as they were so it can be retried"""
+import sqlite3
+
+import pytest
+
+from normative_db import NormativeDB
+
+RESULTS = {"line": {"mse": 12.0, "smoothness": 7.5}, "square": {"mse": 40.0}}
+
+
+def fail_once(norms, monkeypatch):
+    """Make the next sketch save raise, as a full disk or locked database would"""
+    save = norms._save_sketches
+
+    def failing(sketches):
+        monkeypatch.setattr(norms, "_save_sketches", save)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(norms, "_save_sketches", failing)
+
+
+def test_failed_add_is_rolled_back_in_memory(tmp_path, monkeypatch):
+    with NormativeDB(str(tmp_path / "norms.sqlite")) as norms:
+        norms.add_session("earlier", RESULTS, age=64)
+        fail_once(norms, monkeypatch)
+        with pytest.raises(sqlite3.OperationalError):
+            norms.add_session("retried", RESULTS, age=64)
+
+        assert len(norms) == 1
+        assert norms.sketch("line.mse").count == 1
+        assert norms.local["line.mse", "60-69"].count == 1
+
+        assert norms.add_session("retried", RESULTS, age=64)
+        assert len(norms) == 2
+        assert norms.sketch("line.mse").count == 2
+        assert norms.local["line.mse", "60-69"].count == 2
+
+
+def test_sketches_match_the_database_after_a_failed_add(tmp_path, monkeypatch):
+    path = str(tmp_path / "norms.sqlite")
+    with NormativeDB(path) as norms:
+        fail_once(norms, monkeypatch)
+        with pytest.raises(sqlite3.OperationalError):
+            norms.add_sessions([(f"s{i}", RESULTS, 70, None, None) for i in range(3)])
+        norms.add_sessions([(f"s{i}", RESULTS, 70, None, None) for i in range(3)])
+        in_memory = {key: sketch.count for key, sketch in norms.combined.items()}
+    with NormativeDB(path) as reopened:
+        assert {key: sketch.count for key, sketch in reopened.combined.items()} == in_memory == {
+            ("line.mse", "all"): 3, ("line.mse", "70-79"): 3, ("line.smoothness", "all"): 3,
+            ("line.smoothness", "70-79"): 3, ("square.mse", "all"): 3, ("square.mse", "70-79"): 3}
@@ -0,0 +1,47 @@
+"""A save retried after the norms failed must add the session to the norms once"""
+import sqlite3
+
+from normative_db import NormativeDB
+from replay import ReplayAnalyzer, VirtualWidget
+from session_store import SessionStore
+from trajectories import generate_session
+
+
+def analyzer_with_results(session_dir):
+    analyzer = ReplayAnalyzer()
+    analyzer.session_store = SessionStore(str(session_dir))
+    analyzer.norms = NormativeDB(str(session_dir / "norms.sqlite"))
+    analyzer.patient_var, analyzer.age_var = VirtualWidget(""), VirtualWidget("67")
+    session = generate_session(200, seed=1)
+    analyzer.engine.score_session(session)
+    analyzer.recordings = {task: session[task] for task in ("line", "square", "target")}
+    return analyzer
+
+
+def test_retried_norms_save_is_counted_once(tmp_path, monkeypatch):
+    analyzer = analyzer_with_results(tmp_path)
+    norms = analyzer.norms
+    save = norms._save_sketches
+
+    def failing(sketches):
+        monkeypatch.setattr(norms, "_save_sketches", save)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(norms, "_save_sketches", failing)
+    analyzer.save_session()
+    session_id, saved = analyzer.pending_save
+    assert saved == {"event log", "session store"}
+    assert analyzer.saved_session_id is None
+    assert "norms: database is locked" in analyzer.debug_label.text
+
+    analyzer.save_session()
+    assert analyzer.saved_session_id == session_id
+    analyzer.save_session()
+
+    assert len(norms) == 1
+    assert norms.sketch("line.mse").count == 1
+    assert norms.sketch("line.mse", "60-69").count == 1
+    assert len(analyzer.session_store) == 1
+    norms.close()
+    with NormativeDB(str(tmp_path / "norms.sqlite")) as reopened:
+        assert reopened.sketch("line.mse").count == 1
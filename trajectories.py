@@ -0,0 +1,121 @@
+"""Parametric synthetic tracings for benchmarks and scoring checks.
+
+Each generator returns a float (N, 3) array of x, y, t samples that follows
+the GUI's line or square template with configurable tremor, bradykinesia
+and sampling rate, so metrics can be exercised at any size without a user.
+"""
+import numpy as np
+
+from scoring import LINE_Y_TARGET, square_bounds
+
+LINE_START_X, LINE_END_X = 100, 700
+
+
+def sample_times(n_samples, rate_hz=100, timing_jitter=0.0, rng=None):
+    """n_samples timestamps at rate_hz, optionally jittered like a real event stream
+
+    timing_jitter is the standard deviation of each interval as a fraction of
+    the nominal interval; times stay non-decreasing.
+    """
+    rng = rng or np.random.default_rng()
+    intervals = np.full(n_samples, 1 / rate_hz)
+    intervals[0] = 0.0
+    if timing_jitter > 0:
+        intervals[1:] *= np.clip(rng.normal(1.0, timing_jitter, n_samples - 1), 0.0, None)
+    return np.cumsum(intervals)
+
+
+def path_progress(t, bradykinesia=0.0):
+    """Fraction of the path covered at each time, in [0, 1]
+
+    With bradykinesia b in [0, 1) the drawing speed decays linearly from 1
+    to (1 - b) of its starting value over the task.
+    """
+    duration = t[-1] - t[0] if len(t) > 1 else 1.0
+    u = (t - t[0]) / (duration or 1.0)
+    return (u - bradykinesia * u ** 2 / 2) / (1 - bradykinesia / 2)
+
+
+def tremor(t, frequency_hz=5.0, amplitude=0.0, rng=None):
+    """Sinusoidal tremor with a random phase and slight amplitude wobble"""
+    if amplitude == 0:
+        return np.zeros_like(t)
+    rng = rng or np.random.default_rng()
+    phase = rng.uniform(0, 2 * np.pi)
+    wobble = 1 + 0.1 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, 2 * np.pi))
+    return amplitude * wobble * np.sin(2 * np.pi * frequency_hz * t + phase)
+
+
+def generate_line(n_samples, rate_hz=100, tremor_hz=5.0, tremor_amplitude=2.0, bradykinesia=0.0,
+                  noise=0.5, timing_jitter=0.0, seed=None):
+    """Follow Line tracing from left to right along the template line"""
+    rng = np.random.default_rng(seed)
+    t = sample_times(n_samples, rate_hz, timing_jitter, rng)
+    progress = path_progress(t, bradykinesia)
+
+    points = np.empty((n_samples, 3))
+    points[:, 0] = LINE_START_X + (LINE_END_X - LINE_START_X) * progress
+    points[:, 1] = LINE_Y_TARGET + tremor(t, tremor_hz, tremor_amplitude, rng)
+    if noise:
+        points[:, :2] += rng.normal(0, noise, (n_samples, 2))
+    points[:, 2] = t
+    return points
+
+
+def generate_square(n_samples, rate_hz=100, tremor_hz=5.0, tremor_amplitude=2.0, bradykinesia=0.0,
+                    noise=0.5, timing_jitter=0.0, seed=None):
+    """Draw Square tracing clockwise from the top-left corner of the template"""
+    rng = np.random.default_rng(seed)
+    t = sample_times(n_samples, rate_hz, timing_jitter, rng)
+    x1, y1, x2, y2 = square_bounds()
+    side = x2 - x1
+
+    # Distance travelled along the perimeter, mapped to a position on each side
+    travelled = 4 * side * np.minimum(path_progress(t, bradykinesia), 1 - 1e-12)
+    edge = (travelled // side).astype(int)
+    along = travelled - edge * side
+    xs = np.choose(edge, [x1 + along, np.full_like(along, x2), x2 - along, np.full_like(along, x1)])
+    ys = np.choose(edge, [np.full_like(along, y1), y1 + along, np.full_like(along, y2), y2 - along])
+
+    points = np.empty((n_samples, 3))
+    points[:, 0] = xs + tremor(t, tremor_hz, tremor_amplitude, rng)
+    points[:, 1] = ys + tremor(t, tremor_hz * 1.07, tremor_amplitude, rng)
+    if noise:
+        points[:, :2] += rng.normal(0, noise, (n_samples, 2))
+    points[:, 2] = t
+    return points
+
+
+def generate_click_times(n_targets=5, mean_reaction=0.6, spread=0.15, seed=None):
+    """Reaction times for the Click Targets test"""
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(mean_reaction, spread, n_targets), 0.15, None)
+
+
+def generate_session(n_samples, seed=None, **params):
+    """A full synthetic session dict in batch_score's format"""
+    rng = np.random.default_rng(seed)
+    line_seed, square_seed, target_seed = rng.integers(0, 2 ** 32, 3)
+    return {
+        "line": generate_line(n_samples, seed=line_seed, **params),
+        "square": generate_square(n_samples, seed=square_seed, **params),
+        "target": {"click_times": generate_click_times(seed=target_seed), "missed": int(rng.integers(0, 3))},
+    }
+
+
+def generate_template(template, n_samples, rate_hz=100, tremor_hz=5.0, tremor_amplitude=2.0, bradykinesia=0.0,
+                      noise=0.5, timing_jitter=0.0, seed=None):
+    """Trace a template_paths.TemplatePath from its first vertex to its last"""
+    rng = np.random.default_rng(seed)
+    t = sample_times(n_samples, rate_hz, timing_jitter, rng)
+    vertices = template.vertices
+    along = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(vertices, axis=0).T))))
+    travelled = along[-1] * np.clip(path_progress(t, bradykinesia), 0, 1)
+
+    points = np.empty((n_samples, 3))
+    points[:, 0] = np.interp(travelled, along, vertices[:, 0]) + tremor(t, tremor_hz, tremor_amplitude, rng)
+    points[:, 1] = np.interp(travelled, along, vertices[:, 1]) + tremor(t, tremor_hz * 1.07, tremor_amplitude, rng)
+    if noise:
+        points[:, :2] += rng.normal(0, noise, (n_samples, 2))
+    points[:, 2] = t
+    return points
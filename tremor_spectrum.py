@@ -0,0 +1,118 @@
+"""Tremor band power and peak frequency from drawing trajectories.
+
+Recordings are resampled onto a uniform grid, cut into overlapping windows,
+linearly detrended (removing the intended drawing motion) and Hann-tapered.
+The x and y power spectra of every window of every recording go through a
+single batched rfft, in chunks, and are averaged per recording (Welch's
+method). Recordings shorter than one window contribute one zero-padded
+window of their own length.
+"""
+import numpy as np
+
+from resampling import resample_uniform
+
+TREMOR_RATE_HZ = 100
+TREMOR_BAND = (4.0, 6.0)       # Classic parkinsonian rest/action tremor
+PEAK_RANGE = (3.0, 12.0)       # Where a tremor peak is searched for
+MOVEMENT_BAND = (1.0, 20.0)    # Reference power for the band ratio
+WINDOW_SEC = 2.0               # 0.5 Hz bins at any rate
+OVERLAP = 0.5
+MIN_TREMOR_SEC = 1.0           # Shorter recordings cannot resolve the band
+
+# Windows per rfft call; bounds memory for very long recordings
+CHUNK_WINDOWS = 4096
+
+
+def empty_tremor():
+    """Tremor metrics for a recording too short to analyse"""
+    return {"tremor_power": None, "tremor_ratio": None, "tremor_peak_hz": None}
+
+
+def taper_windows(segments):
+    """Remove each window's linear trend and apply a Hann taper; segments is (..., n)"""
+    n = segments.shape[-1]
+    centered_t = np.arange(n) - (n - 1) / 2
+    slope = segments @ centered_t / (centered_t @ centered_t)
+    detrended = segments - segments.mean(axis=-1, keepdims=True) - slope[..., None] * centered_t
+    return detrended * np.hanning(n)
+
+
+def window_power(windows, n_fft, rate_hz):
+    """One-sided power spectral density of tapered (k, 2, m) x/y windows, summed over x and y"""
+    m = windows.shape[-1]
+    scale = rate_hz * np.sum(np.hanning(m) ** 2)
+    spectrum = np.fft.rfft(windows, n=n_fft, axis=-1)
+    psd = (spectrum.real ** 2 + spectrum.imag ** 2).sum(axis=1) / scale
+    # Fold negative frequencies in (everything but DC and, for even n_fft, Nyquist)
+    psd[:, 1:(n_fft + 1) // 2] *= 2
+    return psd
+
+
+def tremor_features_batch(recordings, rate_hz=TREMOR_RATE_HZ, window_sec=WINDOW_SEC, overlap=OVERLAP):
+    """Tremor metrics for many (N, 3) x, y, t recordings at once; returns a dict per recording
+
+    tremor_power is the 4-6 Hz power in px², tremor_ratio its share of the
+    1-20 Hz movement power and tremor_peak_hz the strongest frequency in
+    3-12 Hz. Recordings too short to analyse get empty_tremor().
+    """
+    n = int(round(window_sec * rate_hz))
+    hop = max(1, int(round(n * (1 - overlap))))
+    min_samples = int(MIN_TREMOR_SEC * rate_hz)
+
+    signals, owners, starts = [], [], []
+    short = []  # (recording index, its x/y signal) for recordings shorter than one window
+    offset = 0
+    for row, movements in enumerate(recordings):
+        if movements is None or len(movements) < 2:
+            continue
+        xy = resample_uniform(movements, rate_hz)[:, :2]
+        if len(xy) < min_samples:
+            continue
+        if len(xy) < n:
+            short.append((row, xy))
+            continue
+        window_starts = np.arange(0, len(xy) - n + 1, hop)
+        signals.append(xy)
+        starts.append(offset + window_starts)
+        owners.append(np.full(len(window_starts), row))
+        offset += len(xy)
+
+    sums = np.zeros((len(recordings), n // 2 + 1))
+    counts = np.zeros(len(recordings))
+    if signals:
+        signal = np.concatenate(signals).T  # (2, total samples)
+        starts, owners = np.concatenate(starts), np.concatenate(owners)
+        steps = np.arange(n)
+        for begin in range(0, len(starts), CHUNK_WINDOWS):
+            chunk = slice(begin, begin + CHUNK_WINDOWS)
+            # Gather (k, 2, n) windows straight from the flat signal
+            windows = signal[:, starts[chunk, None] + steps].transpose(1, 0, 2)
+            psd = window_power(taper_windows(windows), n, rate_hz)
+            np.add.at(sums, owners[chunk], psd)
+        counts += np.bincount(owners, minlength=len(recordings))
+    for row, xy in short:
+        sums[row] = window_power(taper_windows(xy.T[None]), n, rate_hz)[0]
+        counts[row] = 1
+
+    freqs = np.fft.rfftfreq(n, 1 / rate_hz)
+    df = freqs[1] - freqs[0]
+    band = (freqs >= TREMOR_BAND[0]) & (freqs <= TREMOR_BAND[1])
+    movement = (freqs >= MOVEMENT_BAND[0]) & (freqs <= MOVEMENT_BAND[1])
+    peak_bins = np.flatnonzero((freqs >= PEAK_RANGE[0]) & (freqs <= PEAK_RANGE[1]))
+
+    features = [empty_tremor() for _ in recordings]
+    # Reduced one recording at a time: summing rows of a 2-D block can round
+    # differently depending on how many recordings share the batch
+    for row in np.flatnonzero(counts):
+        psd = sums[row] / counts[row]
+        band_power = psd[band].sum() * df
+        movement_power = psd[movement].sum() * df
+        features[row] = {"tremor_power": float(band_power),
+                         "tremor_ratio": float(band_power / movement_power) if movement_power > 0 else 0.0,
+                         "tremor_peak_hz": float(freqs[peak_bins[np.argmax(psd[peak_bins])]])}
+    return features
+
+
+def tremor_features(movements, rate_hz=TREMOR_RATE_HZ):
+    """Tremor metrics for a single recording (see tremor_features_batch)"""
+    return tremor_features_batch([movements], rate_hz)[0]
@@ -0,0 +1,188 @@
+"""Per-patient history of results for progression monitoring.
+
+Sessions are appended in time order per patient. Each tracked metric
+becomes a row in a (patient, metric, time) clustered SQLite table, so
+reading any time range of one metric is a single index seek. Beside the
+rows, every (patient, metric) keeps running aggregates, updated on each
+append. They hold the count, first and last values, an exponentially
+weighted mean with a half-life in days, and the sums behind a
+least-squares slope. A patient's whole trend summary is therefore one
+small read whatever the length of their history. Windowed statistics
+("the last 90 days") are SQL aggregates over an index range.
+"""
+import math
+import sqlite3
+import time
+
+import numpy as np
+
+from scoring import flat_metrics
+
+SCHEMA_VERSION = 1
+
+# Metrics followed over time (deviation, smoothness and reaction time)
+TREND_METRICS = ("line.mse", "square.mse", "line.smoothness", "square.smoothness", "target.avg_time")
+HALF_LIFE_DAYS = 30.0  # Weight of a session in the rolling mean halves every this many days
+DAY = 86400.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS visits (
+    patient TEXT NOT NULL,
+    t REAL NOT NULL,
+    session_id TEXT,
+    PRIMARY KEY (patient, t)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS points (
+    patient TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    t REAL NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (patient, metric, t)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aggregates (
+    patient TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    first_t REAL NOT NULL,
+    last_t REAL NOT NULL,
+    first_value REAL NOT NULL,
+    last_value REAL NOT NULL,
+    ewma REAL NOT NULL,
+    sum_x REAL NOT NULL,
+    sum_y REAL NOT NULL,
+    sum_xx REAL NOT NULL,
+    sum_xy REAL NOT NULL,
+    PRIMARY KEY (patient, metric)
+) WITHOUT ROWID;
+"""
+
+
+class TrendStoreError(Exception):
+    """Raised for incompatible trend stores"""
+
+
+def regression_slope(n, sum_x, sum_y, sum_xx, sum_xy):
+    """Least-squares slope from running sums, or None with fewer than two distinct x"""
+    denominator = n * sum_xx - sum_x * sum_x
+    if n < 2 or denominator <= 0:
+        return None
+    return (n * sum_xy - sum_x * sum_y) / denominator
+
+
+class TrendStore:
+    """Append-only per-patient metric history with incrementally maintained trend aggregates"""
+
+    def __init__(self, path, metrics=TREND_METRICS, half_life_days=HALF_LIFE_DAYS):
+        self.path = path
+        self.metrics = metrics
+        self.half_life_days = half_life_days
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        version = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()[0]
+        if int(version) != SCHEMA_VERSION:
+            raise TrendStoreError(f"{path} uses trend store version {version}, expected {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, patient, results, t=None, session_id=None):
+        """Add one session's results for a patient at time t (epoch seconds, default now)
+
+        Sessions must arrive in time order per patient: the running means
+        and slopes are only valid for appends, so an older timestamp raises
+        ValueError.
+        """
+        t = time.time() if t is None else float(t)
+        values = flat_metrics(results)
+        with self.conn:
+            last = self.conn.execute("SELECT MAX(t) FROM visits WHERE patient = ?", (patient,)).fetchone()[0]
+            if last is not None and t <= last:
+                raise ValueError(f"Session at {t} is not after the latest one for patient {patient!r} ({last})")
+            self.conn.execute("INSERT INTO visits VALUES (?, ?, ?)", (patient, t, session_id))
+            for metric in self.metrics:
+                value = values.get(metric)
+                if value is None or math.isnan(value):
+                    continue
+                self.conn.execute("INSERT INTO points VALUES (?, ?, ?, ?)", (patient, metric, t, value))
+                self._update_aggregate(patient, metric, t, value)
+
+    def _update_aggregate(self, patient, metric, t, value):
+        row = self.conn.execute(
+            "SELECT n, first_t, last_t, ewma, sum_x, sum_y, sum_xx, sum_xy FROM aggregates "
+            "WHERE patient = ? AND metric = ?", (patient, metric)).fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO aggregates VALUES (?, ?, 1, ?, ?, ?, ?, ?, 0, ?, 0, 0)",
+                              (patient, metric, t, t, value, value, value, value))
+            return
+        n, first_t, last_t, ewma, sum_x, sum_y, sum_xx, sum_xy = row
+        # Time-aware EWMA: the old mean decays by how long ago the last session was
+        keep = 0.5 ** ((t - last_t) / DAY / self.half_life_days)
+        x = (t - first_t) / DAY  # Days since the first session keeps the sums well conditioned
+        self.conn.execute(
+            "UPDATE aggregates SET n = ?, last_t = ?, last_value = ?, ewma = ?, sum_x = ?, sum_y = ?, "
+            "sum_xx = ?, sum_xy = ? WHERE patient = ? AND metric = ?",
+            (n + 1, t, value, keep * ewma + (1 - keep) * value, sum_x + x, sum_y + value,
+             sum_xx + x * x, sum_xy + x * value, patient, metric))
+
+    # -- queries ---------------------------------------------------------
+
+    def patients(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT patient FROM visits ORDER BY patient")]
+
+    def visit_count(self, patient):
+        return self.conn.execute("SELECT COUNT(*) FROM visits WHERE patient = ?", (patient,)).fetchone()[0]
+
+    def trend(self, patient):
+        """{metric: summary} for a patient from the running aggregates; no history is read
+
+        Each summary holds n, first/last time and value, the rolling (EWMA)
+        mean and slope_per_month, the least-squares change per 30 days over
+        the whole history (None until two sessions exist).
+        """
+        summaries = {}
+        for (metric, n, first_t, last_t, first_value, last_value, ewma,
+             sum_x, sum_y, sum_xx, sum_xy) in self.conn.execute(
+                "SELECT metric, n, first_t, last_t, first_value, last_value, ewma, sum_x, sum_y, sum_xx, sum_xy "
+                "FROM aggregates WHERE patient = ?", (patient,)):
+            slope = regression_slope(n, sum_x, sum_y, sum_xx, sum_xy)
+            summaries[metric] = {"n": n, "first_t": first_t, "last_t": last_t, "first_value": first_value,
+                                 "last_value": last_value, "rolling_mean": ewma,
+                                 "slope_per_month": None if slope is None else slope * 30}
+        return summaries
+
+    def window(self, patient, metric, since=None, until=None):
+        """n, mean and slope_per_month of one metric over [since, until], aggregated inside SQLite"""
+        since = -math.inf if since is None else since
+        until = math.inf if until is None else until
+        n, sum_x, sum_y, sum_xx, sum_xy = self.conn.execute(
+            "SELECT COUNT(*), SUM(t / ?), SUM(value), SUM((t / ?) * (t / ?)), SUM((t / ?) * value) FROM points "
+            "WHERE patient = ? AND metric = ? AND t BETWEEN ? AND ?",
+            (DAY, DAY, DAY, DAY, patient, metric, since, until)).fetchone()
+        if not n:
+            return {"n": 0, "mean": None, "slope_per_month": None}
+        slope = None
+        if n > 1:
+            # Same slope as from the raw sums, written as centred sums (x shifted by the mean time, so sum_x = 0)
+            mean_x = sum_x / n
+            slope = regression_slope(n, 0.0, sum_y, sum_xx - n * mean_x * mean_x, sum_xy - mean_x * sum_y)
+        return {"n": n, "mean": sum_y / n, "slope_per_month": None if slope is None else slope * 30}
+
+    def series(self, patient, metric, since=None, until=None, limit=None):
+        """(times, values) arrays of one metric in time order; limit keeps only the latest points"""
+        since = -math.inf if since is None else since
+        until = math.inf if until is None else until
+        rows = self.conn.execute(
+            "SELECT t, value FROM points WHERE patient = ? AND metric = ? AND t BETWEEN ? AND ? "
+            "ORDER BY t DESC LIMIT ?", (patient, metric, since, until, -1 if limit is None else limit)).fetchall()
+        rows.reverse()
+        data = np.array(rows, dtype=float).reshape(-1, 2)
+        return data[:, 0], data[:, 1]